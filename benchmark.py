@@ -0,0 +1,337 @@
+# Gravity Simulation Project
+# ----------------------------------------------------------------------------------------------------------------------
+# This script measures the performance of the parts of the simulation (steps, trajectory storage, plotting, frames'
+# rendering and video encoding) separately, for the scenarios and for synthetic systems of growing sizes.
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+import bodies
+import forces
+import integrators
+import profiling
+import progress
+import rendering
+import scenarios
+import simulation
+import trajectory
+
+PHASES = ('step', 'storage', 'plot', 'render', 'video')
+
+# Amounts of bodies of the synthetic systems
+SIZES = (10, 100, 1000, 10000, 100000)
+
+# Force backends calculating every pair of bodies are only measured up to this amount of bodies
+EXACT_LIMIT = 10000
+
+# Amount of elements (samples times bodies) of the trajectories stored and plotted, and amount of frames encoded into
+# the video (the video is measured once, with the first system, its speed does not depend on the amount of bodies)
+TRAJECTORY_ELEMENTS = 2 * 10 ** 6
+VIDEO_FRAMES = 30
+
+# Relative slowdown reported as a regression by --compare
+TOLERANCE = 0.1
+
+
+def calls_per_second(function, duration):
+    """
+    Function measuring how many times per second a function can be called. The first call is not measured (it compiles
+    the kernels and fills the caches), the rest are made in batches doubling in size until duration seconds passed
+    :param function: Function taking no arguments
+    :param duration: Float, minimum amount of seconds of the measurement
+    :return: Float, calls per second
+    """
+    function()
+    calls = 0
+    batch = 1
+    start = time.perf_counter()
+    while True:
+        for _ in range(batch):
+            function()
+        calls += batch
+        elapsed = time.perf_counter() - start
+        if elapsed >= duration:
+            return calls / elapsed
+        batch *= 2
+
+
+def peak_allocated(function):
+    """
+    Function measuring the peak amount of memory allocated (by Python and NumPy) during a single call of a function
+    :param function: Function taking no arguments
+    :return: Integer, amount of bytes
+    """
+    tracemalloc.start()
+    try:
+        function()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def synthetic_system(n, seed=0):
+    """
+    Function creating a system of a star and n - 1 planets on circular orbits around it
+    :param n: Integer, amount of bodies
+    :param seed: Integer, seed of the random positions
+    :return: Tuple of numpy arrays containing masses, coordinates and velocities' components of the bodies and a Float,
+    a timestep of about a thousandth of the shortest orbit
+    """
+    rng = np.random.default_rng(seed)
+    star = 2e30
+    radii = rng.uniform(5e10, 5e11, n - 1)
+    angles = rng.uniform(0, 2 * np.pi, n - 1)
+    speeds = np.sqrt(forces.G * star / radii)
+    masses = np.r_[star, rng.uniform(1e23, 1e25, n - 1)]
+    xs = np.r_[0, radii * np.cos(angles)]
+    ys = np.r_[0, radii * np.sin(angles)]
+    vxs = np.r_[0, -speeds * np.sin(angles)]
+    vys = np.r_[0, speeds * np.cos(angles)]
+    dt = 2 * np.pi * np.sqrt(5e10 ** 3 / (forces.G * star)) / 1000
+    return masses, xs, ys, vxs, vys, dt
+
+
+def synthetic_trajectory(xs, ys, vxs, vys, samples):
+    """
+    Function creating a trajectory of bodies moving along circles around the origin with their starting speeds, much
+    cheaper than simulating it, for measuring storage and plotting
+    :return: TrajectoryBuffer class object
+    """
+    radii = np.hypot(xs, ys)
+    angles = np.arctan2(ys, xs)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rates = np.nan_to_num(np.hypot(vxs, vys) / radii)
+    data = trajectory.TrajectoryBuffer(len(xs), samples)
+    for sample in range(samples):
+        phase = angles + rates * sample * 1e5
+        data.append(sample, radii * np.cos(phase), radii * np.sin(phase), -np.sin(phase), np.cos(phase))
+    return data
+
+
+def systems(args):
+    """
+    Function listing the systems to measure: the scenarios and the synthetic systems
+    :param args: argparse.Namespace
+    :return: List of tuples of the name of the system, masses, coordinates and velocities' components of the bodies and
+    the timestep
+    """
+    output = []
+    if not args.no_scenarios:
+        for name in args.scenarios or sorted(scenarios.get_scenarios(args.path)):
+            timeframe, samples, _, _, masses, xs, ys, vxs, vys = scenarios.show_scenario(name, args.path)
+            output.append((name[:-4], masses, xs, ys, vxs, vys, float(timeframe) / int(samples)))
+    for n in args.sizes:
+        output.append((f'Synthetic {n}', *synthetic_system(n)))
+    return output
+
+
+def record(results, phase, name, bodies, rate, unit, function, **details):
+    """
+    Function storing a measurement and printing it
+    :param results: List of dictionaries receiving the measurement
+    :param phase: String, one of PHASES
+    :param name: String, description of the measured case, unique within the phase
+    :param bodies: Integer, amount of bodies
+    :param rate: Float, amount of units of work per second
+    :param unit: String, unit of work (e.g. 'steps')
+    :param function: Function taking no arguments doing a unit of work, called once more to measure the memory
+    :param details: Other values stored with the measurement
+    """
+    result = {'phase': phase, 'name': name, 'bodies': bodies, 'rate': rate, 'unit': unit,
+              'bodies_rate': rate * bodies, 'peak_allocated': peak_allocated(function), 'max_rss': profiling.max_rss(),
+              **details}
+    results.append(result)
+    print(f'{phase:<8}{name:<56}{bodies:>7}{rate:>12.1f} {unit + "/s":<10}{rate * bodies:>14.0f}'
+          f'{result["peak_allocated"] / 2 ** 20:>10.1f} MB')
+
+
+def measure_steps(results, args, name, masses, xs, ys, vxs, vys, dt):
+    """
+    Function measuring steps per second of every chosen integrator and force backend
+    """
+    for solver in args.solvers:
+        if solver != 'barnes-hut' and len(masses) > EXACT_LIMIT:
+            continue
+        accelerations = forces.get_force_backend(solver)
+        for integrator_name in args.integrators:
+            integrator = integrators.get_integrator(integrator_name, accelerations)
+            state = bodies.State(masses, xs, ys, vxs, vys)
+
+            def step():
+                integrator.advance(state, dt)
+
+            record(results, 'step', f'{name} {type(integrator).__name__} {solver}', len(masses),
+                   calls_per_second(step, args.duration), 'steps', step, integrator=integrator_name, solver=solver)
+        if hasattr(accelerations, 'close'):
+            accelerations.close()
+
+
+def measure_storage(results, args, name, data, directory):
+    """
+    Function measuring samples per second stored in memory and streamed into a trajectory file
+    """
+    n = data.x.shape[1]
+    rows = [(data.t[row], data.x[row], data.y[row], data.vx[row], data.vy[row]) for row in range(len(data))]
+
+    def store_in_memory():
+        buffer = trajectory.TrajectoryBuffer(n, len(rows))
+        for row in rows:
+            buffer.append(*row)
+
+    def stream():
+        with trajectory.TrajectoryWriter(os.path.join(directory, 'trajectory.bin'), np.ones(n), 1.0) as writer:
+            for row in rows:
+                writer.append(*row)
+
+    for case, function in (('memory', store_in_memory), ('stream', stream)):
+        record(results, 'storage', f'{name} {case}', n, len(rows) * calls_per_second(function, args.duration),
+               'samples', function, samples=len(rows))
+
+
+def measure_plot(results, args, name, data, directory):
+    """
+    Function measuring how long plotting the graph of a trajectory takes
+    """
+    n = data.x.shape[1]
+
+    def plot():
+        simulation.plot(data, n, os.path.join(directory, 'plot.png'))
+
+    record(results, 'plot', f'{name} {len(data)} samples', n, calls_per_second(plot, args.duration), 'plots', plot,
+           samples=len(data))
+
+
+def measure_rendering(results, args, name, masses, xs, ys):
+    """
+    Function measuring frames per second of every renderer
+    """
+    limits = max(abs(xs).max(), abs(ys).max()) * simulation.LIMITS_MULTIPLIER
+    sizes = simulation.scale_the_array(masses)
+    for renderer in args.renderers:
+        renderer_object = rendering.get_renderer(renderer, sizes, limits)
+
+        def render():
+            renderer_object.render(xs, ys)
+
+        record(results, 'render', f'{name} {renderer}', len(masses), calls_per_second(render, args.duration),
+               'frames', render, renderer=renderer)
+
+
+def measure_video(results, args, name, masses, xs, ys, directory):
+    """
+    Function measuring frames per second encoded straight into a video and read back from saved frames
+    (simulation.save_to_video)
+    """
+    limits = max(abs(xs).max(), abs(ys).max()) * simulation.LIMITS_MULTIPLIER
+    frame = np.array(rendering.get_renderer('scatter', simulation.scale_the_array(masses), limits).render(xs, ys))
+    frames_path = os.path.join(directory, 'frames', '')
+    video_path = os.path.join(directory, 'simulation.avi')
+
+    def encode(frames_path=None):
+        with rendering.VideoEncoder(video_path, frames_path=frames_path) as encoder:
+            for _ in range(VIDEO_FRAMES):
+                encoder.write(frame)
+
+    def save_to_video():
+        simulation.save_to_video(progress.Progress(), video_path, frames_path)
+
+    encode(frames_path)  # Saving the frames read by save_to_video
+    for case, function in (('stream', encode), ('save_to_video', save_to_video)):
+        record(results, 'video', f'{name} {case}', len(masses),
+               VIDEO_FRAMES * calls_per_second(function, args.duration), 'frames', function)
+
+
+def compare(results, path, tolerance):
+    """
+    Function comparing the results with the ones of an earlier run and printing the regressions
+    :param results: List of dictionaries, the measurements
+    :param path: String, path of the JSON file with the measurements of the earlier run
+    :param tolerance: Float, relative slowdown reported as a regression
+    :return: List of tuples of the phase, the name and the relative change of the regressed measurements
+    """
+    with open(path) as file:
+        baseline = {(result['phase'], result['name']): result for result in json.load(file)['results']}
+    regressions = []
+    print(f'\nComparison with {path}')
+    for result in results:
+        old = baseline.get((result['phase'], result['name']))
+        if old is None:
+            continue
+        change = result['rate'] / old['rate'] - 1
+        flag = 'REGRESSION' if change < -tolerance else ''
+        print(f'{result["phase"]:<8}{result["name"]:<56}{change:>+9.1%} {flag}')
+        if flag:
+            regressions.append((result['phase'], result['name'], change))
+    return regressions
+
+
+def parse_arguments(arguments=None):
+    """
+    Function parsing the command line arguments
+    :param arguments: List of strings (None for sys.argv)
+    :return: argparse.Namespace
+    """
+    parser = argparse.ArgumentParser(description='Measure the performance of the parts of the simulation.')
+    parser.add_argument('scenarios', nargs='*', help='names of the scenario files (all the scenarios by default)')
+    parser.add_argument('--path', default=scenarios.DEFAULT_PATH, help='directory where the scenarios are located')
+    parser.add_argument('--no-scenarios', action='store_true', help='measure only the synthetic systems')
+    parser.add_argument('--sizes', type=int, nargs='*', default=list(SIZES), help='amounts of bodies of the synthetic '
+                                                                                   'systems')
+    parser.add_argument('--phases', nargs='+', default=list(PHASES), choices=PHASES)
+    parser.add_argument('--integrators', nargs='+', default=['leapfrog'], choices=integrators.INTEGRATORS)
+    parser.add_argument('--solvers', nargs='+', default=['vectorized', 'auto', 'barnes-hut'],
+                        choices=forces.FORCE_BACKENDS, help=f'force backends (all but barnes-hut are only measured up '
+                                                            f'to {EXACT_LIMIT} bodies)')
+    parser.add_argument('--renderers', nargs='+', default=list(rendering.RENDERERS), choices=rendering.RENDERERS)
+    parser.add_argument('--duration', type=float, default=1.0, help='minimum amount of seconds of every measurement')
+    parser.add_argument('--output', help='JSON file the results are saved into')
+    parser.add_argument('--compare', help='JSON file saved by an earlier run, slowdowns are reported as regressions')
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE, help='relative slowdown reported as a regression')
+    return parser.parse_args(arguments)
+
+
+def main(arguments=None):
+    """
+    Function measuring the chosen phases for every system, printing the results as a table and optionally saving them
+    and comparing them with an earlier run
+    :param arguments: List of strings (None for sys.argv)
+    :return: List of dictionaries, one per measurement
+    """
+    args = parse_arguments(arguments)
+    results = []
+    print(f'{"Phase":<8}{"Case":<56}{"Bodies":>7}{"Rate":>12} {"Unit":<10}{"Bodies*rate":>14}{"Peak alloc":>13}')
+    with tempfile.TemporaryDirectory() as directory:
+        measured = systems(args)
+        for name, masses, xs, ys, vxs, vys, dt in measured:
+            if 'step' in args.phases:
+                measure_steps(results, args, name, masses, xs, ys, vxs, vys, dt)
+            if 'storage' in args.phases or 'plot' in args.phases:
+                samples = max(10, min(10000, TRAJECTORY_ELEMENTS // len(masses)))
+                data = synthetic_trajectory(xs, ys, vxs, vys, samples)
+                if 'storage' in args.phases:
+                    measure_storage(results, args, name, data, directory)
+                if 'plot' in args.phases:
+                    measure_plot(results, args, name, data, directory)
+                del data
+            if 'render' in args.phases:
+                measure_rendering(results, args, name, masses, xs, ys)
+        if 'video' in args.phases and measured:
+            name, masses, xs, ys = measured[0][:4]
+            measure_video(results, args, name, masses, xs, ys, directory)
+
+    if args.output is not None:
+        with open(args.output, mode='w') as file:
+            json.dump({'python': sys.version, 'numpy': np.__version__, 'time': time.time(), 'results': results}, file,
+                      indent=1)
+    if args.compare is not None and compare(results, args.compare, args.tolerance):
+        sys.exit(1)
+    return results
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+# Gravity Simulation Project
+# ----------------------------------------------------------------------------------------------------------------------
+# This script is responsible for holding the state of the simulated bodies in a single contiguous block of memory, which
+# the integrators update in place and the trajectory storage and the renderers read without copying.
+
+import numpy as np
+
+# Precisions of the state: dtype of the positions and velocities and whether the time is accumulated with compensated
+# (Kahan) summation, so that millions of small timesteps add up to the exact length of the simulation
+PRECISIONS = {
+    'float32': (np.float32, False),
+    'float64': (np.float64, False),
+    'compensated': (np.float64, True),
+}
+
+
+class State:
+    def __init__(self, masses, xs, ys, vxs, vys, precision='float64', t=0.0, t_error=0.0):
+        """
+        Method initializing a State class object, storing positions and velocities of the bodies as two (N, 2) blocks of
+        a single contiguous array, so that an integrator's step streams through memory once
+        :param masses: Numpy array containing masses of the bodies
+        :param xs: Numpy array containing x coordinates of the bodies
+        :param ys: Numpy array containing y coordinates of the bodies
+        :param vxs: Numpy array containing x components of the velocities of the bodies
+        :param vys: Numpy array containing y components of the velocities of the bodies
+        :param precision: String, one of PRECISIONS' keys ('float32' halves the memory traffic of the positions and
+        velocities, the accelerations are calculated in float64 either way)
+        :param t: Float, time of the state
+        :param t_error: Float, rounding error of the time carried by compensated summation (see advance_time)
+        """
+        try:
+            self.dtype, self.compensated = PRECISIONS[precision]
+        except KeyError:
+            raise ValueError(f'Unknown precision "{precision}", available: {", ".join(PRECISIONS)}') from None
+        self.precision = precision
+        self.t = float(t)
+        self.t_error = float(t_error) if self.compensated else 0.0
+        # Incremented whenever the bodies are replaced, so that anything derived from the old ones can be dropped
+        self.revision = 0
+        self.replace(masses, xs, ys, vxs, vys)
+
+    def replace(self, masses, xs, ys, vxs, vys):
+        """
+        Method replacing the bodies (e.g. after some of them merged), allocating a new block if their amount changed
+        :param masses: Numpy array containing masses of the bodies
+        :param xs: Numpy array containing x coordinates of the bodies
+        :param ys: Numpy array containing y coordinates of the bodies
+        :param vxs: Numpy array containing x components of the velocities of the bodies
+        :param vys: Numpy array containing y components of the velocities of the bodies
+        """
+        self.masses = np.array(masses, dtype=np.float64)
+        self.block = np.empty((2, len(self.masses), 2), dtype=self.dtype)
+        # Views of the block, shaped (N, 2), and of its columns
+        self.positions, self.velocities = self.block
+        self.xs, self.ys = self.positions[:, 0], self.positions[:, 1]
+        self.vxs, self.vys = self.velocities[:, 0], self.velocities[:, 1]
+        self.update(xs, ys, vxs, vys)
+        self.revision += 1
+
+    def update(self, xs, ys, vxs, vys):
+        """
+        Method overwriting the positions and velocities of the bodies with given ones
+        :param xs: Numpy array containing x coordinates of the bodies
+        :param ys: Numpy array containing y coordinates of the bodies
+        :param vxs: Numpy array containing x components of the velocities of the bodies
+        :param vys: Numpy array containing y components of the velocities of the bodies
+        """
+        self.xs[:] = xs
+        self.ys[:] = ys
+        self.vxs[:] = vxs
+        self.vys[:] = vys
+
+    def coordinates(self):
+        """
+        Method returning the coordinates of the bodies for the force backends, always in float64, as the cube of the
+        distance of bodies far apart overflows float32
+        :return: Tuple of numpy arrays containing x and y coordinates of the bodies (views of the block for float64)
+        """
+        if self.dtype == np.float64:
+            return self.xs, self.ys
+        return self.xs.astype(np.float64), self.ys.astype(np.float64)
+
+    def advance_time(self, dt):
+        """
+        Method adding a timestep to the time of the state
+        :param dt: Float, timestep
+        """
+        if not self.compensated:
+            self.t += dt
+            return
+        corrected = dt - self.t_error
+        t = self.t + corrected
+        self.t_error = (t - self.t) - corrected
+        self.t = t
+
+    def __len__(self):
+        return len(self.masses)
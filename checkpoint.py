@@ -0,0 +1,77 @@
+# Gravity Simulation Project
+# ----------------------------------------------------------------------------------------------------------------------
+# This script is responsible for saving and loading checkpoints of the simulation, so that long runs can be resumed.
+
+import hashlib
+import json
+import os
+import numpy as np
+
+CHECKPOINT_NAME = 'checkpoint.npz'
+
+# Arrays of the state of the simulation stored in every checkpoint, and the ones stored only by some runs (collision
+# radii and original indices of the bodies left when colliding bodies merge, rounding error of the compensated time)
+STATE = ('masses', 'xs', 'ys', 'vxs', 'vys')
+OPTIONAL_STATE = ('radii', 'ids', 't_error')
+
+
+def scenario_hash(masses, x0s, y0s, vx0s, vy0s, length, samples, settings):
+    """
+    Function calculating a hash identifying a run, a checkpoint can only be resumed by a run with the same hash
+    :param masses: Numpy array, masses of the bodies
+    :param x0s: Numpy array, X starting coordinates of the bodies
+    :param y0s: Numpy array, Y starting coordinates of the bodies
+    :param vx0s: Numpy array, X starting velocities' components of the bodies
+    :param vy0s: Numpy array, Y starting velocities' components of the bodies
+    :param length: Float, length of the simulation in seconds
+    :param samples: Integer, amount of samples
+    :param settings: Dictionary of other settings influencing the results (integrator, force backend...), JSON
+    serializable
+    :return: String, hexadecimal SHA-256 hash
+    """
+    digest = hashlib.sha256()
+    for array in (masses, x0s, y0s, vx0s, vy0s):
+        digest.update(np.ascontiguousarray(array, dtype='<f8').tobytes())
+    digest.update(json.dumps({'length': float(length), 'samples': int(samples), **settings},
+                             sort_keys=True).encode())
+    return digest.hexdigest()
+
+
+def save_checkpoint(path, run_hash, sample, t, state, integrator_state=None):
+    """
+    Function saving a checkpoint, written into a temporary file first, so that a crash while saving does not destroy
+    the previous checkpoint
+    :param path: String, path of the checkpoint file
+    :param run_hash: String, hash of the run (see scenario_hash)
+    :param sample: Integer, amount of samples calculated so far
+    :param t: Float, time of the last calculated sample
+    :param state: Dictionary of numpy arrays, one for every name in STATE (and optionally in OPTIONAL_STATE)
+    :param integrator_state: Dictionary of numpy arrays, state of the integrator (see Integrator.get_state)
+    :return: None
+    """
+    arrays = {name: state[name] for name in STATE + OPTIONAL_STATE if name in state}
+    for name, array in (integrator_state or {}).items():
+        arrays[f'integrator_{name}'] = array
+    temporary = path + '.tmp'
+    with open(temporary, mode='wb') as file:
+        np.savez(file, hash=np.array(run_hash), sample=np.array(sample), t=np.array(t, dtype=np.float64), **arrays)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temporary, path)
+
+
+def load_checkpoint(path, run_hash):
+    """
+    Function loading a checkpoint
+    :param path: String, path of the checkpoint file
+    :param run_hash: String, hash of the run which resumes the checkpoint (see scenario_hash)
+    :return: Tuple of the amount of samples calculated so far, time of the last calculated sample, dictionary of the
+    state's numpy arrays and dictionary of the integrator's state
+    """
+    with np.load(path) as file:
+        if str(file['hash']) != run_hash:
+            raise ValueError(f'Checkpoint "{path}" was saved by a run with a different scenario or settings')
+        state = {name: file[name] for name in STATE + OPTIONAL_STATE if name in file.files}
+        integrator_state = {name[len('integrator_'):]: file[name] for name in file.files
+                            if name.startswith('integrator_')}
+        return int(file['sample']), float(file['t']), state, integrator_state
@@ -0,0 +1,118 @@
+# Gravity Simulation Project
+# ----------------------------------------------------------------------------------------------------------------------
+# This script runs the simulation from the command line, without the GUI (e.g. on servers with no display).
+
+import argparse
+import os
+import matplotlib
+
+# No display is needed to plot the graph and render the frames
+matplotlib.use('Agg')
+
+import bodies  # noqa: E402
+import forces  # noqa: E402
+import integrators  # noqa: E402
+import progress  # noqa: E402
+import rendering  # noqa: E402
+import scenarios  # noqa: E402
+import simulation  # noqa: E402
+
+
+def parse_arguments(arguments=None):
+    """
+    Function parsing the command line arguments
+    :param arguments: List of strings (None for sys.argv)
+    :return: argparse.Namespace
+    """
+    parser = argparse.ArgumentParser(description='Run a gravity simulation of a scenario without the GUI.')
+    parser.add_argument('scenario', help="name of the scenario file, e.g. 'Earth Moon.txt'")
+    parser.add_argument('--path', default=scenarios.DEFAULT_PATH, help='directory where the scenario is located')
+    parser.add_argument('--length', type=float, help="length of the simulation in seconds (scenario's suggestion by "
+                                                     "default)")
+    parser.add_argument('--samples', type=int, help="amount of samples (scenario's suggestion by default)")
+    parser.add_argument('--frames', type=int, help="amount of frames of the video, 0 for no video (scenario's "
+                                                   "suggestion by default)")
+    parser.add_argument('--integrator', default='leapfrog', choices=integrators.INTEGRATORS)
+    parser.add_argument('--solver', default='auto', choices=forces.FORCE_BACKENDS, help='force backend')
+    parser.add_argument('--theta', type=float, default=forces.THETA, help="opening angle of the 'barnes-hut' solver")
+    parser.add_argument('--workers', type=int, help="amount of worker processes of the 'parallel' solver (amount of "
+                                                    "CPUs by default)")
+    parser.add_argument('--softening', type=float, default=forces.SOFTENING, help='Plummer softening length in metres, '
+                                                                                 'keeps close encounters finite')
+    parser.add_argument('--collision-radius', type=float, default=0.0, help='radius in metres at which bodies collide '
+                                                                            'and merge (0 for no collisions)')
+    parser.add_argument('--precision', default='float64', choices=bodies.PRECISIONS, help="precision of the bodies' "
+                                                                                          "positions and velocities")
+    parser.add_argument('--output', default='./temp', help='directory where the output files are saved')
+    parser.add_argument('--stream', action='store_true', help='stream the samples into a binary trajectory file '
+                                                              'instead of holding them in memory')
+    parser.add_argument('--no-plot', action='store_true', help='do not plot the graph')
+    parser.add_argument('--plot-resolution', type=int, default=simulation.PLOT_RESOLUTION, help='width of the graph '
+                                                                                               'in pixels')
+    parser.add_argument('--no-csv', action='store_true', help='do not export the trajectory into a csv file')
+    parser.add_argument('--renderer', default='scatter', choices=rendering.RENDERERS, help='frame renderer')
+    parser.add_argument('--render-workers', type=int, default=0, help='amount of worker processes rendering the frames '
+                                                                      'while the simulation goes on')
+    parser.add_argument('--keep-frames', action='store_true', help='also save every frame as a .tif file (debugging)')
+    parser.add_argument('--checkpoint-every', type=int, default=0, help='save the state of the simulation every that '
+                                                                        'many samples, so that it can be resumed '
+                                                                        '(implies --stream)')
+    parser.add_argument('--resume', action='store_true', help='continue the simulation saved in the output directory '
+                                                              'from its last checkpoint (implies --stream)')
+    parser.add_argument('--profile', action='store_true', help='measure the time and memory of every phase, save the '
+                                                               'report into the output directory')
+    parser.add_argument('--profile-memory', action='store_true', help='also trace the memory allocated by every phase '
+                                                                      '(slower)')
+    parser.add_argument('--interval', type=float, default=1.0, help='amount of seconds after which a progress report '
+                                                                     'is printed, or earlier if the progress advanced '
+                                                                     'by --percent-step')
+    parser.add_argument('--percent-step', type=float, default=progress.PROGRESS_PERCENT_STEP,
+                        help='amount of percent by which the progress has to advance for a report to be printed before '
+                             '--interval passed')
+    return parser.parse_args(arguments)
+
+
+def force_options(args):
+    """
+    Function choosing the keyword arguments of the chosen force backend
+    :param args: argparse.Namespace
+    :return: Dictionary
+    """
+    if args.solver == 'barnes-hut':
+        return {'theta': args.theta}
+    if args.solver == 'parallel':
+        return {'workers': args.workers}
+    return {}
+
+
+def main(arguments=None):
+    """
+    Function running a simulation of a scenario with the settings given in the command line
+    :param arguments: List of strings (None for sys.argv)
+    :return: None
+    """
+    args = parse_arguments(arguments)
+    timeframe, samples, frames, names = scenarios.show_scenario(args.scenario, args.path)[:4]
+    masses, x0s, y0s, vx0s, vy0s = scenarios.load_scenario(args.scenario, args.path)
+    length = args.length if args.length is not None else float(timeframe)
+    samples = args.samples if args.samples is not None else int(samples)
+    frames = args.frames if args.frames is not None else int(frames)
+    if frames != 0 and samples % frames != 0:
+        raise SystemExit('Amount of samples has to be a multiple of amount of frames')
+
+    os.makedirs(args.output, exist_ok=True)
+    stream = args.stream or args.resume or args.checkpoint_every != 0
+    report = progress.ConsoleProgress(interval=args.interval, percent_step=args.percent_step)
+    simulation.main(report, masses, x0s, y0s, vx0s, vy0s, length, samples, frames, not args.no_plot,
+                    force_backend=args.solver, output_dir=args.output, stream=stream,
+                    names=names, save_csv=not args.no_csv, integrator=args.integrator,
+                    force_options=force_options(args), keep_frames=args.keep_frames,
+                    renderer=args.renderer, render_workers=args.render_workers,
+                    plot_resolution=args.plot_resolution, checkpoint_every=args.checkpoint_every,
+                    resume=args.resume, profile=args.profile or args.profile_memory,
+                    profile_memory=args.profile_memory, softening=args.softening,
+                    collision_radius=args.collision_radius, precision=args.precision)
+
+
+if __name__ == '__main__':
+    main()
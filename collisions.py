@@ -0,0 +1,162 @@
+# Gravity Simulation Project
+# ----------------------------------------------------------------------------------------------------------------------
+# This script is responsible for detecting collisions of the bodies and merging the colliding ones. Candidate pairs come
+# from a uniform grid hashed by the cells' coordinates, so the cost of a check grows with the amount of bodies instead
+# of the amount of pairs of bodies.
+
+import numpy as np
+
+# Offsets of the cells neighbouring a cell (and the cell itself), a pair of overlapping bodies is always in one of them
+NEIGHBOURS = tuple((dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1))
+
+# Multiplier mixing the cells' x coordinates into their hashes (the golden ratio's 64 bit fraction)
+HASH_MULTIPLIER = np.uint64(0x9E3779B97F4A7C15)
+
+# Cells' coordinates are clipped to this magnitude, so that bodies thrown extremely far still fit into 64 bit integers
+MAX_CELL = 2 ** 62
+
+
+def radii_of(masses, radius):
+    """
+    Function creating the collision radii of the bodies
+    :param masses: Numpy array containing masses of the bodies
+    :param radius: Float (the same radius for every body) or numpy array (a radius for every body), radius in metres
+    :return: Numpy array of floats, radius of every body
+    """
+    radii = np.array(np.broadcast_to(np.asarray(radius, dtype=np.float64), np.shape(masses)))
+    if (radii < 0).any():
+        raise ValueError('The collision radii cannot be negative')
+    return radii
+
+
+def _cell_hashes(cells_x, cells_y):
+    """
+    Function hashing the coordinates of cells of the grid, different cells may share a hash (their bodies are then
+    only checked in vain, never missed)
+    :param cells_x: Numpy array of integers, x coordinates of the cells
+    :param cells_y: Numpy array of integers, y coordinates of the cells
+    :return: Numpy array of unsigned 64 bit integers
+    """
+    return (cells_x.astype(np.uint64) * HASH_MULTIPLIER) ^ cells_y.astype(np.uint64)
+
+
+def candidate_pairs(masses, xs, ys, radii):
+    """
+    Function finding the pairs of bodies which may overlap with a uniform grid, whose cells are as large as the largest
+    body's diameter. Only the bodies with mass are put into the grid (two massless bodies do not collide), sorted by the
+    hashes of their cells, and every body is paired with the ones of its own and the 8 neighbouring cells
+    :param masses: Numpy array containing masses of the bodies
+    :param xs: Numpy array containing x coordinates of the bodies
+    :param ys: Numpy array containing y coordinates of the bodies
+    :param radii: Numpy array containing collision radii of the bodies
+    :return: Tuple of numpy arrays of indices of the first and the second bodies of the pairs (first < second)
+    """
+    colliding = np.flatnonzero(radii > 0)
+    sources = colliding[masses[colliding] != 0]
+    if len(sources) == 0 or len(colliding) < 2:
+        return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp)
+    cell = 2 * radii[colliding].max()
+    cells_x = np.clip(np.floor(xs[colliding] / cell), -MAX_CELL, MAX_CELL).astype(np.int64)
+    cells_y = np.clip(np.floor(ys[colliding] / cell), -MAX_CELL, MAX_CELL).astype(np.int64)
+    # Grid of the bodies with mass: their hashes in order, and the first body and amount of bodies of every hash
+    source_hashes = _cell_hashes(cells_x, cells_y)[masses[colliding] != 0]
+    order = np.argsort(source_hashes, kind='stable')
+    hashes, firsts, amounts = np.unique(source_hashes[order], return_index=True, return_counts=True)
+    sources = sources[order]
+
+    pairs_first = []
+    pairs_second = []
+    for dx, dy in NEIGHBOURS:
+        neighbours = _cell_hashes(cells_x + dx, cells_y + dy)
+        found = np.minimum(np.searchsorted(hashes, neighbours), len(hashes) - 1)
+        found[hashes[found] != neighbours] = -1
+        queries = np.flatnonzero(found >= 0)
+        counts = amounts[found[queries]]
+        first = np.repeat(colliding[queries], counts)
+        offsets = np.arange(len(first)) - np.repeat(np.cumsum(counts) - counts, counts)
+        second = sources[np.repeat(firsts[found[queries]], counts) + offsets]
+        # A pair of two bodies with mass is found from both of them, it is kept from its lower index
+        kept = (first < second) | (masses[first] == 0)
+        pairs_first.append(np.minimum(first[kept], second[kept]))
+        pairs_second.append(np.maximum(first[kept], second[kept]))
+    # Neighbouring cells sharing a hash repeat some pairs, which does not change the result of a merge
+    return np.concatenate(pairs_first), np.concatenate(pairs_second)
+
+
+def find_collisions(masses, xs, ys, radii):
+    """
+    Function finding the pairs of overlapping bodies (closer than the sum of their radii)
+    :param masses: Numpy array containing masses of the bodies
+    :param xs: Numpy array containing x coordinates of the bodies
+    :param ys: Numpy array containing y coordinates of the bodies
+    :param radii: Numpy array containing collision radii of the bodies
+    :return: Tuple of numpy arrays of indices of the first and the second bodies of the pairs
+    """
+    first, second = candidate_pairs(masses, xs, ys, radii)
+    x_r = xs[second] - xs[first]
+    y_r = ys[second] - ys[first]
+    reach = radii[first] + radii[second]
+    overlapping = x_r * x_r + y_r * y_r < reach * reach
+    return first[overlapping], second[overlapping]
+
+
+def _groups(n, first, second):
+    """
+    Function finding the groups of bodies connected by collisions (a body hit by two others merges with both of them)
+    :param n: Integer, amount of bodies
+    :param first: Numpy array of indices of the first bodies of the colliding pairs
+    :param second: Numpy array of indices of the second bodies of the colliding pairs
+    :return: Numpy array, the lowest index of the group of every body
+    """
+    labels = np.arange(n)
+    while True:
+        lowest = np.minimum(labels[first], labels[second])
+        previous = labels.copy()
+        np.minimum.at(labels, first, lowest)
+        np.minimum.at(labels, second, lowest)
+        labels = labels[labels]
+        if np.array_equal(labels, previous):
+            return labels
+
+
+def merge(masses, xs, ys, vxs, vys, radii, ids):
+    """
+    Function merging every group of overlapping bodies into its heaviest body, which moves to the group's centre of mass
+    with the group's momentum and whose volume is the sum of the group's volumes. The merged bodies are removed from the
+    arrays, which keep their order otherwise (so the bodies with mass stay before the massless ones)
+    :param masses: Numpy array containing masses of the bodies
+    :param xs: Numpy array containing x coordinates of the bodies
+    :param ys: Numpy array containing y coordinates of the bodies
+    :param vxs: Numpy array containing x components of the velocities of the bodies
+    :param vys: Numpy array containing y components of the velocities of the bodies
+    :param radii: Numpy array containing collision radii of the bodies
+    :param ids: Numpy array containing the original indices of the bodies (see simulation.main)
+    :return: Tuple of the seven arrays without the merged bodies, None if no bodies collided
+    """
+    first, second = find_collisions(masses, xs, ys, radii)
+    if len(first) == 0:
+        return None
+    labels = _groups(len(masses), first, second)
+    # Bodies merged into another one and the bodies they are merged into
+    members = np.flatnonzero(labels != np.arange(len(masses)))
+    members = np.union1d(members, labels[members])
+    groups, group_of = np.unique(labels[members], return_inverse=True)
+
+    # The heaviest body of a group survives (the lowest index of the heaviest ones)
+    by_mass = np.lexsort((members, -masses[members], group_of))
+    starts = np.flatnonzero(np.r_[True, group_of[by_mass][1:] != group_of[by_mass][:-1]])
+    survivors = members[by_mass[starts]]
+
+    group_mass = np.bincount(group_of, masses[members], len(groups))
+    merged = [np.bincount(group_of, masses[members] * values[members], len(groups)) / group_mass
+              for values in (xs, ys, vxs, vys)]
+    masses, xs, ys, vxs, vys, radii = (np.array(values, dtype=np.float64) for values in (masses, xs, ys, vxs, vys,
+                                                                                        radii))
+    masses[survivors] = group_mass
+    xs[survivors], ys[survivors], vxs[survivors], vys[survivors] = merged
+    radii[survivors] = np.cbrt(np.bincount(group_of, radii[members] ** 3, len(groups)))
+
+    kept = np.ones(len(masses), dtype=bool)
+    kept[members] = False
+    kept[survivors] = True
+    return masses[kept], xs[kept], ys[kept], vxs[kept], vys[kept], radii[kept], ids[kept]
@@ -0,0 +1,316 @@
+# Gravity Simulation Project
+# ----------------------------------------------------------------------------------------------------------------------
+# This script runs ensembles of simulations: many members created from a base scenario by perturbing its masses,
+# positions and velocities and by sweeping its settings, run in parallel worker processes.
+
+import argparse
+import itertools
+import os
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import partial
+import numpy as np
+import forces
+import integrators
+import progress as progress_module
+import scenarios
+import simulation
+import trajectory
+
+# A member of an ensemble: its name (and output directory), the starting conditions of its bodies and its settings
+Member = namedtuple('Member', ['name', 'masses', 'xs', 'ys', 'vxs', 'vys', 'samples', 'integrator', 'force_backend',
+                               'parameters'])
+
+# Keys of a sweep specification (see make_members) and their default values
+SWEEP_DEFAULTS = {
+    'members': 1,  # Amount of members for every combination of the swept settings
+    'seed': None,  # Seed of the perturbations (None for a random one)
+    'include_base': True,  # True if the first member of every combination is not perturbed
+    'mass_scale': 0.0,  # Relative standard deviations of the perturbations of masses, positions and velocities
+    'position_scale': 0.0,
+    'velocity_scale': 0.0,
+    'samples': None,  # Lists of the swept amounts of samples, integrators and force backends (None for the defaults)
+    'integrator': None,
+    'force_backend': None,
+}
+
+# Columns of the summary table
+SUMMARY_COLUMNS = ('name', 'samples', 'integrator', 'force_backend', 'energy_drift', 'momentum_drift', 'time',
+                   'steps_per_second')
+
+
+def make_members(masses, xs, ys, vxs, vys, samples, spec, integrator='leapfrog', force_backend='auto'):
+    """
+    Function creating the members of an ensemble. Every combination of the swept settings gets spec['members'] members,
+    whose masses, coordinates and velocities' components are multiplied by 1 + scale * (standard normal noise). Every
+    member has its own seed derived from spec['seed'], so an ensemble is reproducible
+    :param masses: Numpy array, masses of the bodies of the base scenario
+    :param xs: Numpy array, X starting coordinates of the bodies
+    :param ys: Numpy array, Y starting coordinates of the bodies
+    :param vxs: Numpy array, X starting velocities' components of the bodies
+    :param vys: Numpy array, Y starting velocities' components of the bodies
+    :param samples: Integer, amount of samples of the base scenario
+    :param spec: Dictionary, sweep specification (see SWEEP_DEFAULTS' keys)
+    :param integrator: String, integrator used unless the integrators are swept
+    :param force_backend: String, force backend used unless the force backends are swept
+    :return: List of Member named tuples
+    """
+    unknown = set(spec) - set(SWEEP_DEFAULTS)
+    if unknown:
+        raise ValueError(f'Unknown sweep settings: {", ".join(sorted(unknown))}')
+    spec = {**SWEEP_DEFAULTS, **spec}
+    grid = list(itertools.product(spec['samples'] or [samples], spec['integrator'] or [integrator],
+                                  spec['force_backend'] or [force_backend]))
+    seeds = np.random.SeedSequence(spec['seed']).spawn(len(grid) * spec['members'])
+    members = []
+    for (member_samples, member_integrator, member_backend), copy in itertools.product(grid, range(spec['members'])):
+        index = len(members)
+        seed = seeds[index]
+        rng = np.random.default_rng(seed)
+        perturbed = copy != 0 or not spec['include_base']
+        values = []
+        for array, scale in ((masses, spec['mass_scale']), (xs, spec['position_scale']), (ys, spec['position_scale']),
+                             (vxs, spec['velocity_scale']), (vys, spec['velocity_scale'])):
+            noise = rng.standard_normal(len(array))
+            values.append(array * (1 + scale * noise) if perturbed and scale else np.array(array, dtype=float))
+        parameters = {'copy': copy, 'perturbed': perturbed, 'seed': seed.entropy, 'spawn_key': seed.spawn_key}
+        members.append(Member(f'member_{index:04d}', *values, int(member_samples), member_integrator, member_backend,
+                              parameters))
+    return members
+
+
+def diagnostics(masses, first, last, softening=0.0):
+    """
+    Function measuring how well the conserved quantities were kept by a simulation
+    :param masses: Numpy array containing masses of the bodies
+    :param first: Tuple of numpy arrays containing x, y, vx and vy of the bodies at the beginning
+    :param last: Tuple of numpy arrays containing x, y, vx and vy of the bodies at the end
+    :param softening: Float, Plummer softening length of the attraction (see forces.SOFTENING)
+    :return: Dictionary with the relative drift of the total energy and the drift of the total momentum relative to the
+    sum of the bodies' momenta magnitudes
+    """
+    energy_0 = integrators.total_energy(masses, *first, softening=softening)
+    energy_1 = integrators.total_energy(masses, *last, softening=softening)
+    momentum_0 = np.array([np.sum(masses * first[2]), np.sum(masses * first[3])])
+    momentum_1 = np.array([np.sum(masses * last[2]), np.sum(masses * last[3])])
+    scale = np.sum(masses * np.hypot(first[2], first[3]))
+    return {'energy_drift': float(abs((energy_1 - energy_0) / energy_0)) if energy_0 else float('nan'),
+            'momentum_drift': float(np.hypot(*(momentum_1 - momentum_0)) / scale) if scale else float('nan')}
+
+
+def _result(member, directory, elapsed, first, last, softening):
+    """
+    Function creating the summary row of a finished member (its drifts are NaN if some of its bodies merged)
+    """
+    return {'name': member.name, 'directory': directory, 'samples': member.samples, 'integrator': member.integrator,
+            'force_backend': member.force_backend, **diagnostics(member.masses, first, last, softening),
+            'time': elapsed,
+            'steps_per_second': member.samples / elapsed if elapsed else float('inf'), **member.parameters}
+
+
+def _run_member(member, length, output_dir, options):
+    """
+    Function running a single member with simulation.main in a worker process
+    :return: List with the summary row of the member
+    """
+    directory = os.path.join(output_dir, member.name)
+    os.makedirs(directory, exist_ok=True)
+    start = time.perf_counter()
+    simulation.main(progress_module.Progress(), member.masses, member.xs, member.ys, member.vxs, member.vys, length,
+                    member.samples, output_dir=directory, stream=True, integrator=member.integrator,
+                    force_backend=member.force_backend, **options)
+    elapsed = time.perf_counter() - start
+    data = trajectory.TrajectoryReader(os.path.join(directory, 'trajectory.bin'))
+    first = tuple(column[0] for column in data.read(slice(0, 1))[1:])
+    last = tuple(column[0] for column in data.read(slice(len(data) - 1, len(data)))[1:])
+    return [_result(member, directory, elapsed, first, last, options.get('softening', 0.0))]
+
+
+def _run_batch(members, length, output_dir, options):
+    """
+    Function running members of the same size and settings together in a worker process, their bodies are stacked into
+    arrays of shape (members, bodies) and advanced by a single integrator, which removes the per-step overhead of every
+    member for tiny systems. The samples of every member are streamed into its own trajectory file
+    :return: List with the summary rows of the members
+    """
+    samples = members[0].samples
+    dt = length / samples
+    masses, xs, ys, vxs, vys = (np.stack([getattr(member, field) for member in members])
+                                for field in ('masses', 'xs', 'ys', 'vxs', 'vys'))
+    softening = options.get('softening', 0.0)
+    integrator = integrators.get_integrator(members[0].integrator,
+                                            partial(forces.accelerations_batched, softening=softening))
+    directories = [os.path.join(output_dir, member.name) for member in members]
+    writers = []
+    for member, directory in zip(members, directories):
+        os.makedirs(directory, exist_ok=True)
+        writers.append(trajectory.TrajectoryWriter(os.path.join(directory, 'trajectory.bin'), member.masses, dt))
+    first = xs, ys, vxs, vys
+    start = time.perf_counter()
+    t = 0
+    for i, writer in enumerate(writers):
+        writer.append(t, xs[i], ys[i], vxs[i], vys[i])
+    for _ in range(samples):
+        xs, ys, vxs, vys = integrator.step(masses, xs, ys, vxs, vys, dt)
+        t += dt
+        for i, writer in enumerate(writers):
+            writer.append(t, xs[i], ys[i], vxs[i], vys[i])
+    for writer in writers:
+        writer.close()
+    # The members shared the time, every one of them is charged an equal part of it
+    elapsed = (time.perf_counter() - start) / len(members)
+    results = []
+    for i, (member, directory) in enumerate(zip(members, directories)):
+        if options.get('plot_graph'):
+            data = trajectory.TrajectoryReader(os.path.join(directory, 'trajectory.bin'))
+            simulation.plot(data, len(member.masses), os.path.join(directory, 'plot.png'))
+        results.append(_result(member._replace(force_backend='batched'), directory, elapsed,
+                               tuple(array[i] for array in first), (xs[i], ys[i], vxs[i], vys[i]), softening))
+    return results
+
+
+def _batches(members, batch_size):
+    """
+    Function grouping the members which can be integrated together: same amount of bodies, samples and integrator
+    :return: List of lists of members, each at most batch_size long
+    """
+    groups = {}
+    for member in members:
+        if member.integrator == 'adaptive':
+            raise ValueError('The adaptive integrator cannot run batched members')
+        groups.setdefault((len(member.masses), member.samples, member.integrator), []).append(member)
+    return [group[start:start + batch_size] for group in groups.values() for start in range(0, len(group), batch_size)]
+
+
+def run_ensemble(progress, members, length, output_dir='./ensemble', workers=None, batched=False, batch_size=256,
+                 frames=0, plot_graph=False, save_csv=False, **options):
+    """
+    Function running the members of an ensemble in parallel worker processes, every member writes into its own
+    directory. A summary table of every member's diagnostics and timings is saved into output_dir/summary.csv
+    :param progress: progress.Progress class object receiving the progress (e.g. from the console)
+    :param members: List of Member named tuples (see make_members)
+    :param length: Float, length of the simulations in seconds
+    :param output_dir: String, directory where the members' directories and the summary are saved
+    :param workers: Integer, amount of worker processes (None for the amount of CPUs, 0 to run in the calling process)
+    :param batched: Boolean, True if members of the same size and settings should be integrated together as arrays of
+    shape (members, bodies), which is much faster for many tiny systems (the force backend is then always an exact
+    vectorized one and no videos are created), False to run every member with simulation.main
+    :param batch_size: Integer, maximum amount of members integrated together
+    :param frames: Integer, amount of frames of every member's video (0 for no videos)
+    :param plot_graph: Boolean, True if a graph should be plotted for every member, False otherwise
+    :param save_csv: Boolean, True if every member's trajectory should be exported into a csv file, False otherwise
+    :param options: Other keyword arguments of simulation.main (e.g. force_options)
+    :return: List of dictionaries, the summary rows of the members in their order
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    if batched:
+        if np.any(options.get('collision_radius', 0.0)):
+            raise ValueError('Batched members cannot collide')
+        batch_options = {'plot_graph': plot_graph, 'softening': options.get('softening', 0.0)}
+        tasks = [(_run_batch, batch, batch_options) for batch in _batches(members, batch_size)]
+    else:
+        options = {'frames': frames, 'plot_graph': plot_graph, 'save_csv': save_csv, **options}
+        tasks = [(_run_member, member, options) for member in members]
+    progress.status(f'Running {len(members)} members in {len(tasks)} tasks')
+    results = []
+    progress.reset()
+    if workers == 0:
+        for function, task, task_options in tasks:
+            results.extend(function(task, length, output_dir, task_options))
+            progress.update(len(results), len(members), 'Member')
+    else:
+        with ProcessPoolExecutor(workers) as executor:
+            futures = [executor.submit(function, task, length, output_dir, task_options)
+                       for function, task, task_options in tasks]
+            for future in as_completed(futures):
+                results.extend(future.result())
+                progress.update(len(results), len(members), 'Member')
+    order = {member.name: index for index, member in enumerate(members)}
+    results.sort(key=lambda result: order[result['name']])
+    save_summary(results, os.path.join(output_dir, 'summary.csv'))
+    progress.status(summary_table(results))
+    return results
+
+
+def save_summary(results, path):
+    """
+    Function saving the summary rows into a csv file
+    :param results: List of dictionaries (see run_ensemble)
+    :param path: String, path of the csv file
+    :return: None
+    """
+    with open(path, mode='w') as file:
+        file.write(','.join(SUMMARY_COLUMNS) + '\n')
+        for result in results:
+            file.write(','.join(str(result[column]) for column in SUMMARY_COLUMNS) + '\n')
+
+
+def summary_table(results):
+    """
+    Function formatting the summary rows as a table
+    :param results: List of dictionaries (see run_ensemble)
+    :return: String
+    """
+    lines = [f'{"Member":<14}{"Samples":>9}  {"Integrator":<11}{"Solver":<12}{"Energy drift":>14}'
+             f'{"Momentum drift":>16}{"Time [s]":>10}{"Steps/s":>11}']
+    for result in results:
+        lines.append(f'{result["name"]:<14}{result["samples"]:>9}  {result["integrator"]:<11}'
+                     f'{result["force_backend"]:<12}{result["energy_drift"]:>14.3e}{result["momentum_drift"]:>16.3e}'
+                     f'{result["time"]:>10.3f}{result["steps_per_second"]:>11.0f}')
+    return '\n'.join(lines)
+
+
+def parse_arguments(arguments=None):
+    """
+    Function parsing the command line arguments
+    :param arguments: List of strings (None for sys.argv)
+    :return: argparse.Namespace
+    """
+    parser = argparse.ArgumentParser(description='Run an ensemble of perturbed simulations of a scenario.')
+    parser.add_argument('scenario', help="name of the scenario file, e.g. 'Earth Moon.txt'")
+    parser.add_argument('--path', default=scenarios.DEFAULT_PATH, help='directory where the scenario is located')
+    parser.add_argument('--length', type=float, help="length of the simulations in seconds (scenario's suggestion by "
+                                                     "default)")
+    parser.add_argument('--samples', type=int, nargs='+', help="swept amounts of samples (scenario's suggestion by "
+                                                               "default)")
+    parser.add_argument('--integrator', nargs='+', default=['leapfrog'], choices=integrators.INTEGRATORS,
+                        help='swept integrators')
+    parser.add_argument('--solver', nargs='+', default=['auto'], choices=forces.FORCE_BACKENDS,
+                        help='swept force backends')
+    parser.add_argument('--members', type=int, default=8, help='amount of members for every combination of the swept '
+                                                               'settings')
+    parser.add_argument('--seed', type=int, help='seed of the perturbations')
+    parser.add_argument('--mass-scale', type=float, default=0.0, help='relative standard deviation of the masses')
+    parser.add_argument('--position-scale', type=float, default=0.0, help='relative standard deviation of the '
+                                                                          'coordinates')
+    parser.add_argument('--velocity-scale', type=float, default=0.0, help="relative standard deviation of the "
+                                                                          "velocities' components")
+    parser.add_argument('--workers', type=int, help='amount of worker processes (amount of CPUs by default, 0 to run '
+                                                    'in this process)')
+    parser.add_argument('--batched', action='store_true', help='integrate members of the same settings together')
+    parser.add_argument('--output', default='./ensemble', help='directory where the members and the summary are saved')
+    parser.add_argument('--plot', action='store_true', help="plot every member's graph")
+    return parser.parse_args(arguments)
+
+
+def main(arguments=None):
+    """
+    Function running an ensemble of a scenario with the settings given in the command line
+    :param arguments: List of strings (None for sys.argv)
+    :return: List of dictionaries, the summary rows of the members
+    """
+    args = parse_arguments(arguments)
+    timeframe, samples = scenarios.show_scenario(args.scenario, args.path)[:2]
+    masses, xs, ys, vxs, vys = scenarios.load_scenario(args.scenario, args.path)
+    length = args.length if args.length is not None else float(timeframe)
+    spec = {'members': args.members, 'seed': args.seed, 'mass_scale': args.mass_scale,
+            'position_scale': args.position_scale, 'velocity_scale': args.velocity_scale,
+            'samples': args.samples, 'integrator': args.integrator, 'force_backend': args.solver}
+    members = make_members(masses, xs, ys, vxs, vys, int(samples), spec)
+    return run_ensemble(progress_module.ConsoleProgress(interval=1.0), members, length, args.output, args.workers,
+                        args.batched, plot_graph=args.plot)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,649 @@
+# Gravity Simulation Project
+# ----------------------------------------------------------------------------------------------------------------------
+# This script is responsible for calculating gravitational accelerations of the bodies.
+
+from collections import namedtuple
+from functools import partial
+from multiprocessing import shared_memory
+import multiprocessing
+import os
+import weakref
+import numpy as np
+import kernels
+
+# Defining gravitational constant
+G = 6.67430e-11
+
+# Plummer softening length in metres: the attraction of two bodies at a distance r is G * m / (r^2 + softening^2)
+# instead of G * m / r^2, so that it stays finite in close encounters (0 for the exact Newtonian attraction)
+SOFTENING = 0.0
+
+# Maximum amount of (target, source) pairs evaluated at once by the vectorized kernel, bounds its memory usage
+TILE_ELEMENTS = 1 << 20
+
+# Barnes-Hut settings: opening angle, maximum amount of bodies in a leaf of the quadtree, maximum depth of the quadtree
+# and amount of targets traversing the quadtree at once
+THETA = 0.5
+LEAF_SIZE = 8
+MAX_DEPTH = 24
+BARNES_HUT_TILE = 4096
+
+# Amount of targets in a single task of the parallel backend. The targets are always split into the same blocks, so the
+# results do not depend on the amount of workers
+PARALLEL_BLOCK = 1024
+# Options of the backends which do not change the calculated accelerations
+NEUTRAL_OPTIONS = ('workers',)
+
+# Array-backed quadtree. Sources are sorted along a Z-order curve (order), so every node covers a contiguous range
+# [start, start + count) of them. Children of a node are the nodes [first_child, first_child + children), leaves have
+# first_child equal -1. Offset is the distance between node's centre of mass and the centre of its square
+QuadTree = namedtuple('QuadTree', ['order', 'mass', 'com_x', 'com_y', 'size', 'offset', 'start', 'count',
+                                   'first_child', 'children'])
+
+
+def _sources(masses):
+    """
+    Function finding the bodies with mass, the only ones attracting other bodies
+    :param masses: Numpy array containing masses of the bodies
+    :return: Tuple of a numpy array of indices of the bodies with mass and an index selecting them from the bodies'
+    arrays, a slice (so no copies are made) when they are stored before all the massless bodies
+    """
+    sources = np.flatnonzero(masses)
+    if len(sources) and sources[-1] == len(sources) - 1:
+        return sources, slice(0, len(sources))
+    return sources, sources
+
+
+def _self_pairs(sources, tile):
+    """
+    Function finding the (target, source) pairs of a tile in which a body would attract itself
+    :param sources: Numpy array of sorted indices of the bodies with mass
+    :param tile: Numpy array of indices of the targets
+    :return: Tuple of numpy arrays containing rows (targets) and columns (sources) of such pairs
+    """
+    columns = np.searchsorted(sources, tile)
+    rows = np.flatnonzero(columns < len(sources))
+    rows = rows[sources[columns[rows]] == tile[rows]]
+    return rows, columns[rows]
+
+
+def accelerations_loop(masses, xs, ys, targets=None, softening=SOFTENING):
+    """
+    Function calculating accelerations of the bodies by looping over every pair of bodies
+    :param masses: Numpy array containing masses of the bodies
+    :param xs: Numpy array containing x coordinates of the bodies
+    :param ys: Numpy array containing y coordinates of the bodies
+    :param targets: Numpy array of indices of the bodies for which to calculate accelerations (None for all of them)
+    :param softening: Float, Plummer softening length (see SOFTENING)
+    :return: Tuple of numpy arrays containing x and y components of the accelerations of the targets
+    """
+    if targets is None:
+        targets = range(len(masses))
+    a_xs = []
+    a_ys = []
+    # Bodies with no mass do not attract anything
+    sources = [j for j in range(len(masses)) if masses[j] != 0]
+
+    # Looping over all the targets and adding acceleration caused by every other body
+    for i in targets:
+        a_x = 0
+        a_y = 0
+        for j in sources:
+            # No body attracts itself
+            if i == j:
+                continue
+            x_r = xs[j] - xs[i]
+            y_r = ys[j] - ys[i]
+            r = (x_r ** 2 + y_r ** 2 + softening ** 2) ** 0.5
+
+            # Contribution from the jth mass
+            a = G * masses[j] / (r * r)
+            a_x += a * x_r / r
+            a_y += a * y_r / r
+        a_xs.append(a_x)
+        a_ys.append(a_y)
+
+    return np.array(a_xs, dtype=float), np.array(a_ys, dtype=float)
+
+
+def accelerations_vectorized(masses, xs, ys, targets=None, tile_size=None, softening=SOFTENING):
+    """
+    Function calculating accelerations of the bodies using broadcast arrays, evaluated in tiles of targets so that the
+    memory usage stays bounded for large amounts of bodies
+    :param masses: Numpy array containing masses of the bodies
+    :param xs: Numpy array containing x coordinates of the bodies
+    :param ys: Numpy array containing y coordinates of the bodies
+    :param targets: Numpy array of indices of the bodies for which to calculate accelerations (None for all of them)
+    :param tile_size: Integer, amount of targets evaluated at once (None to derive it from TILE_ELEMENTS)
+    :param softening: Float, Plummer softening length (see SOFTENING)
+    :return: Tuple of numpy arrays containing x and y components of the accelerations of the targets
+    """
+    if targets is None:
+        targets = np.arange(len(masses))
+    else:
+        targets = np.asarray(targets, dtype=np.intp)
+    a_x = np.zeros(len(targets))
+    a_y = np.zeros(len(targets))
+
+    # Only bodies with mass attract other bodies
+    sources, selection = _sources(masses)
+    if len(sources) == 0 or len(targets) == 0:
+        return a_x, a_y
+    gm = G * masses[selection]
+    source_xs = xs[selection]
+    source_ys = ys[selection]
+
+    if tile_size is None:
+        tile_size = max(1, TILE_ELEMENTS // len(sources))
+
+    for start in range(0, len(targets), tile_size):
+        tile = targets[start:start + tile_size]
+        x_r = source_xs[np.newaxis, :] - xs[tile, np.newaxis]
+        y_r = source_ys[np.newaxis, :] - ys[tile, np.newaxis]
+        r2 = x_r * x_r + y_r * y_r
+        if softening:
+            r2 += softening * softening
+        # No body attracts itself
+        rows, columns = _self_pairs(sources, tile)
+        r2[rows, columns] = np.inf
+        a_over_r = gm / (r2 * np.sqrt(r2))
+        a_x[start:start + tile_size] = (a_over_r * x_r).sum(axis=1)
+        a_y[start:start + tile_size] = (a_over_r * y_r).sum(axis=1)
+
+    return a_x, a_y
+
+
+def accelerations_compiled(masses, xs, ys, targets=None, softening=SOFTENING):
+    """
+    Function calculating accelerations of the bodies with a compiled kernel looping over every pair of bodies, which
+    allocates no temporary arrays and so has a far lower overhead than the vectorized backend for small amounts of
+    bodies (requires Numba, see kernels.AVAILABLE)
+    :param masses: Numpy array containing masses of the bodies
+    :param xs: Numpy array containing x coordinates of the bodies
+    :param ys: Numpy array containing y coordinates of the bodies
+    :param targets: Numpy array of indices of the bodies for which to calculate accelerations (None for all of them)
+    :param softening: Float, Plummer softening length (see SOFTENING)
+    :return: Tuple of numpy arrays containing x and y components of the accelerations of the targets
+    """
+    masses = np.asarray(masses, dtype=np.float64)
+    # The kernels read the positions and write the accelerations as (N, 2) blocks, like the ones of bodies.State
+    positions = np.stack((xs, ys), axis=1).astype(np.float64, copy=False)
+    if targets is None:
+        a = np.empty((len(masses), 2))
+        kernels.accelerations(G, softening * softening, masses, positions, a)
+    else:
+        targets = np.asarray(targets, dtype=np.intp)
+        a = np.empty((len(targets), 2))
+        kernels.target_accelerations(G, softening * softening, masses, positions, targets, a)
+    return a[:, 0], a[:, 1]
+
+
+def accelerations_batched(masses, xs, ys, softening=SOFTENING):
+    """
+    Function calculating accelerations of the bodies of many independent systems of the same size at once, bodies of
+    different systems do not attract each other. The systems are evaluated in tiles, so that the memory usage stays
+    bounded (see TILE_ELEMENTS)
+    :param masses: Numpy array of shape (systems, bodies) containing masses of the bodies
+    :param xs: Numpy array of shape (systems, bodies) containing x coordinates of the bodies
+    :param ys: Numpy array of shape (systems, bodies) containing y coordinates of the bodies
+    :param softening: Float, Plummer softening length (see SOFTENING)
+    :return: Tuple of numpy arrays of shape (systems, bodies) containing x and y components of the accelerations
+    """
+    systems, n = xs.shape
+    a_x = np.empty((systems, n))
+    a_y = np.empty((systems, n))
+    gm = G * np.broadcast_to(masses, xs.shape)
+    tile_size = max(1, TILE_ELEMENTS // (n * n))
+    diagonal = np.arange(n)
+    for start in range(0, systems, tile_size):
+        tile = slice(start, start + tile_size)
+        # Element [system, target, source] of the separations
+        x_r = xs[tile, np.newaxis, :] - xs[tile, :, np.newaxis]
+        y_r = ys[tile, np.newaxis, :] - ys[tile, :, np.newaxis]
+        r2 = x_r * x_r + y_r * y_r
+        if softening:
+            r2 += softening * softening
+        # No body attracts itself
+        r2[:, diagonal, diagonal] = np.inf
+        a_over_r = gm[tile, np.newaxis, :] / (r2 * np.sqrt(r2))
+        a_x[tile] = (a_over_r * x_r).sum(axis=2)
+        a_y[tile] = (a_over_r * y_r).sum(axis=2)
+    return a_x, a_y
+
+
+def timescales(masses, xs, ys, vxs, vys, targets=None, tile_size=None, softening=SOFTENING):
+    """
+    Function calculating the shortest time scale of the pairs of the bodies with the bodies with mass, used to choose
+    their timesteps. A pair's time scale is the time it takes to cover its distance at its relative speed or to fall
+    together, whichever is shorter, and it is the same for both of its bodies, so a tight pair (e.g. the Earth and the
+    Moon) is stepped together however strongly a third body attracts them
+    :param masses: Numpy array containing masses of the bodies
+    :param xs: Numpy array containing x coordinates of the bodies
+    :param ys: Numpy array containing y coordinates of the bodies
+    :param vxs: Numpy array containing x components of the velocities of the bodies
+    :param vys: Numpy array containing y components of the velocities of the bodies
+    :param targets: Numpy array of indices of the bodies for which to calculate time scales (None for all of them)
+    :param tile_size: Integer, amount of targets evaluated at once (None to derive it from TILE_ELEMENTS)
+    :param softening: Float, Plummer softening length (see SOFTENING)
+    :return: Numpy array containing time scales of the targets in seconds (inf if no body with mass attracts them)
+    """
+    if targets is None:
+        targets = np.arange(len(masses))
+    else:
+        targets = np.asarray(targets, dtype=np.intp)
+    scales = np.full(len(targets), np.inf)
+
+    sources, selection = _sources(masses)
+    if len(sources) == 0 or len(targets) == 0:
+        return scales
+    source_masses = masses[selection]
+    source_xs = xs[selection]
+    source_ys = ys[selection]
+    source_vxs = vxs[selection]
+    source_vys = vys[selection]
+
+    if tile_size is None:
+        tile_size = max(1, TILE_ELEMENTS // len(sources))
+
+    for start in range(0, len(targets), tile_size):
+        tile = targets[start:start + tile_size]
+        x_r = source_xs[np.newaxis, :] - xs[tile, np.newaxis]
+        y_r = source_ys[np.newaxis, :] - ys[tile, np.newaxis]
+        vx_r = source_vxs[np.newaxis, :] - vxs[tile, np.newaxis]
+        vy_r = source_vys[np.newaxis, :] - vys[tile, np.newaxis]
+        r2 = x_r * x_r + y_r * y_r
+        if softening:
+            r2 += softening * softening
+        gm = G * (source_masses[np.newaxis, :] + masses[tile, np.newaxis])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # Squares of the crossing and the free-fall time scales (fmin skips the crossing time of resting pairs)
+            squares = np.fmin(r2 / (vx_r * vx_r + vy_r * vy_r), r2 * np.sqrt(r2) / gm)
+        rows, columns = _self_pairs(sources, tile)
+        squares[rows, columns] = np.inf
+        scales[start:start + tile_size] = np.sqrt(squares.min(axis=1))
+
+    return scales
+
+
+def _spread_bits(values):
+    """
+    Function spreading the bits of integers, so that two of them can be interleaved into a Z-order (Morton) code
+    :param values: Numpy array of non-negative integers smaller than 2 ** 32
+    :return: Numpy array of integers with a zero bit inserted before every bit of the input
+    """
+    values = values.astype(np.uint64)
+    for shift, mask in ((16, 0x0000FFFF0000FFFF), (8, 0x00FF00FF00FF00FF), (4, 0x0F0F0F0F0F0F0F0F),
+                        (2, 0x3333333333333333), (1, 0x5555555555555555)):
+        values = (values | (values << np.uint64(shift))) & np.uint64(mask)
+    return values
+
+
+def build_quadtree(masses, xs, ys, leaf_size=LEAF_SIZE, max_depth=MAX_DEPTH):
+    """
+    Function building a quadtree of the bodies with mass, level by level, with every node stored in flat arrays
+    :param masses: Numpy array containing masses of the bodies
+    :param xs: Numpy array containing x coordinates of the bodies
+    :param ys: Numpy array containing y coordinates of the bodies
+    :param leaf_size: Integer, nodes with more bodies than that are subdivided
+    :param max_depth: Integer, maximum depth of the quadtree (nodes at that depth are leaves regardless of their size)
+    :return: QuadTree
+    """
+    sources = np.flatnonzero(masses)
+    x_min, y_min = xs[sources].min(), ys[sources].min()
+    root_size = max(xs[sources].max() - x_min, ys[sources].max() - y_min)
+    if root_size == 0:
+        root_size = 1.0
+    cells = 1 << max_depth
+    qx = np.minimum(((xs[sources] - x_min) / root_size * cells).astype(np.int64), cells - 1)
+    qy = np.minimum(((ys[sources] - y_min) / root_size * cells).astype(np.int64), cells - 1)
+    codes = _spread_bits(qx) | (_spread_bits(qy) << np.uint64(1))
+    sort = np.argsort(codes, kind='stable')
+    codes = codes[sort]
+    order = sources[sort]
+    qx = qx[sort]
+    qy = qy[sort]
+
+    # Cumulative sums of masses and mass moments, so that every node's mass and centre of mass are O(1) to calculate
+    m = masses[order]
+    cm = np.concatenate(([0.0], np.cumsum(m)))
+    cmx = np.concatenate(([0.0], np.cumsum(m * xs[order])))
+    cmy = np.concatenate(([0.0], np.cumsum(m * ys[order])))
+
+    starts = [np.array([0])]
+    counts = [np.array([len(order)])]
+    first_children = []
+    children = []
+    offset = 1
+    for level in range(max_depth + 1):
+        start, count = starts[-1], counts[-1]
+        split = np.flatnonzero(count > leaf_size) if level < max_depth else np.array([], dtype=np.int64)
+        first_child = np.full(len(start), -1)
+        n_children = np.zeros(len(start), dtype=np.int64)
+        if len(split) == 0:
+            first_children.append(first_child)
+            children.append(n_children)
+            break
+
+        # Children are runs of equal code prefixes inside the subdivided nodes
+        parent_start = start[split]
+        parent_end = parent_start + count[split]
+        inside = np.zeros(len(order) + 1, dtype=np.int64)
+        np.add.at(inside, parent_start, 1)
+        np.add.at(inside, parent_end, -1)
+        inside = np.cumsum(inside[:-1]) > 0
+        prefix = codes >> np.uint64(2 * (max_depth - level - 1))
+        boundary = np.ones(len(order), dtype=bool)
+        boundary[1:] = prefix[1:] != prefix[:-1]
+        boundary[parent_start] = True
+        child_start = np.flatnonzero(inside & boundary)
+        parent = np.searchsorted(parent_start, child_start, side='right') - 1
+        next_start = np.append(child_start[1:], len(order))
+        child_count = np.minimum(next_start, parent_end[parent]) - child_start
+
+        first_child[split] = offset + np.searchsorted(child_start, parent_start)
+        n_children[split] = np.bincount(parent, minlength=len(split))
+        first_children.append(first_child)
+        children.append(n_children)
+        offset += len(child_start)
+        starts.append(child_start)
+        counts.append(child_count)
+
+    levels = np.concatenate([np.full(len(start), level) for level, start in enumerate(starts)])
+    start = np.concatenate(starts)
+    count = np.concatenate(counts)
+    end = start + count
+    mass = cm[end] - cm[start]
+    com_x = (cmx[end] - cmx[start]) / mass
+    com_y = (cmy[end] - cmy[start]) / mass
+    size = root_size / (1 << levels)
+    # Centres of the nodes' squares from the cell of their first body
+    shift = max_depth - levels
+    centre_x = x_min + ((qx[start] >> shift) + 0.5) * size
+    centre_y = y_min + ((qy[start] >> shift) + 0.5) * size
+    offset = np.hypot(com_x - centre_x, com_y - centre_y)
+    return QuadTree(order, mass, com_x, com_y, size, offset, start, count, np.concatenate(first_children),
+                    np.concatenate(children))
+
+
+def _expand(ids, firsts, amounts):
+    """
+    Function expanding pairs (id, range) into pairs (id, element) for every element of every range
+    :param ids: Numpy array of ids
+    :param firsts: Numpy array of first elements of the ranges
+    :param amounts: Numpy array of lengths of the ranges
+    :return: Tuple of numpy arrays containing repeated ids and elements of the ranges
+    """
+    repeated = np.repeat(ids, amounts)
+    offsets = np.arange(len(repeated)) - np.repeat(np.cumsum(amounts) - amounts, amounts)
+    return repeated, np.repeat(firsts, amounts) + offsets
+
+
+def accelerations_barnes_hut(masses, xs, ys, targets=None, theta=THETA, leaf_size=LEAF_SIZE, softening=SOFTENING):
+    """
+    Function calculating accelerations of the bodies approximately with the Barnes-Hut algorithm: a node of the
+    quadtree far enough from a target ((node's size + offset of its centre of mass) / distance < theta) acts as a single
+    body at its centre of mass.
+    The quadtree is rebuilt on every call and traversed by all the targets of a tile at once
+    :param masses: Numpy array containing masses of the bodies
+    :param xs: Numpy array containing x coordinates of the bodies
+    :param ys: Numpy array containing y coordinates of the bodies
+    :param targets: Numpy array of indices of the bodies for which to calculate accelerations (None for all of them)
+    :param theta: Float, opening angle (0 gives exact results, larger values are faster and less accurate)
+    :param leaf_size: Integer, maximum amount of bodies in a leaf of the quadtree
+    :param softening: Float, Plummer softening length (see SOFTENING)
+    :return: Tuple of numpy arrays containing x and y components of the accelerations of the targets
+    """
+    if targets is None:
+        targets = np.arange(len(masses))
+    else:
+        targets = np.asarray(targets, dtype=np.intp)
+    a_x = np.zeros(len(targets))
+    a_y = np.zeros(len(targets))
+    if not masses.any() or len(targets) == 0:
+        return a_x, a_y
+
+    tree = build_quadtree(masses, xs, ys, leaf_size)
+    # Position of every body with mass in the quadtree's order (-1 for massless bodies)
+    rank = np.full(len(masses), -1)
+    rank[tree.order] = np.arange(len(tree.order))
+    theta2 = theta * theta
+    softening2 = softening * softening
+
+    for tile_start in range(0, len(targets), BARNES_HUT_TILE):
+        tile = targets[tile_start:tile_start + BARNES_HUT_TILE]
+        tile_x = np.zeros(len(tile))
+        tile_y = np.zeros(len(tile))
+        # Pairs (target within the tile, node) that still have to be visited, starting from the root
+        pair_target = np.arange(len(tile))
+        pair_node = np.zeros(len(tile), dtype=np.int64)
+        while len(pair_target):
+            body = tile[pair_target]
+            x_r = tree.com_x[pair_node] - xs[body]
+            y_r = tree.com_y[pair_node] - ys[body]
+            r2 = x_r * x_r + y_r * y_r
+            contains = (rank[body] >= tree.start[pair_node]) & (rank[body] < tree.start[pair_node] +
+                                                                tree.count[pair_node])
+            accept = ~contains & ((tree.size[pair_node] + tree.offset[pair_node]) ** 2 < theta2 * r2)
+            if accept.any():
+                s2 = r2[accept] + softening2
+                weight = G * tree.mass[pair_node[accept]] / (s2 * np.sqrt(s2))
+                tile_x += np.bincount(pair_target[accept], weight * x_r[accept], minlength=len(tile))
+                tile_y += np.bincount(pair_target[accept], weight * y_r[accept], minlength=len(tile))
+
+            opened = ~accept
+            leaf = opened & (tree.first_child[pair_node] < 0)
+            if leaf.any():  # Summing the contributions of leaf's bodies directly
+                nodes = pair_node[leaf]
+                leaf_target, position = _expand(pair_target[leaf], tree.start[nodes], tree.count[nodes])
+                source = tree.order[position]
+                dx = xs[source] - xs[tile[leaf_target]]
+                dy = ys[source] - ys[tile[leaf_target]]
+                d2 = dx * dx + dy * dy
+                # No body attracts itself (distinct bodies at the same position attract each other infinitely, as in
+                # the other backends)
+                valid = source != tile[leaf_target]
+                s2 = d2[valid] + softening2
+                weight = G * masses[source[valid]] / (s2 * np.sqrt(s2))
+                tile_x += np.bincount(leaf_target[valid], weight * dx[valid], minlength=len(tile))
+                tile_y += np.bincount(leaf_target[valid], weight * dy[valid], minlength=len(tile))
+
+            internal = opened & ~leaf
+            nodes = pair_node[internal]
+            pair_target, pair_node = _expand(pair_target[internal], tree.first_child[nodes], tree.children[nodes])
+        a_x[tile_start:tile_start + BARNES_HUT_TILE] = tile_x
+        a_y[tile_start:tile_start + BARNES_HUT_TILE] = tile_y
+
+    return a_x, a_y
+
+
+# Shared memory blocks attached by a worker process of the parallel backend, by their names
+_attached = {}
+
+
+def _attach(name):
+    """
+    Function attaching (once per worker process) a shared memory block created by ParallelForces
+    :param name: String, name of the shared memory block
+    :return: SharedMemory object
+    """
+    if name not in _attached:
+        for memory in _attached.values():
+            memory.close()
+        _attached.clear()
+        try:
+            _attached[name] = shared_memory.SharedMemory(name=name, track=False)
+        except TypeError:  # Python < 3.13 always tracks the block (in the resource tracker shared with the parent)
+            _attached[name] = shared_memory.SharedMemory(name=name)
+    return _attached[name]
+
+
+def _shared_arrays(buffer, n):
+    """
+    Function viewing a shared memory block as the arrays used by the parallel backend
+    :param buffer: Memory buffer of the block
+    :param n: Integer, amount of bodies
+    :return: Tuple of a (5, n) numpy array of floats (masses, x, y, x and y accelerations) and an array of target
+    indices
+    """
+    floats = np.ndarray((5, n), dtype=np.float64, buffer=buffer)
+    targets = np.ndarray(n, dtype=np.int64, buffer=buffer, offset=floats.nbytes)
+    return floats, targets
+
+
+def _parallel_block(task):
+    """
+    Function calculating accelerations of a block of targets in a worker process of the parallel backend
+    :param task: Tuple of the shared memory block's name, amount of bodies, the range of targets to calculate and the
+    softening length
+    :return: None, the accelerations are written into the shared memory block
+    """
+    name, n, start, stop, softening = task
+    floats, targets = _shared_arrays(_attach(name).buf, n)
+    masses, xs, ys, a_x, a_y = floats
+    a_x[start:stop], a_y[start:stop] = accelerations_vectorized(masses, xs, ys, targets[start:stop],
+                                                                softening=softening)
+
+
+def _release(pool, memory):
+    """
+    Function terminating the worker processes and freeing the shared memory of the parallel backend
+    """
+    if pool is not None:
+        pool.terminate()
+    if memory is not None:
+        memory.close()
+        memory.unlink()
+
+
+class ParallelForces:
+    def __init__(self, workers=None, block_size=PARALLEL_BLOCK, softening=SOFTENING):
+        """
+        Method initializing a ParallelForces class object, calculating exact accelerations with a pool of worker
+        processes reading the masses and positions from shared memory. The targets are split into blocks of a fixed
+        size, so the results are identical for any amount of workers
+        :param workers: Integer, amount of worker processes (None for the amount of CPUs, 1 to calculate serially)
+        :param block_size: Integer, amount of targets in a single task
+        :param softening: Float, Plummer softening length (see SOFTENING)
+        """
+        self.workers = workers if workers is not None else (os.cpu_count() or 1)
+        self.block_size = block_size
+        self.softening = softening
+        self._pool = None
+        self._memory = None
+        self._n = 0
+        self._finalizer = None
+
+    def _prepare(self, n):
+        """
+        Method starting the worker processes and (re)allocating the shared memory for a given amount of bodies
+        """
+        if self._memory is None or self._n != n:
+            if self._memory is not None:
+                self._memory.close()
+                self._memory.unlink()
+            self._memory = shared_memory.SharedMemory(create=True, size=6 * n * 8)
+            self._n = n
+            self._track()
+        if self._pool is None:
+            # The workers are started after the shared memory, so that they share the parent's resource tracker instead
+            # of starting their own ones, which would unlink the block when the workers exit
+            self._pool = multiprocessing.Pool(self.workers)
+            self._track()
+
+    def _track(self):
+        """
+        Method registering the current pool and shared memory to be released once the object is garbage collected,
+        replacing the registration of the previous ones
+        """
+        if self._finalizer is not None:
+            self._finalizer.detach()
+        self._finalizer = weakref.finalize(self, _release, self._pool, self._memory)
+
+    def __call__(self, masses, xs, ys, targets=None):
+        targets = np.arange(len(masses)) if targets is None else np.asarray(targets, dtype=np.int64)
+        blocks = [(start, min(start + self.block_size, len(targets)))
+                  for start in range(0, len(targets), self.block_size)]
+
+        if self.workers <= 1 or len(blocks) <= 1:  # Serial fallback, calculating the very same blocks
+            a_x = np.zeros(len(targets))
+            a_y = np.zeros(len(targets))
+            for start, stop in blocks:
+                a_x[start:stop], a_y[start:stop] = accelerations_vectorized(masses, xs, ys, targets[start:stop],
+                                                                            softening=self.softening)
+            return a_x, a_y
+
+        n = len(masses)
+        self._prepare(n)
+        floats, shared_targets = _shared_arrays(self._memory.buf, n)
+        floats[0] = masses
+        floats[1] = xs
+        floats[2] = ys
+        shared_targets[:len(targets)] = targets
+        self._pool.map(_parallel_block, [(self._memory.name, n, start, stop, self.softening)
+                                         for start, stop in blocks])
+        return floats[3, :len(targets)].copy(), floats[4, :len(targets)].copy()
+
+    def close(self):
+        """
+        Method terminating the worker processes and freeing the shared memory
+        """
+        if self._finalizer is not None:
+            self._finalizer()
+        self._pool = None
+        self._memory = None
+        self._finalizer = None
+
+
+FORCE_BACKENDS = {
+    # The exact backend with the lowest overhead available: compiled if Numba is installed, vectorized otherwise
+    'auto': accelerations_compiled if kernels.AVAILABLE else accelerations_vectorized,
+    'loop': accelerations_loop,
+    'vectorized': accelerations_vectorized,
+    'barnes-hut': accelerations_barnes_hut,
+    'parallel': ParallelForces,
+}
+if kernels.AVAILABLE:
+    FORCE_BACKENDS['compiled'] = accelerations_compiled
+
+
+def get_force_backend(name, **options):
+    """
+    Function returning the function calculating accelerations of a given name
+    :param name: String, name of the force backend, one of FORCE_BACKENDS' keys
+    :param options: Keyword arguments passed to the backend on every call (e.g. theta for 'barnes-hut', softening for
+    any backend) or to its constructor (e.g. workers for 'parallel')
+    :return: Function taking masses, x and y coordinates (and optionally targets) and returning accelerations, backends
+    holding resources (worker processes) also have a close() method
+    """
+    try:
+        backend = FORCE_BACKENDS[name]
+    except KeyError:
+        raise ValueError(f'Unknown force backend "{name}", available: {", ".join(FORCE_BACKENDS)}') from None
+    if isinstance(backend, type):
+        return backend(**options)
+    return partial(backend, **options) if options else backend
+
+
+def resolve_force_backend(name):
+    """
+    Function finding the name of the backend a given name stands for, e.g. 'compiled' or 'vectorized' for 'auto'
+    depending on whether Numba is installed
+    :param name: String, name of the force backend, one of FORCE_BACKENDS' keys
+    :return: String, name of the same backend other than 'auto'
+    """
+    try:
+        backend = FORCE_BACKENDS[name]
+    except KeyError:
+        raise ValueError(f'Unknown force backend "{name}", available: {", ".join(FORCE_BACKENDS)}') from None
+    return next(key for key, value in FORCE_BACKENDS.items() if value is backend and key != 'auto')
+
+
+def softening_of(accelerations):
+    """
+    Function finding the softening length used by a function calculating accelerations
+    :param accelerations: Function returned by get_force_backend
+    :return: Float, Plummer softening length (see SOFTENING)
+    """
+    if isinstance(accelerations, partial):
+        return accelerations.keywords.get('softening', SOFTENING)
+    return getattr(accelerations, 'softening', SOFTENING)
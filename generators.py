@@ -0,0 +1,177 @@
+# Gravity Simulation Project
+# ----------------------------------------------------------------------------------------------------------------------
+# This script generates starting conditions of large systems (a Plummer sphere, a Keplerian disk, an asteroid belt
+# around the heaviest body of a scenario) directly as arrays, and saves them as binary scenarios (see
+# scenarios.save_scenario).
+
+import argparse
+import os
+import numpy as np
+import forces
+import scenarios
+
+# Cumulative mass fraction at which the radii of a Plummer sphere are cut, otherwise a few bodies end up very far away
+PLUMMER_CUTOFF = 0.999
+
+
+def _directions(rng, n):
+    """
+    Function drawing uniformly distributed directions in the plane
+    :param rng: Numpy random generator
+    :param n: Integer, amount of directions
+    :return: Tuple of two numpy arrays, cosines and sines of the directions
+    """
+    angles = rng.uniform(0, 2 * np.pi, n)
+    return np.cos(angles), np.sin(angles)
+
+
+def _circular_velocities(rng, central_mass, enclosed_masses, r, n):
+    """
+    Function calculating velocities of bodies on counterclockwise circular orbits around the origin
+    :param rng: Numpy random generator
+    :param central_mass: Float, mass at the origin
+    :param enclosed_masses: Numpy array (or float), masses of the disk inside the orbits
+    :param r: Numpy array, radii of the orbits
+    :param n: Integer, amount of bodies
+    :return: Tuple of four numpy arrays, coordinates and velocities' components of the bodies
+    """
+    cos, sin = _directions(rng, n)
+    speeds = np.sqrt(forces.G * (central_mass + enclosed_masses) / r)
+    return r * cos, r * sin, -speeds * sin, speeds * cos
+
+
+def plummer_sphere(n, total_mass=2e30 * 1e4, scale_radius=1e16, seed=None):
+    """
+    Function generating a star cluster: radii follow the Plummer profile, M(<r) = M r^3 / (r^2 + a^2)^(3/2), and speeds
+    follow its isotropic distribution function (sampled by the rejection method of Aarseth, Henon and Wielen), with the
+    positions and velocities pointing in random directions of the plane.
+    This is an approximation: the profile and the escape speeds are the ones of a three-dimensional sphere, but the
+    bodies are laid out in the plane, where they are closer to each other than in the sphere. The cluster is therefore
+    not in virial equilibrium, 2 T / |W| is about 0.85 instead of 1, so it contracts a little before it settles
+    :param n: Integer, amount of bodies
+    :param total_mass: Float, mass of the whole cluster (split equally between the bodies)
+    :param scale_radius: Float, Plummer radius a, the core of the cluster
+    :param seed: Integer, seed of the random generator (None for a random one)
+    :return: Tuple of five numpy arrays, masses, coordinates and velocities' components of the bodies
+    """
+    rng = np.random.default_rng(seed)
+    fractions = rng.uniform(0, PLUMMER_CUTOFF, n)
+    r = scale_radius / np.sqrt(fractions ** (-2 / 3) - 1)
+    # Speeds are a fraction q of the local escape speed, with the probability density of q proportional to
+    # q^2 (1 - q^2)^(7/2), whose maximum is below 0.1
+    q = np.empty(n)
+    pending = np.arange(n)
+    while len(pending):
+        candidates = rng.uniform(0, 1, len(pending))
+        accepted = rng.uniform(0, 0.1, len(pending)) < candidates ** 2 * (1 - candidates ** 2) ** 3.5
+        q[pending[accepted]] = candidates[accepted]
+        pending = pending[~accepted]
+    speeds = q * np.sqrt(2 * forces.G * total_mass / np.sqrt(r ** 2 + scale_radius ** 2))
+    cos, sin = _directions(rng, n)
+    velocity_cos, velocity_sin = _directions(rng, n)
+    return np.full(n, total_mass / n), r * cos, r * sin, speeds * velocity_cos, speeds * velocity_sin
+
+
+def keplerian_disk(n, central_mass=2e30, r_min=5e10, r_max=5e11, disk_mass=0.0, seed=None):
+    """
+    Function generating a disk of bodies on circular orbits around a central body at the origin. The bodies are spread
+    uniformly over the area of the disk and orbit counterclockwise
+    :param n: Integer, amount of bodies of the disk (the central body is added as the first body)
+    :param central_mass: Float, mass of the central body
+    :param r_min: Float, inner radius of the disk
+    :param r_max: Float, outer radius of the disk
+    :param disk_mass: Float, mass of the whole disk (split equally between the bodies, 0 for massless bodies). The
+    orbital speeds include the mass of the disk inside every orbit
+    :param seed: Integer, seed of the random generator (None for a random one)
+    :return: Tuple of five numpy arrays, masses, coordinates and velocities' components of the bodies
+    """
+    rng = np.random.default_rng(seed)
+    areas = rng.uniform(0, 1, n)
+    r = np.sqrt(r_min ** 2 + areas * (r_max ** 2 - r_min ** 2))
+    xs, ys, vxs, vys = _circular_velocities(rng, central_mass, disk_mass * areas, r, n)
+    masses = np.full(n + 1, disk_mass / n if n else 0.0)
+    masses[0] = central_mass
+    return masses, np.concatenate(([0.0], xs)), np.concatenate(([0.0], ys)), np.concatenate(([0.0], vxs)),\
+        np.concatenate(([0.0], vys))
+
+
+def asteroid_belt(masses, xs, ys, vxs, vys, n, r_min=3.1e11, r_max=4.9e11, velocity_scatter=0.0, seed=None):
+    """
+    Function adding a belt of massless bodies on circular orbits around the heaviest body of a scenario, so that they
+    do not slow the simulation of the scenario down
+    :param masses: Numpy array, masses of the bodies of the scenario
+    :param xs: Numpy array, X starting coordinates of the bodies
+    :param ys: Numpy array, Y starting coordinates of the bodies
+    :param vxs: Numpy array, X starting velocities' components of the bodies
+    :param vys: Numpy array, Y starting velocities' components of the bodies
+    :param n: Integer, amount of asteroids
+    :param r_min: Float, inner radius of the belt (from the heaviest body)
+    :param r_max: Float, outer radius of the belt
+    :param velocity_scatter: Float, relative standard deviation of the asteroids' speeds (0 for circular orbits)
+    :param seed: Integer, seed of the random generator (None for a random one)
+    :return: Tuple of five numpy arrays, masses, coordinates and velocities' components of the bodies of the scenario
+    followed by the asteroids
+    """
+    rng = np.random.default_rng(seed)
+    center = np.argmax(masses)
+    r = np.sqrt(rng.uniform(r_min ** 2, r_max ** 2, n))
+    belt_xs, belt_ys, belt_vxs, belt_vys = _circular_velocities(rng, masses[center], 0.0, r, n)
+    if velocity_scatter:
+        factors = 1 + velocity_scatter * rng.standard_normal(n)
+        belt_vxs *= factors
+        belt_vys *= factors
+    return np.concatenate((masses, np.zeros(n))), np.concatenate((xs, belt_xs + xs[center])),\
+        np.concatenate((ys, belt_ys + ys[center])), np.concatenate((vxs, belt_vxs + vxs[center])),\
+        np.concatenate((vys, belt_vys + vys[center]))
+
+
+def parse_arguments(arguments=None):
+    """
+    Function parsing the command line arguments
+    :param arguments: List of strings (None for sys.argv)
+    :return: Namespace
+    """
+    parser = argparse.ArgumentParser(description='Generate a large scenario and save it in the binary format.')
+    parser.add_argument('generator', choices=('plummer', 'disk', 'belt'), help='system to generate')
+    parser.add_argument('name', help='name of the saved scenario (ending with ".npz")')
+    parser.add_argument('-n', '--bodies', type=int, default=100000, help='amount of generated bodies')
+    parser.add_argument('--seed', type=int, help='seed of the random generator')
+    parser.add_argument('--base', default=scenarios.DEFAULT_PATH + 'Solar System Planets.txt',
+                        help='path of the scenario around whose heaviest body the belt is added')
+    parser.add_argument('--path', default=scenarios.DEFAULT_PATH, help='directory of the scenarios')
+    parser.add_argument('--length', type=float, help='suggested timeframe in seconds (by default a year, or the '
+                                                     "base scenario's one)")
+    parser.add_argument('--samples', type=int, default=1200, help='suggested amount of samples')
+    parser.add_argument('--frames', type=int, default=300, help='suggested amount of frames')
+    return parser.parse_args(arguments)
+
+
+def main(arguments=None):
+    """
+    Function generating a scenario with the settings given in the command line
+    :param arguments: List of strings (None for sys.argv)
+    :return: None
+    """
+    args = parse_arguments(arguments)
+    length = 31557600.0
+    names = None
+    if args.generator == 'plummer':
+        # The default cluster needs about a hundred million years to evolve noticeably
+        length = 100 * 1e6 * 31557600.0
+        bodies = plummer_sphere(args.bodies, seed=args.seed)
+    elif args.generator == 'disk':
+        bodies = keplerian_disk(args.bodies, seed=args.seed)
+    else:
+        base_path, base_name = os.path.split(args.base)
+        base = scenarios.read_scenario(base_name, base_path)
+        length = float(base.timeframe)
+        bodies = asteroid_belt(*scenarios.load_scenario(base_name, base_path), args.bodies, seed=args.seed)
+        names = [str(name).strip() for name in base.names] + [''] * args.bodies
+    if args.length is not None:
+        length = args.length
+    scenarios.save_scenario(args.name, length, args.samples, args.frames, names, *bodies, path=args.path)
+    print(f'Saved {len(bodies[0])} bodies into "{args.name}"')
+
+
+if __name__ == '__main__':
+    main()
@@ -3,17 +3,42 @@
 # This script is the one that should be ran in order to run the program. It is responsible for the whole GUI.
 
 import sys
-import simulation
-import scenarios
-import os
-import time
-import tkinter as tk
-from tkinter import ttk
-from shutil import rmtree
+import queue
+import threading
+import matplotlib
+
+# The simulation plots in a background thread, so a non-interactive backend is used
+matplotlib.use('Agg')
+
+import numpy as np  # noqa: E402
+import checkpoint  # noqa: E402
+import live  # noqa: E402
+import rendering  # noqa: E402
+import simulation  # noqa: E402
+import scenarios  # noqa: E402
+import integrators  # noqa: E402
+import forces  # noqa: E402
+import progress  # noqa: E402
+import os  # noqa: E402
+import time  # noqa: E402
+import tkinter as tk  # noqa: E402
+import tkinter.messagebox  # noqa: E402
+from tkinter import ttk  # noqa: E402
+from shutil import rmtree  # noqa: E402
 
 HEIGHT = 600
 WIDTH = 800
 
+# Interval in milliseconds at which the GUI reads the progress of the simulation running in the background
+POLL_INTERVAL = 100
+
+# Interval in milliseconds between two frames of the live view (about 30 per second) and its canvas' size in pixels
+LIVE_INTERVAL = 33
+LIVE_SIZE = 600
+
+# Approximate amount of checkpoints saved during a simulation, so that it can be resumed after it was stopped
+CHECKPOINTS = 100
+
 YEAR = 31557600
 DAY = 86400
 
@@ -56,6 +81,98 @@ def is_float(string):
     return True
 
 
+class LiveView:
+    def __init__(self, master, live_simulation):
+        """
+        Method initializing a LiveView class object, a window drawing the bodies of a live.LiveSimulation at a fixed
+        rate (LIVE_INTERVAL), while the simulation calculates as many steps as it can in between. Every body is a single
+        item of the canvas, which is only moved from one frame to the next
+        :param master: tk.Tk() object
+        :param live_simulation: live.LiveSimulation class object (closed together with the window)
+        """
+        self.simulation = live_simulation
+        self.closed = False
+        self.top = tk.Toplevel(master)
+        self.top.title('Live view')
+        self.canvas = tk.Canvas(self.top, height=LIVE_SIZE, width=LIVE_SIZE, background='white')
+        self.canvas.pack()
+        self.toggle_button = tk.Button(self.top, text='Start', width=10, command=lambda: self.toggle())
+        self.toggle_button.pack(side=tk.LEFT)
+        self.info = tk.StringVar()
+        self.info_label = tk.Label(self.top, textvariable=self.info)
+        self.info_label.pack(side=tk.LEFT)
+
+        # The view spans the starting positions like the frames of the video (the simulation is paused until started)
+        state = live_simulation.state
+        self.limits = max(abs(state.xs).max(), abs(state.ys).max()) * simulation.LIMITS_MULTIPLIER
+        self.scale = LIVE_SIZE / (2 * self.limits)
+        sizes = simulation.scale_the_array(state.masses)
+        self.radii = np.sqrt(sizes).tolist()
+        colors = (rendering.body_colors(sizes)[:, :3] * 255).astype(np.int64)
+        self.items = [self.canvas.create_oval(0, 0, 0, 0, fill='#%02x%02x%02x' % tuple(color), outline='')
+                      for color in colors]
+        self.last_update = time.perf_counter(), 0
+        self.refresh()
+        self.top.protocol("WM_DELETE_WINDOW", self.close)
+
+    def draw(self, t, steps, positions):
+        """
+        Method moving the bodies' items to given positions
+        :param t: Float, time of the positions in seconds
+        :param steps: Integer, amount of steps done so far
+        :param positions: Numpy array of shape (N, 2) containing x and y coordinates of the bodies
+        """
+        # Bodies thrown out of the view stay just behind its edges, lost ones (NaN) are moved off the view
+        columns = np.clip(np.nan_to_num((positions[:, 0] + self.limits) * self.scale, nan=-LIVE_SIZE), -LIVE_SIZE,
+                          2 * LIVE_SIZE)
+        rows = np.clip(np.nan_to_num((self.limits - positions[:, 1]) * self.scale, nan=-LIVE_SIZE), -LIVE_SIZE,
+                       2 * LIVE_SIZE)
+        for item, x, y, radius in zip(self.items, columns.tolist(), rows.tolist(), self.radii):
+            self.canvas.coords(item, x - radius, y - radius, x + radius, y + radius)
+
+        now = time.perf_counter()
+        rate = (steps - self.last_update[1]) / max(now - self.last_update[0], 1e-9)
+        self.last_update = now, steps
+        self.info.set(f'{t / DAY:.1f} days, {steps} steps, {rate:.0f} steps/s')
+
+    def refresh(self):
+        """
+        Method drawing the current state of the simulation and scheduling the next frame
+        """
+        start = time.perf_counter()
+        snapshot = self.simulation.snapshot()
+        if snapshot is not None:
+            self.draw(*snapshot)
+        if self.simulation.error is not None:
+            self.toggle_button['text'] = 'Start'
+            self.toggle_button['state'] = tk.DISABLED
+            self.info.set(f'Simulation failed: {self.simulation.error}')
+        # Drawing takes a part of the interval, so that the frames keep their rate
+        elapsed = int((time.perf_counter() - start) * 1000)
+        self.job = self.top.after(max(LIVE_INTERVAL - elapsed, 1), self.refresh)
+
+    def toggle(self):
+        """
+        Method starting the paused simulation or pausing the running one
+        """
+        if self.simulation.running:
+            self.simulation.stop()
+            self.toggle_button['text'] = 'Start'
+        else:
+            self.simulation.start()
+            self.toggle_button['text'] = 'Stop'
+
+    def close(self):
+        """
+        Method stopping the simulation and closing the window
+        """
+        if not self.closed:
+            self.closed = True
+            self.top.after_cancel(self.job)
+            self.simulation.close()
+            self.top.destroy()
+
+
 class Application(tk.Frame):
     def __init__(self, master=None):
         """
@@ -67,6 +184,13 @@ class Application(tk.Frame):
         self.pack()
         self.create_widgets()
 
+        # Simulation running in a background thread, its progress events and the event cancelling it
+        self.worker = None
+        self.events = queue.Queue()
+        self.cancel = threading.Event()
+        self.closing = False
+        self.live_view = None
+
         # Protocol preventing the user from closing the application without terminating all the processes
         self.master.protocol("WM_DELETE_WINDOW", self.on_closing)
 
@@ -110,10 +234,40 @@ class Application(tk.Frame):
         self.frames_ent = tk.Entry(self.master)
         self.frames_ent.place(relx=0.7, rely=.8, anchor='center')
 
+        self.integrator_label = tk.Label(self.master, text='Integrator')
+        self.integrator_label.place(relx=.3, rely=.47, anchor='center')
+        self.integrator = tk.StringVar()
+        self.integrator.set('leapfrog')
+        self.integrator_menu = tk.OptionMenu(self.master, self.integrator, *integrators.INTEGRATORS)
+        self.integrator_menu.place(relx=.3, rely=.52, anchor='center')
+
+        self.solver_label = tk.Label(self.master, text='Force solver')
+        self.solver_label.place(relx=.55, rely=.47, anchor='center')
+        self.solver = tk.StringVar()
+        self.solver.set('auto')
+        self.solver_menu = tk.OptionMenu(self.master, self.solver, *forces.FORCE_BACKENDS)
+        self.solver_menu.place(relx=.55, rely=.52, anchor='center')
+
+        self.theta_label = tk.Label(self.master, text='Opening angle θ\n(Barnes-Hut only)')
+        self.theta_label.place(relx=.8, rely=.47, anchor='center')
+        self.theta_ent = tk.Entry(self.master, width=8)
+        self.theta_ent.insert(0, forces.THETA)
+        self.theta_ent.place(relx=.8, rely=.52, anchor='center')
+
         self.run_button = tk.Button(self.master, text="Run the simulation", font=40, command=lambda:
                                     self.run_simulation())
         self.run_button.place(relx=0.5, rely=0.9, relheight=0.1, relwidth=0.4, anchor='center')
 
+        self.cancel_button = tk.Button(self.master, text="Cancel", state=tk.DISABLED, command=lambda:
+                                       self.cancel_simulation())
+        self.cancel_button.place(relx=0.15, rely=0.9, relheight=0.1, relwidth=0.2, anchor='center')
+
+        self.resume_button = tk.Button(self.master, text="Resume", command=lambda: self.run_simulation(resume=True))
+        self.resume_button.place(relx=0.88, rely=0.07, relheight=0.06, relwidth=0.15, anchor='center')
+
+        self.live_button = tk.Button(self.master, text="Live view", command=lambda: self.open_live_view())
+        self.live_button.place(relx=0.12, rely=0.07, relheight=0.06, relwidth=0.15, anchor='center')
+
         self.bar = ttk.Progressbar(self.master, length=100, mode='determinate')
         self.bar.place(relx=.5, rely=.07, anchor='center')
 
@@ -127,18 +281,30 @@ class Application(tk.Frame):
         Method terminating all the processes of the program
         """
         if is_calculating:
-            if tk.messagebox.askokcancel("Quit", "Quitting will abort the simulation. Do you wish to quit?"):
-                self.master.destroy()
-                sys.exit(0)
+            if tk.messagebox.askokcancel("Quit", "Quitting will stop the simulation, it can be resumed later. Do you "
+                                                 "wish to quit?"):
+                # The window is closed once the simulation stops at the next sample and saves its partial results
+                self.closing = True
+                self.cancel_simulation()
         else:
+            self.close_live_view()
             self.master.destroy()
             sys.exit(0)
 
-    def run_simulation(self):
+    def cancel_simulation(self):
         """
-        Method running the simulation
+        Method stopping the running simulation at the next sample, the results calculated so far are still saved
         """
+        if is_calculating:
+            self.cancel.set()
+            self.cancel_button['state'] = tk.DISABLED
+            self.update_status('Cancelling the simulation')
 
+    def read_timestep(self):
+        """
+        Method reading the length and samples entered by the user, which set the timestep, warning about incorrect ones
+        :return: Tuple of the length in seconds and amount of samples, None if the input is incorrect
+        """
         seconds = self.seconds.get()
         days = self.days.get()
         years = self.years.get()
@@ -151,25 +317,90 @@ class Application(tk.Frame):
             years = 0
 
         samples = self.samples_ent.get()
-        frames = self.frames_ent.get()
-        if not (is_float(seconds) and is_float(days) and is_float(years)
-                and is_int(self.samples_ent.get()) and is_int(self.frames_ent.get())):
+        if not (is_float(seconds) and is_float(days) and is_float(years) and is_int(samples)):
             tk.messagebox.showwarning(title='Error', message='Incorrect input')
             return
-        else:
-            length = float(seconds) + float(days) * DAY + float(years) * YEAR
-            samples = int(samples)
-            frames = int(frames)
+        length = float(seconds) + float(days) * DAY + float(years) * YEAR
+        samples = int(samples)
         if length == 0 or samples == 0:
             tk.messagebox.showwarning(message='Length or samples cannot be equal 0')
             return
-        if length < samples:
-            tk.messagebox.showwarning(message='Each sample has to be at least 1 second long')
+        return length, samples
+
+    def read_settings(self):
+        """
+        Method reading the length, samples and frames entered by the user for a full run, warning about incorrect ones
+        :return: Tuple of the length in seconds, amount of samples and amount of frames, None if the input is incorrect
+        """
+        if not (is_float(self.theta_ent.get()) and is_int(self.frames_ent.get())):
+            tk.messagebox.showwarning(title='Error', message='Incorrect input')
+            return
+        timestep = self.read_timestep()
+        if timestep is None:
+            return
+        length, samples = timestep
+        frames = int(self.frames_ent.get())
         if frames != 0 and samples % frames != 0:
             tk.messagebox.showwarning(message='Amount of samples has to be a multiple of amount of frames')
             return
+        return length, samples, frames
 
-        if tk.messagebox.askquestion(
+    def force_options(self):
+        """
+        Method returning the keyword arguments of the chosen force backend
+        :return: Dictionary (None if the backend has no options set in the GUI)
+        """
+        return {'theta': float(self.theta_ent.get())} if self.solver.get() == 'barnes-hut' else None
+
+    def open_live_view(self):
+        """
+        Method opening a window showing the chosen scenario live, with the entered timestep, integrator and solver (the
+        previous live view is closed)
+        """
+        if scenario is None:
+            tk.messagebox.showwarning(message='Choose a scenario first')
+            return
+        # Only the timestep and the solver's options are used, the live view creates no video
+        if self.solver.get() == 'barnes-hut' and not is_float(self.theta_ent.get()):
+            tk.messagebox.showwarning(title='Error', message='Incorrect opening angle θ')
+            return
+        timestep = self.read_timestep()
+        if timestep is None:
+            return
+        length, samples = timestep
+        self.close_live_view()
+        data = scenarios.load_scenario(scenario)
+        try:
+            live_simulation = live.LiveSimulation(*data, length / samples, self.integrator.get(), self.solver.get(),
+                                                  self.force_options())
+        except Exception as error:
+            tk.messagebox.showerror(title='Error', message=f'{type(error).__name__}: {error}')
+            return
+        self.live_view = LiveView(self.master, live_simulation)
+
+    def close_live_view(self):
+        """
+        Method closing the live view, if it is open
+        """
+        if self.live_view is not None:
+            self.live_view.close()
+            self.live_view = None
+
+    def run_simulation(self, resume=False):
+        """
+        Method running the simulation
+        :param resume: Boolean, True if the simulation stopped earlier should continue from its last checkpoint in
+        '/temp' (with the same scenario and settings), False to start a new one
+        """
+        settings = self.read_settings()
+        if settings is None:
+            return
+        length, samples, frames = settings
+
+        if resume and not os.path.isfile(os.path.join('./temp', checkpoint.CHECKPOINT_NAME)):
+            tk.messagebox.showwarning(message='There is no simulation to resume')
+            return
+        if not resume and tk.messagebox.askquestion(
             "Do you wish to proceed?",
                 "Proceeding will delete all the previous files in '/temp' directory. Do you wish to proceed?",
                 icon='warning') == 'no':
@@ -178,22 +409,92 @@ class Application(tk.Frame):
         global is_calculating
         is_calculating = True
 
-        start_time = time.time()
         self.update_progress_bar(0)
         self.update_status('Initializing the simulation')
         print('Starting the simulation')
-        if os.path.isdir('temp'):
-            print('\nDeleting "/temp"')
-            self.update_status("Deleting '/temp'")
-            rmtree('./temp')
-        print('Creating "/temp" for temporary files.\n')
-        self.update_status("Creating '/temp' for temporary files.")
-        os.mkdir('./temp')
-        os.mkdir('./temp/frames')
+        if not resume:  # The files of the stopped simulation are kept to be resumed
+            if os.path.isdir('temp'):
+                print('\nDeleting "/temp"')
+                self.update_status("Deleting '/temp'")
+                rmtree('./temp')
+            print('Creating "/temp" for temporary files.\n')
+            self.update_status("Creating '/temp' for temporary files.")
+            os.mkdir('./temp')
         data = scenarios.load_scenario(scenario)
-        simulation.main(app, data[0], data[1], data[2], data[3], data[4], length, samples, frames, True)
-        print(f'\nTime elapsed: {time.time() - start_time} s')
-        self.update_status(f'Done! Time elapsed: {round(time.time() - start_time, 2)} s')
+        settings = {'force_backend': self.solver.get(), 'integrator': self.integrator.get(),
+                    'force_options': self.force_options(), 'stream': True,
+                    'checkpoint_every': max(samples // CHECKPOINTS, 1), 'resume': resume}
+
+        self.cancel.clear()
+        self.run_button['state'] = tk.DISABLED
+        self.resume_button['state'] = tk.DISABLED
+        self.cancel_button['state'] = tk.NORMAL
+        self.worker = threading.Thread(target=self.simulate, args=(data, length, samples, frames, settings),
+                                       daemon=True)
+        self.worker.start()
+        self.after(POLL_INTERVAL, self.poll_simulation)
+
+    def simulate(self, data, length, samples, frames, settings):
+        """
+        Method running the simulation in the background thread, reporting its progress through the events' queue
+        :param data: Tuple of numpy arrays with masses, coordinates and velocities' components of the bodies
+        :param length: Float, length of the simulation in seconds
+        :param samples: Integer, amount of samples
+        :param frames: Integer, amount of frames
+        :param settings: Dictionary of keyword arguments for simulation.main
+        """
+        start_time = time.time()
+        try:
+            simulation.main(progress.QueueProgress(self.events), data[0], data[1], data[2], data[3], data[4], length,
+                            samples, frames, True, cancel=self.cancel, **settings)
+        except Exception as error:
+            self.events.put(('error', f'{type(error).__name__}: {error}'))
+        else:
+            self.events.put(('done', time.time() - start_time))
+
+    def poll_simulation(self):
+        """
+        Method applying the progress events of the simulation running in the background to the GUI
+        """
+        while True:
+            try:
+                event = self.events.get_nowait()
+            except queue.Empty:
+                break
+            if event[0] == 'status':
+                self.update_status(event[1])
+            elif event[0] == 'progress':
+                self.update_progress_bar(event[1])
+                self.update_status(event[2])
+            else:
+                self.finish_simulation(event)
+                return
+        self.after(POLL_INTERVAL, self.poll_simulation)
+
+    def finish_simulation(self, event):
+        """
+        Method updating the GUI after the simulation running in the background has finished
+        :param event: Tuple ('done', time elapsed in seconds) or ('error', description of the error)
+        """
+        global is_calculating
+        is_calculating = False
+        self.worker = None
+        self.run_button['state'] = tk.NORMAL
+        self.resume_button['state'] = tk.NORMAL
+        self.cancel_button['state'] = tk.DISABLED
+        if self.closing:
+            self.close_live_view()
+            self.master.destroy()
+            sys.exit(0)
+        if event[0] == 'error':
+            self.update_status('Simulation failed')
+            tk.messagebox.showerror(title='Error', message=event[1])
+            return
+
+        elapsed = event[1]
+        cancelled = 'Cancelled, partial results saved (Resume continues it)' if self.cancel.is_set() else 'Done!'
+        print(f'\nTime elapsed: {elapsed} s')
+        self.update_status(f'{cancelled} Time elapsed: {round(elapsed, 2)} s')
         # Opening the folder with created files
         if os_identified:
             open_folder()
@@ -202,9 +503,7 @@ class Application(tk.Frame):
         else:
             self.update_status(f"Detected unsupported operating system. The files are located in '/temp' directory"
                                f"which is located where the files are"
-                               f"\nDone! Time elapsed: {round(time.time() - start_time, 2)} s")
-
-        is_calculating = False
+                               f"\n{cancelled} Time elapsed: {round(elapsed, 2)} s")
 
     def set_scenario(self, scen):
         """
@@ -273,11 +572,10 @@ class Application(tk.Frame):
 
     def update_status(self, text):
         """
-        Method updating the status label and updating the whole app
+        Method updating the status label
         :param text: String
         """
         self.status.set(text)
-        self.update()
 
 
 if __name__ == '__main__':
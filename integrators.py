@@ -0,0 +1,454 @@
+# Gravity Simulation Project
+# ----------------------------------------------------------------------------------------------------------------------
+# This script is responsible for advancing the motion of the bodies in time with different integration methods.
+
+from functools import partial
+import numpy as np
+import bodies
+import forces
+import kernels
+
+# Coefficients of the 4th-order Yoshida integrator
+_CBRT2 = 2 ** (1 / 3)
+YOSHIDA_W1 = 1 / (2 - _CBRT2)
+YOSHIDA_W0 = -_CBRT2 / (2 - _CBRT2)
+YOSHIDA_DRIFTS = (YOSHIDA_W1 / 2, (YOSHIDA_W0 + YOSHIDA_W1) / 2, (YOSHIDA_W0 + YOSHIDA_W1) / 2, YOSHIDA_W1 / 2)
+YOSHIDA_KICKS = (YOSHIDA_W1, YOSHIDA_W0, YOSHIDA_W1)
+
+# Accuracy parameter of the adaptive integrator, each body's timestep is ETA times the shortest time scale of its pairs
+# (see forces.timescales), which gives about 300 steps per orbit of a tight pair
+ETA = 0.02
+# Maximum depth of the adaptive integrator's timestep hierarchy, the shortest timestep is dt / 2 ** MAX_LEVEL
+MAX_LEVEL = 20
+
+
+class Integrator:
+    def __init__(self, accelerations):
+        """
+        Method initializing an Integrator class object
+        :param accelerations: Function taking masses, x and y coordinates of the bodies and returning x and y components
+        of their accelerations (see forces.get_force_backend)
+        """
+        self.accelerations = accelerations
+        self.softening = forces.softening_of(accelerations)
+
+    def step(self, masses, xs, ys, vxs, vys, dt):
+        """
+        Method calculating bodies' coordinates and velocities after a given time dt
+        :param masses: Numpy array containing masses of the bodies
+        :param xs: Numpy array containing x coordinates of the bodies
+        :param ys: Numpy array containing y coordinates of the bodies
+        :param vxs: Numpy array containing x components of the velocities of the bodies
+        :param vys: Numpy array containing y components of the velocities of the bodies
+        :param dt: Float, time for which the motion should be calculated
+        :return: Tuple of numpy arrays containing bodies' x and y coordinates and their x and y components of velocity
+        """
+        raise NotImplementedError
+
+    def advance(self, state, dt):
+        """
+        Method advancing the bodies of a State by a given time dt in place, integrators which do not override it take a
+        step and copy its results into the state
+        :param state: bodies.State class object
+        :param dt: Float, time for which the motion should be calculated
+        """
+        state.update(*self.step(state.masses, *state.coordinates(), state.vxs, state.vys, dt))
+
+    def get_state(self, state):
+        """
+        Method returning the state the integrator carries from one step to the next, so that it can be saved into a
+        checkpoint and a resumed run continues bit for bit like an uninterrupted one
+        :param state: bodies.State class object, as left by the last call of advance
+        :return: Dictionary of numpy arrays (empty if the integrator carries no state)
+        """
+        return {}
+
+    def set_state(self, saved, state):
+        """
+        Method restoring a state returned by get_state
+        :param saved: Dictionary of numpy arrays
+        :param state: bodies.State class object the next call of advance starts from
+        """
+
+    def reset(self):
+        """
+        Method dropping everything the integrator carries from one step to the next, called when the bodies change
+        between the steps (e.g. when colliding bodies are merged)
+        """
+
+
+class Euler(Integrator):
+    """
+    Semi-implicit Euler method: the bodies move with their old velocities, then the velocities are updated with the
+    accelerations at the new positions (first order)
+    """
+
+    def step(self, masses, xs, ys, vxs, vys, dt):
+        x1 = xs + vxs * dt
+        y1 = ys + vys * dt
+        a_x, a_y = self.accelerations(masses, x1, y1)
+        return x1, y1, vxs + a_x * dt, vys + a_y * dt
+
+    def advance(self, state, dt):
+        state.positions += state.velocities * dt
+        a_x, a_y = self.accelerations(state.masses, *state.coordinates())
+        state.vxs += a_x * dt
+        state.vys += a_y * dt
+
+
+class Leapfrog(Integrator):
+    """
+    Kick-drift-kick leapfrog (second order, symplectic). The accelerations at the end of a step are reused at the
+    beginning of the next one, so each step costs a single force evaluation
+    """
+
+    def __init__(self, accelerations):
+        super().__init__(accelerations)
+        self._cache = None
+        # Accelerations at the end of the previous advance, kept with the State and its revision they belong to
+        self._advanced = None
+
+    def _accelerations_at(self, masses, xs, ys):
+        """
+        Method returning the accelerations at given positions, reusing the ones calculated at the end of the previous
+        step if the positions are the arrays that step returned
+        """
+        if self._cache is not None and self._cache[0] is xs and self._cache[1] is ys and self._cache[2] is masses:
+            return self._cache[3], self._cache[4]
+        return self.accelerations(masses, xs, ys)
+
+    def _block_at(self, state):
+        """
+        Method returning the accelerations at the positions of a State as an (N, 2) block, reusing the one calculated
+        at the end of the previous advance (which may update it in place)
+        """
+        advanced = self._advanced
+        if advanced is not None and advanced[0] is state and advanced[1] == state.revision:
+            return advanced[2]
+        a = np.empty((len(state), 2))
+        a[:, 0], a[:, 1] = self.accelerations(state.masses, *state.coordinates())
+        self._advanced = (state, state.revision, a)
+        return a
+
+    def get_state(self, state):
+        a = self._block_at(state)
+        return {'a_x': a[:, 0], 'a_y': a[:, 1]}
+
+    def set_state(self, saved, state):
+        if 'a_x' in saved:
+            a = np.empty((len(state), 2))
+            a[:, 0], a[:, 1] = saved['a_x'], saved['a_y']
+            self._advanced = (state, state.revision, a)
+
+    def reset(self):
+        self._cache = None
+        self._advanced = None
+
+    def step(self, masses, xs, ys, vxs, vys, dt):
+        a_x, a_y = self._accelerations_at(masses, xs, ys)
+        vx_half = vxs + a_x * (dt / 2)
+        vy_half = vys + a_y * (dt / 2)
+        x1 = xs + vx_half * dt
+        y1 = ys + vy_half * dt
+        a_x, a_y = self.accelerations(masses, x1, y1)
+        self._cache = (x1, y1, masses, a_x, a_y)
+        return x1, y1, vx_half + a_x * (dt / 2), vy_half + a_y * (dt / 2)
+
+    def advance(self, state, dt):
+        a = self._block_at(state)
+        state.velocities += a * (dt / 2)
+        state.positions += state.velocities * dt
+        a[:, 0], a[:, 1] = self.accelerations(state.masses, *state.coordinates())
+        state.velocities += a * (dt / 2)
+
+
+class VelocityVerlet(Leapfrog):
+    """
+    Velocity Verlet (second order, symplectic): positions are advanced with the old velocities and accelerations, then
+    the velocities with the average of the old and the new accelerations
+    """
+
+    def step(self, masses, xs, ys, vxs, vys, dt):
+        a_x, a_y = self._accelerations_at(masses, xs, ys)
+        x1 = xs + vxs * dt + a_x * (dt * dt / 2)
+        y1 = ys + vys * dt + a_y * (dt * dt / 2)
+        a1_x, a1_y = self.accelerations(masses, x1, y1)
+        self._cache = (x1, y1, masses, a1_x, a1_y)
+        return x1, y1, vxs + (a_x + a1_x) * (dt / 2), vys + (a_y + a1_y) * (dt / 2)
+
+    def advance(self, state, dt):
+        a = self._block_at(state)
+        state.positions += state.velocities * dt
+        state.positions += a * (dt * dt / 2)
+        a1 = np.empty_like(a)
+        a1[:, 0], a1[:, 1] = self.accelerations(state.masses, *state.coordinates())
+        state.velocities += (a + a1) * (dt / 2)
+        self._advanced = (state, state.revision, a1)
+
+
+class RungeKutta4(Integrator):
+    """
+    Classical 4th-order Runge-Kutta method (not symplectic, four force evaluations per step)
+    """
+
+    def step(self, masses, xs, ys, vxs, vys, dt):
+        k1_x, k1_y = vxs, vys
+        k1_vx, k1_vy = self.accelerations(masses, xs, ys)
+        k2_x, k2_y = vxs + k1_vx * (dt / 2), vys + k1_vy * (dt / 2)
+        k2_vx, k2_vy = self.accelerations(masses, xs + k1_x * (dt / 2), ys + k1_y * (dt / 2))
+        k3_x, k3_y = vxs + k2_vx * (dt / 2), vys + k2_vy * (dt / 2)
+        k3_vx, k3_vy = self.accelerations(masses, xs + k2_x * (dt / 2), ys + k2_y * (dt / 2))
+        k4_x, k4_y = vxs + k3_vx * dt, vys + k3_vy * dt
+        k4_vx, k4_vy = self.accelerations(masses, xs + k3_x * dt, ys + k3_y * dt)
+        return (xs + (k1_x + 2 * k2_x + 2 * k3_x + k4_x) * (dt / 6),
+                ys + (k1_y + 2 * k2_y + 2 * k3_y + k4_y) * (dt / 6),
+                vxs + (k1_vx + 2 * k2_vx + 2 * k3_vx + k4_vx) * (dt / 6),
+                vys + (k1_vy + 2 * k2_vy + 2 * k3_vy + k4_vy) * (dt / 6))
+
+
+class Yoshida4(Integrator):
+    """
+    4th-order Yoshida method (symplectic): three leapfrog-like substeps with coefficients cancelling the third-order
+    error, three force evaluations per step
+    """
+
+    def step(self, masses, xs, ys, vxs, vys, dt):
+        for drift, kick in zip(YOSHIDA_DRIFTS, YOSHIDA_KICKS):
+            xs = xs + vxs * (drift * dt)
+            ys = ys + vys * (drift * dt)
+            a_x, a_y = self.accelerations(masses, xs, ys)
+            vxs = vxs + a_x * (kick * dt)
+            vys = vys + a_y * (kick * dt)
+        xs = xs + vxs * (YOSHIDA_DRIFTS[-1] * dt)
+        ys = ys + vys * (YOSHIDA_DRIFTS[-1] * dt)
+        return xs, ys, vxs, vys
+
+
+class AdaptiveLeapfrog(Leapfrog):
+    """
+    Kick-drift-kick leapfrog with individual block timesteps: every body advances with its own power-of-two fraction of
+    dt, chosen from the time scales of its pairs with the other bodies, so that only bodies on fast orbits are stepped
+    often. All the bodies are synchronized again at the end of every dt, so samples are still taken at the requested
+    cadence, and the accelerations at the end of a dt are reused at the beginning of the next one (see Leapfrog). With
+    every timestep longer than dt its results are identical to the ones of Leapfrog
+    """
+
+    def __init__(self, accelerations, eta=ETA, max_level=MAX_LEVEL):
+        """
+        Method initializing an AdaptiveLeapfrog class object
+        :param accelerations: Function calculating the accelerations of the bodies (see forces.get_force_backend)
+        :param eta: Float, accuracy parameter, each body's timestep is eta times the shortest time scale of its pairs
+        :param max_level: Integer, maximum depth of the timestep hierarchy, the shortest timestep is dt / 2 ** max_level
+        """
+        super().__init__(accelerations)
+        self.eta = eta
+        self.max_level = max_level
+        # Amount of force evaluations done for single bodies, for measuring the savings
+        self.evaluations = 0
+
+    def _levels(self, masses, xs, ys, vxs, vys, targets, dt):
+        """
+        Method choosing the levels of the timestep hierarchy of given bodies from the time scales of their pairs
+        :return: Numpy array of integers, body's timestep is dt / 2 ** level
+        """
+        wanted = self.eta * forces.timescales(masses, xs, ys, vxs, vys, targets, softening=self.softening)
+        levels = np.zeros(len(targets), dtype=np.int64)
+        finite = np.isfinite(wanted) & (wanted > 0)
+        levels[finite] = np.ceil(np.log2(dt / wanted[finite])).clip(0, self.max_level)
+        return levels
+
+    def _accelerations_of_everyone(self, masses, xs, ys):
+        """
+        Method calculating the accelerations of all the bodies (with targets, so that the evaluations are counted)
+        """
+        self.evaluations += len(masses)
+        return self.accelerations(masses, xs, ys, np.arange(len(masses)))
+
+    def _integrate(self, masses, xs, ys, vxs, vys, a_x, a_y, dt):
+        """
+        Method advancing copies of the bodies by dt through the timestep hierarchy
+        :param a_x: Numpy array containing x components of the accelerations at the starting positions
+        :param a_y: Numpy array containing y components of the accelerations at the starting positions
+        :return: Tuple of numpy arrays containing bodies' x and y coordinates, x and y components of velocity and x and
+        y components of the accelerations at the end of dt
+        """
+        xs, ys, vxs, vys = (np.array(values, dtype=np.float64) for values in (xs, ys, vxs, vys))
+        # Time is measured in integer ticks, so that the ends of the steps of different bodies line up exactly
+        total = 1 << self.max_level
+
+        levels = self._levels(masses, xs, ys, vxs, vys, np.arange(len(masses)), dt)
+        ticks = total >> levels
+        # Opening half-kick
+        vxs += a_x * (ticks * dt / total / 2)
+        vys += a_y * (ticks * dt / total / 2)
+        ends = ticks.copy()
+
+        tick = 0
+        while True:
+            # Drifting every body to the nearest end of a step
+            next_tick = int(ends.min())
+            drift = (next_tick - tick) * dt / total
+            xs += vxs * drift
+            ys += vys * drift
+            tick = next_tick
+
+            # Closing half-kick of the bodies whose steps have ended (all of them at the end of dt)
+            active = np.flatnonzero(ends == tick)
+            a_x, a_y = self.accelerations(masses, xs, ys, active)
+            self.evaluations += len(active)
+            vxs[active] += a_x * (ticks[active] * dt / total / 2)
+            vys[active] += a_y * (ticks[active] * dt / total / 2)
+            if tick == total:
+                return xs, ys, vxs, vys, a_x, a_y
+
+            # Choosing the next steps, a body can only move to a longer step if it ends on that step's boundary
+            new_levels = self._levels(masses, xs, ys, vxs, vys, active, dt)
+            new_ticks = total >> new_levels
+            misaligned = tick % new_ticks != 0
+            while misaligned.any():
+                new_ticks[misaligned] >>= 1
+                misaligned = tick % new_ticks != 0
+            ticks[active] = new_ticks
+            ends[active] = tick + new_ticks
+            # Opening half-kick
+            vxs[active] += a_x * (new_ticks * dt / total / 2)
+            vys[active] += a_y * (new_ticks * dt / total / 2)
+
+    def step(self, masses, xs, ys, vxs, vys, dt):
+        if self._cache is not None and self._cache[0] is xs and self._cache[1] is ys and self._cache[2] is masses:
+            a_x, a_y = self._cache[3], self._cache[4]
+        else:
+            a_x, a_y = self._accelerations_of_everyone(masses, xs, ys)
+        xs, ys, vxs, vys, a_x, a_y = self._integrate(masses, xs, ys, vxs, vys, a_x, a_y, dt)
+        self._cache = (xs, ys, masses, a_x, a_y)
+        return xs, ys, vxs, vys
+
+    def _block_at(self, state):
+        advanced = self._advanced
+        if advanced is not None and advanced[0] is state and advanced[1] == state.revision:
+            return advanced[2]
+        a = np.empty((len(state), 2))
+        a[:, 0], a[:, 1] = self._accelerations_of_everyone(state.masses, *state.coordinates())
+        self._advanced = (state, state.revision, a)
+        return a
+
+    def advance(self, state, dt):
+        a = self._block_at(state)
+        xs, ys, vxs, vys, a[:, 0], a[:, 1] = self._integrate(state.masses, *state.coordinates(), state.vxs, state.vys,
+                                                             a[:, 0], a[:, 1], dt)
+        state.update(xs, ys, vxs, vys)
+
+
+class CompiledIntegrator(Integrator):
+    """
+    Base of the integrators fused with the force calculation into a single compiled kernel (see kernels), which advance
+    the blocks of a State in place. Their steps advance a State of their own, so the arrays returned by a step are views
+    updated by the next one and no arrays are allocated per step
+    """
+
+    def __init__(self, accelerations):
+        super().__init__(accelerations)
+        self._owned = None
+
+    def step(self, masses, xs, ys, vxs, vys, dt):
+        owned = self._owned
+        # The given arrays are copied into a new State unless a previous step returned them (so the caller's starting
+        # conditions are never modified)
+        if owned is None or not (owned[0] is masses and owned[1].xs is xs and owned[1].ys is ys and owned[1].vxs is vxs
+                                 and owned[1].vys is vys):
+            owned = masses, bodies.State(masses, xs, ys, vxs, vys)
+            self._owned = owned
+        state = owned[1]
+        self.advance(state, dt)
+        return state.xs, state.ys, state.vxs, state.vys
+
+    def reset(self):
+        super().reset()
+        self._owned = None
+
+
+class CompiledEuler(CompiledIntegrator):
+    """
+    Semi-implicit Euler method (see Euler) as a single compiled kernel
+    """
+
+    def __init__(self, accelerations):
+        super().__init__(accelerations)
+        self._accelerations = None
+
+    def advance(self, state, dt):
+        if self._accelerations is None or len(self._accelerations) != len(state):
+            self._accelerations = np.empty((len(state), 2))
+        kernels.euler_step(forces.G, self.softening ** 2, state.masses, state.positions, state.velocities,
+                           self._accelerations, dt)
+
+
+class CompiledLeapfrog(CompiledIntegrator, Leapfrog):
+    """
+    Kick-drift-kick leapfrog (see Leapfrog) as a single compiled kernel, its results are identical to the ones of
+    Leapfrog with forces.accelerations_compiled
+    """
+
+    def advance(self, state, dt):
+        kernels.leapfrog_step(forces.G, self.softening ** 2, state.masses, state.positions, state.velocities,
+                              self._block_at(state), dt)
+
+
+INTEGRATORS = {
+    'euler': Euler,
+    'leapfrog': Leapfrog,
+    'verlet': VelocityVerlet,
+    'rk4': RungeKutta4,
+    'yoshida': Yoshida4,
+    'adaptive': AdaptiveLeapfrog,
+}
+
+# Integrators used instead of the ones of the same names when the accelerations are calculated by the compiled backend
+COMPILED_INTEGRATORS = {
+    'euler': CompiledEuler,
+    'leapfrog': CompiledLeapfrog,
+}
+
+
+def _compiled(accelerations):
+    """
+    Function checking whether accelerations are calculated by the compiled backend, with no options but the softening
+    :param accelerations: Function calculating the accelerations of the bodies (see forces.get_force_backend)
+    :return: Boolean
+    """
+    if isinstance(accelerations, partial) and set(accelerations.keywords) <= {'softening'}:
+        accelerations = accelerations.func
+    return kernels.AVAILABLE and accelerations is forces.accelerations_compiled
+
+
+def get_integrator(name, accelerations):
+    """
+    Function creating an integrator of a given name
+    :param name: String, name of the integrator, one of INTEGRATORS' keys
+    :param accelerations: Function calculating the accelerations of the bodies (see forces.get_force_backend)
+    :return: Integrator class object
+    """
+    if name in COMPILED_INTEGRATORS and _compiled(accelerations):
+        return COMPILED_INTEGRATORS[name](accelerations)
+    try:
+        return INTEGRATORS[name](accelerations)
+    except KeyError:
+        raise ValueError(f'Unknown integrator "{name}", available: {", ".join(INTEGRATORS)}') from None
+
+
+def total_energy(masses, xs, ys, vxs, vys, softening=forces.SOFTENING):
+    """
+    Function calculating the total (kinetic and potential) energy of the bodies, used to measure integrators' drift
+    :param masses: Numpy array containing masses of the bodies
+    :param xs: Numpy array containing x coordinates of the bodies
+    :param ys: Numpy array containing y coordinates of the bodies
+    :param vxs: Numpy array containing x components of the velocities of the bodies
+    :param vys: Numpy array containing y components of the velocities of the bodies
+    :param softening: Float, Plummer softening length of the attraction (see forces.SOFTENING)
+    :return: Float, total energy in joules
+    """
+    kinetic = 0.5 * np.sum(masses * (vxs * vxs + vys * vys))
+    i, j = np.triu_indices(len(masses), k=1)
+    r = np.sqrt((xs[j] - xs[i]) ** 2 + (ys[j] - ys[i]) ** 2 + softening ** 2)
+    potential = -forces.G * np.sum(masses[i] * masses[j] / r)
+    return kinetic + potential
@@ -0,0 +1,132 @@
+# Gravity Simulation Project
+# ----------------------------------------------------------------------------------------------------------------------
+# This script contains compiled kernels of the simulation. They are compiled with Numba if it is installed, without it
+# they stay (slow) plain Python functions and the NumPy implementations are used instead (see AVAILABLE).
+
+try:
+    import numba
+except ImportError:  # Numba is optional
+    numba = None
+
+# True if the kernels are compiled
+AVAILABLE = numba is not None
+
+
+def _compile(function):
+    """
+    Decorator compiling a kernel into machine code, which releases the GIL while it runs
+    """
+    if numba is None:
+        return function
+    return numba.njit(cache=True, nogil=True)(function)
+
+
+@_compile
+def accelerations(g, softening2, masses, positions, a):
+    """
+    Function calculating accelerations of all the bodies in place, every pair of bodies is visited once and both bodies
+    receive their accelerations (Newton's third law). Massless bodies are attracted but do not attract anything
+    :param g: Float, gravitational constant
+    :param softening2: Float, square of the Plummer softening length (see forces.accelerations_vectorized)
+    :param masses: Numpy array containing masses of the bodies
+    :param positions: Numpy array of shape (N, 2) containing x and y coordinates of the bodies (float32 or float64, the
+    accelerations are calculated in float64 either way)
+    :param a: Numpy array of shape (N, 2) receiving x and y components of the accelerations
+    """
+    n = len(masses)
+    for i in range(n):
+        a[i, 0] = 0.0
+        a[i, 1] = 0.0
+    for i in range(n):
+        if masses[i] == 0:
+            continue
+        for j in range(n):
+            # Pairs of two bodies with mass are visited from the lower index only
+            if j == i or (j < i and masses[j] != 0):
+                continue
+            x_r = float(positions[j, 0]) - float(positions[i, 0])
+            y_r = float(positions[j, 1]) - float(positions[i, 1])
+            r2 = x_r * x_r + y_r * y_r + softening2
+            inverse_r3 = 1.0 / (r2 * r2 ** 0.5)
+            a[j, 0] -= masses[i] * x_r * inverse_r3
+            a[j, 1] -= masses[i] * y_r * inverse_r3
+            if masses[j] != 0:
+                a[i, 0] += masses[j] * x_r * inverse_r3
+                a[i, 1] += masses[j] * y_r * inverse_r3
+    for i in range(n):
+        a[i, 0] *= g
+        a[i, 1] *= g
+
+
+@_compile
+def target_accelerations(g, softening2, masses, positions, targets, a):
+    """
+    Function calculating accelerations of chosen bodies in place
+    :param g: Float, gravitational constant
+    :param softening2: Float, square of the Plummer softening length
+    :param masses: Numpy array containing masses of the bodies
+    :param positions: Numpy array of shape (N, 2) containing x and y coordinates of the bodies
+    :param targets: Numpy array of indices of the bodies for which to calculate accelerations
+    :param a: Numpy array of shape (targets, 2) receiving x and y components of the accelerations of the targets
+    """
+    for k in range(len(targets)):
+        i = targets[k]
+        sum_x = 0.0
+        sum_y = 0.0
+        for j in range(len(masses)):
+            if j == i or masses[j] == 0:
+                continue
+            x_r = float(positions[j, 0]) - float(positions[i, 0])
+            y_r = float(positions[j, 1]) - float(positions[i, 1])
+            r2 = x_r * x_r + y_r * y_r + softening2
+            inverse_r3 = 1.0 / (r2 * r2 ** 0.5)
+            sum_x += masses[j] * x_r * inverse_r3
+            sum_y += masses[j] * y_r * inverse_r3
+        a[k, 0] = g * sum_x
+        a[k, 1] = g * sum_y
+
+
+@_compile
+def euler_step(g, softening2, masses, positions, velocities, a, dt):
+    """
+    Function advancing the bodies in place by a semi-implicit Euler step (see integrators.Euler)
+    :param g: Float, gravitational constant
+    :param softening2: Float, square of the Plummer softening length
+    :param masses: Numpy array containing masses of the bodies
+    :param positions: Numpy array of shape (N, 2) containing x and y coordinates of the bodies
+    :param velocities: Numpy array of shape (N, 2) containing x and y components of the velocities of the bodies
+    :param a: Numpy array of shape (N, 2) receiving the accelerations at the new positions
+    :param dt: Float, time for which the motion should be calculated
+    """
+    for i in range(len(masses)):
+        positions[i, 0] = positions[i, 0] + velocities[i, 0] * dt
+        positions[i, 1] = positions[i, 1] + velocities[i, 1] * dt
+    accelerations(g, softening2, masses, positions, a)
+    for i in range(len(masses)):
+        velocities[i, 0] = velocities[i, 0] + a[i, 0] * dt
+        velocities[i, 1] = velocities[i, 1] + a[i, 1] * dt
+
+
+@_compile
+def leapfrog_step(g, softening2, masses, positions, velocities, a, dt):
+    """
+    Function advancing the bodies in place by a kick-drift-kick leapfrog step (see integrators.Leapfrog)
+    :param g: Float, gravitational constant
+    :param softening2: Float, square of the Plummer softening length
+    :param masses: Numpy array containing masses of the bodies
+    :param positions: Numpy array of shape (N, 2) containing x and y coordinates of the bodies
+    :param velocities: Numpy array of shape (N, 2) containing x and y components of the velocities of the bodies
+    :param a: Numpy array of shape (N, 2) containing the accelerations at the current positions, receiving the ones at
+    the new positions
+    :param dt: Float, time for which the motion should be calculated
+    """
+    half = dt / 2
+    for i in range(len(masses)):
+        velocities[i, 0] = velocities[i, 0] + a[i, 0] * half
+        velocities[i, 1] = velocities[i, 1] + a[i, 1] * half
+        positions[i, 0] = positions[i, 0] + velocities[i, 0] * dt
+        positions[i, 1] = positions[i, 1] + velocities[i, 1] * dt
+    accelerations(g, softening2, masses, positions, a)
+    for i in range(len(masses)):
+        velocities[i, 0] = velocities[i, 0] + a[i, 0] * half
+        velocities[i, 1] = velocities[i, 1] + a[i, 1] * half
@@ -0,0 +1,140 @@
+# Gravity Simulation Project
+# ----------------------------------------------------------------------------------------------------------------------
+# This script is responsible for running the simulation continuously in a background thread for the live view, which
+# shows only the latest state of the bodies at its own rate, however many steps were calculated in between.
+
+import threading
+import bodies
+import forces
+import integrators
+import simulation
+
+# Seconds for which a paused simulation waits before checking again whether it was resumed or closed
+PAUSE_POLL = 0.1
+# Maximum amount of seconds for which the display waits for the simulation to finish its step and copy the state
+SNAPSHOT_TIMEOUT = 0.01
+
+
+class LiveSimulation:
+    def __init__(self, masses, xs, ys, vxs, vys, dt, integrator='leapfrog', force_backend='auto', force_options=None,
+                 softening=0.0):
+        """
+        Method initializing a LiveSimulation class object, advancing the bodies by as many steps as it can in a
+        background thread (paused until start is called) and copying the state only when the display asks for it
+        through snapshot
+        :param masses: Numpy array, masses of the bodies
+        :param xs: Numpy array, x starting coordinates of the bodies
+        :param ys: Numpy array, y starting coordinates of the bodies
+        :param vxs: Numpy array, x starting velocities' components of the bodies
+        :param vys: Numpy array, y starting velocities' components of the bodies
+        :param dt: Float, timestep in seconds
+        :param integrator: String, name of the integration method, one of integrators.INTEGRATORS' keys
+        :param force_backend: String, name of the force backend, one of forces.FORCE_BACKENDS' keys
+        :param force_options: Dictionary of keyword arguments for the force backend (e.g. {'theta': 0.5})
+        :param softening: Float, Plummer softening length in metres (see forces.SOFTENING)
+        """
+        force_options = dict(force_options or {})
+        if softening:
+            force_options['softening'] = softening
+        # The bodies with mass come first (see simulation.massive_first), the snapshots keep that order
+        self.order = simulation.massive_first(masses)
+        if self.order is not None:
+            masses, xs, ys, vxs, vys = (values[self.order] for values in (masses, xs, ys, vxs, vys))
+        self.state = bodies.State(masses, xs, ys, vxs, vys)
+        self.accelerations = forces.get_force_backend(force_backend, **force_options)
+        self.integrator = integrators.get_integrator(integrator, self.accelerations)
+        self.dt = dt
+        self.steps = 0
+        # Description of the error which stopped the simulation (None while it runs fine)
+        self.error = None
+
+        self._lock = threading.Lock()
+        self._snapshot = None
+        # Set by the display asking for a copy of the state, and by the simulation once it made it
+        self._wanted = threading.Event()
+        self._ready = threading.Event()
+        # Amount of steps done when the state was copied last
+        self._published = None
+        self._publish()
+        self._running = threading.Event()
+        self._closed = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _publish(self):
+        """
+        Method handing over a copy of the current state (the state itself keeps being updated in place)
+        """
+        snapshot = self.state.t, self.steps, self.state.positions.copy()
+        with self._lock:
+            self._snapshot = snapshot
+        self._published = self.steps
+        self._ready.set()
+
+    def _run(self):
+        """
+        Method advancing the bodies in the background thread until the simulation is closed
+        """
+        try:
+            while not self._closed.is_set():
+                if not self._running.wait(PAUSE_POLL):
+                    # The state the simulation was paused at is handed over without being asked for
+                    if self._published != self.steps:
+                        self._publish()
+                    continue
+                self.integrator.advance(self.state, self.dt)
+                self.state.advance_time(self.dt)
+                self.steps += 1
+                # The state is copied once per frame, at the end of the step during which the display asked for it
+                if self._wanted.is_set():
+                    self._wanted.clear()
+                    self._publish()
+        except Exception as error:
+            self.error = f'{type(error).__name__}: {error}'
+            self._running.clear()
+        finally:
+            if hasattr(self.accelerations, 'close'):  # Terminating the worker processes of the force backend
+                self.accelerations.close()
+
+    def snapshot(self, timeout=SNAPSHOT_TIMEOUT):
+        """
+        Method taking the state of the simulation: a running simulation is asked to copy its state at the end of the
+        step it is calculating, so that the state is at most one step old
+        :param timeout: Float, maximum amount of seconds to wait for the copy, a step taking longer is taken by the next
+        call
+        :return: Tuple of the time, the amount of steps done and a numpy array of shape (N, 2) with the coordinates of
+        the bodies, None if there is no new state since the last call
+        """
+        with self._lock:
+            snapshot, self._snapshot = self._snapshot, None
+        if snapshot is None and self._running.is_set():
+            self._ready.clear()
+            self._wanted.set()
+            self._ready.wait(timeout)
+            with self._lock:
+                snapshot, self._snapshot = self._snapshot, None
+        return snapshot
+
+    @property
+    def running(self):
+        return self._running.is_set()
+
+    def start(self):
+        """
+        Method starting (or resuming) the simulation
+        """
+        if self.error is None:
+            self._running.set()
+
+    def stop(self):
+        """
+        Method pausing the simulation after the step it is calculating
+        """
+        self._running.clear()
+
+    def close(self):
+        """
+        Method stopping the background thread and waiting for it to end
+        """
+        self._closed.set()
+        self._thread.join()
@@ -0,0 +1,209 @@
+# Gravity Simulation Project
+# ----------------------------------------------------------------------------------------------------------------------
+# This script is responsible for measuring where the time of the simulation goes. The instrumentation is opt-in: unless
+# a Profiler is active, phase() returns a shared context manager doing nothing and timed() returns the function itself,
+# so the instrumented code does not slow down.
+
+import contextlib
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+# Maximum amount of single calls stored for the trace, the summary counts all of them
+MAX_TRACE_EVENTS = 200000
+
+# Profiler receiving the phases, None if the instrumentation is disabled
+_active = None
+_disabled = contextlib.nullcontext()
+
+
+def max_rss():
+    """
+    Function reading the peak resident memory of the process so far
+    :return: Integer, amount of bytes (None if it cannot be read on this system)
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class _Phase:
+    def __init__(self, profiler, name):
+        """
+        Method initializing a _Phase class object, a context manager measuring a single call of a phase
+        :param profiler: Profiler class object receiving the measurement
+        :param name: String, name of the phase
+        """
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.profiler._enter()
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        stop = time.perf_counter_ns()
+        self.profiler._exit(self.name, self.start, stop)
+
+
+class Profiler:
+    def __init__(self, memory=False):
+        """
+        Method initializing a Profiler class object, recording wall time, amount of calls and peak memory of every phase
+        of the simulation while it is active (see start)
+        :param memory: Boolean, True if the memory allocated by every phase should be traced with tracemalloc (slows
+        Python code down noticeably), False to record only the peak resident memory of the process
+        """
+        self.memory = memory
+        self.phases = {}
+        self.events = []
+        self.dropped_events = 0
+        self.origin = time.perf_counter_ns()
+        self._peaks = []
+
+    def phase(self, name):
+        """
+        Method returning a context manager measuring a call of a phase
+        :param name: String, name of the phase
+        :return: Context manager
+        """
+        return _Phase(self, name)
+
+    def _enter(self):
+        """
+        Method starting the measurement of the allocations of a phase. Phases may be nested, the peak of an inner phase
+        also counts for the outer ones
+        """
+        if self.memory:
+            current, peak = tracemalloc.get_traced_memory()
+            if self._peaks:
+                self._peaks[-1][1] = max(self._peaks[-1][1], peak)
+            tracemalloc.reset_peak()
+            self._peaks.append([current, current])
+
+    def _exit(self, name, start, stop):
+        """
+        Method storing a finished call of a phase
+        :param name: String, name of the phase
+        :param start: Integer, time of the beginning of the call in nanoseconds (time.perf_counter_ns)
+        :param stop: Integer, time of the end of the call in nanoseconds
+        """
+        stats = self.phases.get(name)
+        if stats is None:
+            stats = self.phases[name] = {'calls': 0, 'total': 0, 'max': 0, 'allocated': 0, 'rss': 0}
+        duration = stop - start
+        stats['calls'] += 1
+        stats['total'] += duration
+        stats['max'] = max(stats['max'], duration)
+        if self.memory:
+            current_at_start, peak = self._peaks.pop()
+            peak = max(peak, tracemalloc.get_traced_memory()[1])
+            stats['allocated'] = max(stats['allocated'], peak - current_at_start)
+            if self._peaks:
+                self._peaks[-1][1] = max(self._peaks[-1][1], peak)
+        rss = max_rss()
+        if rss is not None:
+            stats['rss'] = max(stats['rss'], rss)
+        if len(self.events) < MAX_TRACE_EVENTS:
+            self.events.append((name, start, duration, threading.get_ident()))
+        else:
+            self.dropped_events += 1
+
+    def start(self):
+        """
+        Method activating the profiler, the instrumented code reports its phases to it from then on
+        """
+        global _active
+        if self.memory:
+            tracemalloc.start()
+        _active = self
+
+    def stop(self):
+        """
+        Method deactivating the profiler
+        """
+        global _active
+        _active = None
+        if self.memory:
+            tracemalloc.stop()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def summary(self):
+        """
+        Method creating a table of the phases, sorted by their total time
+        :return: String
+        """
+        lines = [f'{"Phase":<16}{"Calls":>10}{"Total [s]":>12}{"Mean [ms]":>12}{"Max [ms]":>12}{"Peak alloc [MB]":>17}'
+                 f'{"Peak RSS [MB]":>15}']
+        for name, stats in sorted(self.phases.items(), key=lambda item: -item[1]['total']):
+            allocated = f'{stats["allocated"] / 2 ** 20:.1f}' if self.memory else '-'
+            lines.append(f'{name:<16}{stats["calls"]:>10}{stats["total"] / 1e9:>12.3f}'
+                         f'{stats["total"] / stats["calls"] / 1e6:>12.3f}{stats["max"] / 1e6:>12.3f}{allocated:>17}'
+                         f'{stats["rss"] / 2 ** 20:>15.1f}')
+        if self.dropped_events:
+            lines.append(f'({self.dropped_events} calls are counted but missing in the trace)')
+        return '\n'.join(lines)
+
+    def write_trace(self, path):
+        """
+        Method saving the calls of the phases as a Chrome trace (open it in chrome://tracing or ui.perfetto.dev)
+        :param path: String, path of the JSON file
+        :return: None
+        """
+        pid = os.getpid()
+        events = [{'name': name, 'ph': 'X', 'ts': (start - self.origin) / 1000, 'dur': duration / 1000, 'pid': pid,
+                   'tid': thread} for name, start, duration, thread in self.events]
+        with open(path, mode='w') as file:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms',
+                       'otherData': {'phases': self.phases, 'dropped_events': self.dropped_events}}, file)
+
+
+def phase(name):
+    """
+    Function returning a context manager measuring a call of a phase with the active profiler
+    :param name: String, name of the phase
+    :return: Context manager (doing nothing if no profiler is active)
+    """
+    if _active is None:
+        return _disabled
+    return _active.phase(name)
+
+
+def timed(name, function):
+    """
+    Function wrapping a function called in a hot loop, so that every call is measured as a phase with the active
+    profiler. Unlike phase, it costs nothing when no profiler is active
+    :param name: String, name of the phase
+    :param function: Function to measure
+    :return: Function (the given one if no profiler is active)
+    """
+    profiler = _active
+    if profiler is None:
+        return function
+
+    def measured(*args, **kwargs):
+        profiler._enter()
+        start = time.perf_counter_ns()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            profiler._exit(name, start, time.perf_counter_ns())
+
+    return measured
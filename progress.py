@@ -0,0 +1,124 @@
+# Gravity Simulation Project
+# ----------------------------------------------------------------------------------------------------------------------
+# This script is responsible for reporting the progress of the simulation to the GUI, the console or any other consumer.
+
+import time
+
+# Default throttling of the progress updates: at most one per PROGRESS_INTERVAL seconds, unless the progress advanced
+# by at least PROGRESS_PERCENT_STEP percent
+PROGRESS_INTERVAL = 0.5
+PROGRESS_PERCENT_STEP = 1
+
+
+class Progress:
+    def __init__(self, interval=PROGRESS_INTERVAL, percent_step=PROGRESS_PERCENT_STEP):
+        """
+        Method initializing a Progress class object, which receives the progress of the simulation and forwards it to
+        on_status and on_progress, throttled so that reporting does not slow the simulation down. Subclasses override
+        on_status and on_progress
+        :param interval: Float, amount of seconds after which a progress update is forwarded
+        :param percent_step: Float, an update is forwarded earlier if the progress advanced by that many percent
+        """
+        self.interval = interval
+        self.percent_step = percent_step
+        self._last_time = float('-inf')
+        self._last_percent = None
+
+    def status(self, text):
+        """
+        Method reporting the current phase of the simulation (never throttled)
+        :param text: String
+        """
+        self.on_status(text)
+
+    def update(self, done, total, text=''):
+        """
+        Method reporting the progress of the current phase, forwarded only if enough time passed or the progress
+        advanced enough since the last forwarded update, or if the phase is finished
+        :param done: Integer, amount of finished units of work (e.g. samples)
+        :param total: Integer, total amount of units of work
+        :param text: String, description of the units of work (e.g. 'Sample')
+        """
+        percent = done * 100 // total if total else 100
+        now = time.monotonic()
+        if (done == total or self._last_percent is None or now - self._last_time >= self.interval
+                or percent - self._last_percent >= self.percent_step):
+            self._last_time = now
+            self._last_percent = percent
+            self.on_progress(percent, f'{text} {done} out of {total} - {percent}%'.strip())
+
+    def reset(self):
+        """
+        Method resetting the throttling before a new phase
+        """
+        self._last_time = float('-inf')
+        self._last_percent = None
+
+    def on_status(self, text):
+        """
+        Method receiving the current phase of the simulation
+        :param text: String
+        """
+
+    def on_progress(self, percent, text):
+        """
+        Method receiving a (throttled) progress update
+        :param percent: Integer, progress of the current phase in percent
+        :param text: String, description of the progress
+        """
+
+
+class ConsoleProgress(Progress):
+    """
+    Progress printed into the console
+    """
+
+    def on_status(self, text):
+        print(text)
+
+    def on_progress(self, percent, text):
+        print(text)
+
+
+class QueueProgress(Progress):
+    def __init__(self, queue, interval=PROGRESS_INTERVAL, percent_step=PROGRESS_PERCENT_STEP):
+        """
+        Method initializing a QueueProgress class object, putting the progress as events into a queue, so that the
+        simulation can run in a background thread or process while another one (e.g. the GUI) consumes the events
+        :param queue: Queue (queue.Queue or multiprocessing.Queue) receiving ('status', text) and
+        ('progress', percent, text) tuples
+        :param interval: Float, amount of seconds after which a progress update is forwarded
+        :param percent_step: Float, an update is forwarded earlier if the progress advanced by that many percent
+        """
+        super().__init__(interval, percent_step)
+        self.queue = queue
+
+    def on_status(self, text):
+        self.queue.put(('status', text))
+
+    def on_progress(self, percent, text):
+        self.queue.put(('progress', percent, text))
+
+
+class CallbackProgress(Progress):
+    def __init__(self, status=None, progress=None, interval=PROGRESS_INTERVAL, percent_step=PROGRESS_PERCENT_STEP):
+        """
+        Method initializing a CallbackProgress class object, forwarding the progress to given functions
+        :param status: Function taking a string, called with the current phase and the progress' descriptions
+        :param progress: Function taking the progress in percent
+        :param interval: Float, amount of seconds after which a progress update is forwarded
+        :param percent_step: Float, an update is forwarded earlier if the progress advanced by that many percent
+        """
+        super().__init__(interval, percent_step)
+        self._status = status
+        self._progress = progress
+
+    def on_status(self, text):
+        if self._status is not None:
+            self._status(text)
+
+    def on_progress(self, percent, text):
+        if self._progress is not None:
+            self._progress(percent)
+        if self._status is not None:
+            self._status(text)
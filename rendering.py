@@ -0,0 +1,266 @@
+# Gravity Simulation Project
+# ----------------------------------------------------------------------------------------------------------------------
+# This script is responsible for rendering the frames of the simulation and encoding them into a video.
+
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import cv2
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.colors import to_rgba
+from matplotlib.figure import Figure
+
+# Frames' default resolution setting and size in inches
+DPI = 240
+FIGURE_SIZE = 5
+
+# Frames per second of the video
+FPS = 30
+
+
+def body_colors(sizes):
+    """
+    Function choosing the colors of the bodies: red for the biggest one(s), Matplotlib's color cycle for the rest
+    :param sizes: Numpy array containing sizes of the bodies' markers
+    :return: Numpy array of shape (N, 4) containing RGBA colors (floats from 0 to 1)
+    """
+    cycle = np.array([to_rgba(f'C{i}') for i in range(10)])
+    colors = cycle[np.arange(len(sizes)) % len(cycle)]
+    colors[sizes == sizes.max()] = to_rgba('r')
+    return colors
+
+
+class ScatterRenderer:
+    def __init__(self, sizes, limits, dpi=DPI, figure_size=FIGURE_SIZE):
+        """
+        Method initializing a ScatterRenderer class object, drawing the bodies with Matplotlib into an in-memory
+        raster. The axes are drawn once and all the bodies are a single collection, of which only the positions change
+        between the frames
+        :param sizes: Numpy array containing sizes of the bodies' markers
+        :param limits: Float, the axes span from -limits to limits
+        :param dpi: Integer, resolution of the frames
+        :param figure_size: Float, width and height of the frames in inches
+        """
+        self.figure = Figure(figsize=(figure_size, figure_size), dpi=dpi)
+        self.canvas = FigureCanvasAgg(self.figure)
+        ax = self.figure.add_subplot()
+        ax.axis([-limits, limits, -limits, limits])
+        self.points = ax.scatter(np.zeros(len(sizes)), np.zeros(len(sizes)), s=sizes, c=body_colors(sizes),
+                                 animated=True)
+        self.ax = ax
+        self._offsets = np.empty((len(sizes), 2))
+        # Drawing everything but the bodies once, the background is then restored before drawing every frame
+        self.canvas.draw()
+        self._background = self.canvas.copy_from_bbox(self.figure.bbox)
+
+    def render(self, xs, ys):
+        """
+        Method drawing the bodies at given positions
+        :param xs: Numpy array containing x coordinates of the bodies
+        :param ys: Numpy array containing y coordinates of the bodies
+        :return: Numpy array of shape (height, width, 4), RGBA view of the canvas' buffer (valid until the next call)
+        """
+        self._offsets[:, 0] = xs
+        self._offsets[:, 1] = ys
+        self.points.set_offsets(self._offsets)
+        self.canvas.restore_region(self._background)
+        self.ax.draw_artist(self.points)
+        return np.asarray(self.canvas.buffer_rgba())
+
+
+class RasterRenderer:
+    def __init__(self, sizes, limits, dpi=DPI, figure_size=FIGURE_SIZE):
+        """
+        Method initializing a RasterRenderer class object, splatting the bodies as discs straight into a NumPy image
+        (no axes), which is much faster than Matplotlib for very large amounts of bodies
+        :param sizes: Numpy array containing sizes of the bodies' markers (in points squared, like Matplotlib's)
+        :param limits: Float, the image spans from -limits to limits
+        :param dpi: Integer, resolution of the frames
+        :param figure_size: Float, width and height of the frames in inches
+        """
+        self.limits = limits
+        self.resolution = int(round(figure_size * dpi))
+        self.colors = (body_colors(sizes)[:, :3] * 255).astype(np.uint8)
+        # Radius of every body in pixels and the offsets of the pixels of a disc of every distinct radius
+        radii = np.maximum(np.round(np.sqrt(sizes) / 2 * dpi / 72), 0).astype(np.int64)
+        self.groups = []
+        for radius in np.unique(radii):
+            dy, dx = np.mgrid[-radius:radius + 1, -radius:radius + 1]
+            disc = dx * dx + dy * dy <= radius * radius
+            self.groups.append((np.flatnonzero(radii == radius), dy[disc], dx[disc]))
+        self._image = np.empty((self.resolution, self.resolution, 3), dtype=np.uint8)
+
+    def render(self, xs, ys):
+        """
+        Method drawing the bodies at given positions
+        :param xs: Numpy array containing x coordinates of the bodies
+        :param ys: Numpy array containing y coordinates of the bodies
+        :return: Numpy array of shape (height, width, 3), RGB image (valid until the next call)
+        """
+        image = self._image
+        image.fill(255)
+        scale = self.resolution / (2 * self.limits)
+        # Merged bodies (NaN) are moved off the image
+        off = -2 * self.resolution
+        columns = np.floor(np.nan_to_num((xs + self.limits) * scale, nan=off)).astype(np.int64)
+        rows = np.floor(np.nan_to_num((self.limits - ys) * scale, nan=off)).astype(np.int64)
+        for bodies, dy, dx in self.groups:
+            pixel_rows = rows[bodies, np.newaxis] + dy
+            pixel_columns = columns[bodies, np.newaxis] + dx
+            inside = ((pixel_rows >= 0) & (pixel_rows < self.resolution) & (pixel_columns >= 0)
+                      & (pixel_columns < self.resolution))
+            colors = np.broadcast_to(self.colors[bodies, np.newaxis], pixel_rows.shape + (3,))
+            image[pixel_rows[inside], pixel_columns[inside]] = colors[inside]
+        return image
+
+
+RENDERERS = {
+    'scatter': ScatterRenderer,
+    'raster': RasterRenderer,
+}
+
+
+def get_renderer(name, sizes, limits, dpi=DPI, figure_size=FIGURE_SIZE):
+    """
+    Function creating a frame renderer of a given name
+    :param name: String, name of the renderer, one of RENDERERS' keys
+    :param sizes: Numpy array containing sizes of the bodies' markers
+    :param limits: Float, the frames span from -limits to limits
+    :param dpi: Integer, resolution of the frames
+    :param figure_size: Float, width and height of the frames in inches
+    :return: Renderer class object with a render(xs, ys) method returning an RGBA or RGB image
+    """
+    try:
+        return RENDERERS[name](sizes, limits, dpi, figure_size)
+    except KeyError:
+        raise ValueError(f'Unknown renderer "{name}", available: {", ".join(RENDERERS)}') from None
+
+
+class VideoEncoder:
+    def __init__(self, video_path, fps=FPS, frames_path=None):
+        """
+        Method initializing a VideoEncoder class object, writing frames straight into a video file as they come, so
+        that neither the frames' files nor the whole video have to be held on the disk or in memory
+        :param video_path: String, path to which the video should be saved
+        :param fps: Integer, amount of frames per seconds in which the simulation will be played
+        :param frames_path: String, directory where every frame is additionally saved as a .tif file for debugging
+        (None to not save them)
+        """
+        self.video_path = video_path
+        self.fps = fps
+        self.frames_path = frames_path
+        self.frames = 0
+        self._writer = None
+        self._bgr = None
+        if frames_path is not None:
+            os.makedirs(frames_path, exist_ok=True)
+
+    def write(self, image):
+        """
+        Method appending a frame to the video, the video file is opened with the size of the first frame
+        :param image: Numpy array of shape (height, width, 4) or (height, width, 3) containing an RGBA or RGB frame
+        """
+        if self._writer is None:
+            height, width = image.shape[:2]
+            self._writer = cv2.VideoWriter(self.video_path, cv2.VideoWriter_fourcc(*'DIVX'), self.fps, (width, height))
+            self._bgr = np.empty((height, width, 3), dtype=np.uint8)
+        # Converting into the preallocated buffer, so that no memory is allocated per frame
+        conversion = cv2.COLOR_RGBA2BGR if image.shape[2] == 4 else cv2.COLOR_RGB2BGR
+        cv2.cvtColor(image, conversion, dst=self._bgr)
+        self._writer.write(self._bgr)
+        if self.frames_path is not None:
+            cv2.imwrite(os.path.join(self.frames_path, f'{self.frames}.tif'), self._bgr)
+        self.frames += 1
+
+    def close(self):
+        """
+        Method finishing the video file
+        """
+        if self._writer is not None:
+            self._writer.release()
+            self._writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+# Renderer of a worker process of RenderPool
+_worker_renderer = None
+
+
+def _start_worker(name, sizes, limits, dpi, figure_size):
+    """
+    Function creating the renderer of a worker process of RenderPool
+    """
+    global _worker_renderer
+    _worker_renderer = get_renderer(name, sizes, limits, dpi, figure_size)
+
+
+def _render_frame(xs, ys):
+    """
+    Function rendering a frame in a worker process of RenderPool
+    :return: Numpy array containing the frame (a copy, since the renderer's buffer is reused)
+    """
+    return np.array(_worker_renderer.render(xs, ys))
+
+
+class RenderPool:
+    def __init__(self, encoder, name, sizes, limits, dpi=DPI, figure_size=FIGURE_SIZE, workers=0, max_pending=None):
+        """
+        Method initializing a RenderPool class object, rendering frames in worker processes while the simulation goes
+        on and passing them to the encoder in their original order
+        :param encoder: VideoEncoder class object receiving the frames
+        :param name: String, name of the renderer, one of RENDERERS' keys
+        :param sizes: Numpy array containing sizes of the bodies' markers
+        :param limits: Float, the frames span from -limits to limits
+        :param dpi: Integer, resolution of the frames
+        :param figure_size: Float, width and height of the frames in inches
+        :param workers: Integer, amount of worker processes (0 to render in the calling process)
+        :param max_pending: Integer, maximum amount of frames being rendered or waiting to be encoded, which caps the
+        memory usage (None for twice the amount of workers)
+        """
+        self.encoder = encoder
+        self.workers = workers
+        self.max_pending = max_pending if max_pending is not None else 2 * max(workers, 1)
+        self._pending = deque()
+        if workers > 0:
+            self._renderer = None
+            self._executor = ProcessPoolExecutor(workers, initializer=_start_worker,
+                                                 initargs=(name, sizes, limits, dpi, figure_size))
+        else:
+            self._renderer = get_renderer(name, sizes, limits, dpi, figure_size)
+            self._executor = None
+
+    def submit(self, xs, ys):
+        """
+        Method rendering a frame of the bodies at given positions, blocking only if max_pending frames are pending
+        :param xs: Numpy array containing x coordinates of the bodies
+        :param ys: Numpy array containing y coordinates of the bodies
+        """
+        if self._executor is None:
+            self.encoder.write(self._renderer.render(xs, ys))
+            return
+        # The positions are copied, so the simulation can go on while the frame is rendered
+        self._pending.append(self._executor.submit(_render_frame, np.array(xs), np.array(ys)))
+        while len(self._pending) >= self.max_pending:
+            self.encoder.write(self._pending.popleft().result())
+
+    def close(self):
+        """
+        Method waiting for all the pending frames, encoding them in order and terminating the worker processes
+        """
+        while self._pending:
+            self.encoder.write(self._pending.popleft().result())
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
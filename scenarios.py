@@ -2,11 +2,26 @@
 # ----------------------------------------------------------------------------------------------------------------------
 # This script is responsible for showing and loading scenarios into the simulator.
 
-import numpy as np
+from collections import namedtuple
 import os
+import zipfile
+import numpy as np
 
 DEFAULT_PATH = './scenarios/default/'
 
+# Extensions of the scenario files: the text format (see FORMATTING.MD) and the binary format (see save_scenario)
+EXTENSIONS = ('.txt', '.npz')
+
+# Bodies of a scenario, one record per body
+BODY_DTYPE = np.dtype([('mass', '<f8'), ('x', '<f8'), ('y', '<f8'), ('vx', '<f8'), ('vy', '<f8')])
+
+# A parsed scenario: suggested timeframe, samples and frames (strings, as written in the file), names of the bodies and
+# a structured array of the bodies (see BODY_DTYPE)
+Scenario = namedtuple('Scenario', ['timeframe', 'samples', 'frames', 'names', 'bodies'])
+
+# Parsed scenarios by their paths, together with the modification time of the file they were parsed from
+_cache = {}
+
 
 def get_scenarios(path=DEFAULT_PATH):
     """
@@ -17,74 +32,144 @@ def get_scenarios(path=DEFAULT_PATH):
     output = []
     files = os.listdir(path)
     for file in files:
-        if file.endswith('.txt'):
+        if file.endswith(EXTENSIONS):
             output.append(file)
     return np.array(output)
 
 
+def _parse_text(file_path):
+    """
+    Function parsing a scenario in the text format
+    :param file_path: String, path of the scenario file
+    :return: Scenario named tuple
+    """
+    with open(file_path, mode='r') as file:
+        lines = file.readlines()
+    names = []
+    values = []
+    current_line = 3
+    # Every body is a line with its name followed by 5 lines with its values, other lines are skipped
+    while current_line + 5 < len(lines):
+        if lines[current_line][0] == '!':
+            names.append(lines[current_line][1:])
+            values.append(tuple(float(line) for line in lines[current_line + 1:current_line + 6]))
+            current_line += 6
+        else:
+            current_line += 1
+    if any(line[0] == '!' for line in lines[current_line:]):
+        raise ValueError(f'The last body of "{file_path}" is incomplete')
+    bodies = np.array(values, dtype=BODY_DTYPE)
+    return Scenario(lines[0][:-1], lines[1][:-1], lines[2][:-1], np.array(names), bodies)
+
+
+def _memory_map(file_path, name):
+    """
+    Function memory-mapping an array stored uncompressed in a .npz file (np.load ignores mmap_mode for .npz files), so
+    that it is read from the disk only when (and where) it is used
+    :param file_path: String, path of the .npz file
+    :param name: String, name of the array
+    :return: Numpy memmap (read-only)
+    """
+    with zipfile.ZipFile(file_path) as archive:
+        info = archive.getinfo(name + '.npy')
+    if info.compress_type != zipfile.ZIP_STORED:
+        raise ValueError(f'"{name}" is compressed in "{file_path}" and cannot be memory-mapped')
+    with open(file_path, mode='rb') as file:
+        # The data follows the local header of the member, whose extra field may differ from the central directory's
+        file.seek(info.header_offset + 26)
+        name_length, extra_length = np.frombuffer(file.read(4), dtype='<u2')
+        file.seek(info.header_offset + 30 + int(name_length) + int(extra_length))
+        if np.lib.format.read_magic(file) == (1, 0):
+            shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(file)
+        else:
+            shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(file)
+        offset = file.tell()
+    return np.memmap(file_path, dtype=dtype, mode='r', offset=offset, shape=shape, order='F' if fortran_order else 'C')
+
+
+def _parse_binary(file_path):
+    """
+    Function loading a scenario in the binary format, the bodies are memory-mapped
+    :param file_path: String, path of the scenario file
+    :return: Scenario named tuple
+    """
+    with np.load(file_path) as file:
+        timeframe, samples, frames = (str(value) for value in file['settings'])
+        names = file['names']
+    bodies = _memory_map(file_path, 'bodies')
+    if bodies.dtype != BODY_DTYPE:
+        raise ValueError(f'"{file_path}" does not contain bodies of the expected type')
+    return Scenario(timeframe, samples, frames, names, bodies)
+
+
+def read_scenario(name, path=DEFAULT_PATH):
+    """
+    Function parsing a scenario, every file is parsed only once (again if it was modified since)
+    :param name: String, name of the scenario ending with '.txt' or '.npz'
+    :param path: String, directory where the scenario is located
+    :return: Scenario named tuple, its bodies array is read-only
+    """
+    file_path = os.path.abspath(os.path.join(path, name))
+    modified = os.stat(file_path).st_mtime_ns
+    cached = _cache.get(file_path)
+    if cached is not None and cached[0] == modified:
+        return cached[1]
+    scenario = _parse_binary(file_path) if name.endswith('.npz') else _parse_text(file_path)
+    scenario.bodies.flags.writeable = False
+    _cache[file_path] = (modified, scenario)
+    return scenario
+
+
+def save_scenario(name, timeframe, samples, frames, names, masses, x0s, y0s, vx0s, vy0s, path=DEFAULT_PATH):
+    """
+    Function saving a scenario in the binary format: an uncompressed .npz file holding the settings, the names and a
+    structured array of the bodies (see BODY_DTYPE), which is memory-mapped when the scenario is loaded
+    :param name: String, name of the scenario ending with '.npz'
+    :param timeframe: Float, suggested timeframe in seconds
+    :param samples: Integer, suggested amount of samples
+    :param frames: Integer, suggested amount of frames
+    :param names: List of strings, names of the bodies (None for no names)
+    :param masses: Numpy array, masses of the bodies
+    :param x0s: Numpy array, X starting coordinates of the bodies
+    :param y0s: Numpy array, Y starting coordinates of the bodies
+    :param vx0s: Numpy array, X starting velocities' components of the bodies
+    :param vy0s: Numpy array, Y starting velocities' components of the bodies
+    :param path: String, directory where the scenario is saved
+    :return: None
+    """
+    if not name.endswith('.npz'):
+        raise ValueError('Binary scenarios have to end with ".npz"')
+    bodies = np.empty(len(masses), dtype=BODY_DTYPE)
+    for field, values in zip(BODY_DTYPE.names, (masses, x0s, y0s, vx0s, vy0s)):
+        bodies[field] = values
+    names = np.array([] if names is None else [str(body).strip() for body in names], dtype=str)
+    # The settings are stored as written in the text format, so that both formats show the same values
+    settings = np.array([str(timeframe), str(int(samples)), str(int(frames))])
+    with open(os.path.join(path, name), mode='wb') as file:
+        np.savez(file, settings=settings, names=names, bodies=bodies)
+
+
 def show_scenario(name, path=DEFAULT_PATH):
     """
     Function outputting all the information about a given scenario
-    :param name: String, name of the scenario ending with '.txt'
+    :param name: String, name of the scenario ending with '.txt' or '.npz'
     :param path: String, directory where the scenario is located
     :return: Numpy array of floats and numpy arrays
     """
     print(f'Showing scenario "{name}"')
-    file = open(path + name, mode='r').readlines()
-    timeframe = file[0][:-1]
-    samples = file[1][:-1]
-    frames = file[2][:-1]
-    names = []
-    masses = []
-    x0s = []
-    y0s = []
-    vx0s = []
-    vy0s = []
-    current_line = 3
-    while True:
-        try:
-            if file[current_line][0] == '!':
-                names.append(file[current_line][1:])
-                masses.append(float(file[current_line + 1]))
-                x0s.append(float(file[current_line + 2]))
-                y0s.append(float(file[current_line + 3]))
-                vx0s.append(float(file[current_line + 4]))
-                vy0s.append(float(file[current_line + 5]))
-                current_line += 6
-            else:
-                current_line += 1
-        except IndexError:
-            break
-    return timeframe, samples, frames, np.array(names), np.array(masses), np.array(x0s), np.array(y0s),\
-        np.array(vx0s), np.array(vy0s)
+    scenario = read_scenario(name, path)
+    bodies = scenario.bodies
+    return scenario.timeframe, scenario.samples, scenario.frames, scenario.names, bodies['mass'], bodies['x'],\
+        bodies['y'], bodies['vx'], bodies['vy']
 
 
 def load_scenario(name, path=DEFAULT_PATH):
     """
     Function outputting all the information about a scenario needed to run the simulation
-    :param name: String, name of the scenario ending with '.txt'
+    :param name: String, name of the scenario ending with '.txt' or '.npz'
     :param path: String, directory where the scenario is located
-    :return: Numpy array of numpy arrays
+    :return: Numpy array of numpy arrays (read-only views of the parsed scenario, no copies are made)
     """
     print(f'Loading scenario "{name}"')
-    file = open(path + name, mode='r').readlines()
-    masses = []
-    x0s = []
-    y0s = []
-    vx0s = []
-    vy0s = []
-    current_line = 3
-    while True:
-        try:
-            if file[current_line][0] == '!':
-                masses.append(float(file[current_line + 1]))
-                x0s.append(float(file[current_line + 2]))
-                y0s.append(float(file[current_line + 3]))
-                vx0s.append(float(file[current_line + 4]))
-                vy0s.append(float(file[current_line + 5]))
-                current_line += 6
-            else:
-                current_line += 1
-        except IndexError:
-            break
-    return np.array(masses), np.array(x0s), np.array(y0s), np.array(vx0s), np.array(vy0s)
+    bodies = read_scenario(name, path).bodies
+    return bodies['mass'], bodies['x'], bodies['y'], bodies['vx'], bodies['vy']
@@ -2,21 +2,35 @@
 # ----------------------------------------------------------------------------------------------------------------------
 # This script is responsible for simulating the gravity.
 
+import contextlib
 import numpy as np
-import matplotlib.pyplot as plt
-import pandas as pd
 import os
 import cv2
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import LineCollection
+from matplotlib.figure import Figure
+import bodies
+import checkpoint
+import collisions
+import forces
+import integrators
+import profiling
+import rendering
+import trajectory
 
 # Video frames' resolution setting
-DPI = 240
+DPI = rendering.DPI
 
 # Defining gravitational constant
-G = 6.67430e-11
+G = forces.G
 
 SCALE_MULTIPLIER = 1  # Scale multiplier for the size of simulated bodies
 LIMITS_MULTIPLIER = 1.25  # Multiplier of axis' limits
 
+# Graph's default width in pixels and amount of bodies whose tracks are read and decimated at once
+PLOT_RESOLUTION = 2560
+PLOT_CHUNK = 256
+
 
 # Function to scale masses for their sizes
 def scale_the_array(masses, min_=5 * SCALE_MULTIPLIER, max_=20 * SCALE_MULTIPLIER):
@@ -35,13 +49,54 @@ def scale_the_array(masses, min_=5 * SCALE_MULTIPLIER, max_=20 * SCALE_MULTIPLIE
             calculated_size = ((mass - min_mass) / (max_mass - min_mass)) * (max_ - min_) + min_
             size.append(calculated_size)
         else:  # Default size
-            size = [min_, min_]
+            size.append(min_)
 
     return np.array(size)
 
 
+def massive_first(masses):
+    """
+    Function ordering the bodies so that the ones with mass come first and the massless test particles after them, in
+    their own contiguous part of the arrays, which the force backends only use as targets
+    :param masses: Numpy array containing masses of the bodies
+    :return: Numpy array of indices ordering the bodies, None if they already are in that order
+    """
+    order = np.argsort(masses == 0, kind='stable')
+    if np.array_equal(order, np.arange(len(masses))):
+        return None
+    return order
+
+
+def unmerged(values, ids, num_of_bodies):
+    """
+    Function placing values of the bodies left after merges back into the columns of all the bodies, the columns of the
+    merged bodies are NaN
+    :param values: Numpy array, values of the bodies left
+    :param ids: Numpy array, original indices of the bodies left
+    :param num_of_bodies: Integer, amount of bodies at the beginning of the simulation
+    :return: Numpy array of num_of_bodies values
+    """
+    output = np.full(num_of_bodies, np.nan)
+    output[ids] = values
+    return output
+
+
+def _step_backend(backend):
+    """
+    Function resolving the force backend of step
+    :param backend: String (name of the backend) or function calculating the accelerations
+    :return: Function calculating the accelerations
+    """
+    if callable(backend):
+        return backend
+    if isinstance(forces.FORCE_BACKENDS.get(backend), type):
+        raise ValueError(f'The "{backend}" backend holds worker processes, pass forces.get_force_backend("{backend}") '
+                         f'created once instead of its name')
+    return forces.get_force_backend(backend)
+
+
 # Calculating positions of all the bodies after a given time dt
-def step(masses, x0, y0, vx0, vy0, dt):
+def step(masses, x0, y0, vx0, vy0, dt, backend='auto'):
     """
     Function calculating bodies' orbital parameters after a given time dt
     :param masses: Array containing masses of the bodies
@@ -50,108 +105,134 @@ def step(masses, x0, y0, vx0, vy0, dt):
     :param vx0: Numpy array containing x components of the velocities of the bodies
     :param vy0: Numpy array containing y components of the velocities of the bodies
     :param dt: Time for which the motion should be calculated
+    :param backend: String, name of the force backend used to calculate the accelerations, one of
+    forces.FORCE_BACKENDS' keys, or a function returned by forces.get_force_backend. Backends holding worker processes
+    ('parallel') have to be passed as functions, created once and closed by the caller, instead of starting and
+    terminating their workers on every step
     :return: Tuple of numpy arrays containing bodies' x and y coordinates and their x and y components of velocity
     """
 
-    # Calculating bodies' position after time dt
-    x1 = x0 + vx0 * dt
-    y1 = y0 + vy0 * dt
-
-    # Creating empty lists for velocities' components
-    vx1 = []
-    vy1 = []
+    with profiling.phase('step'):
+        # Calculating bodies' position after time dt
+        x1 = x0 + vx0 * dt
+        y1 = y0 + vy0 * dt
 
-    # Looping over all the bodies and calculating their velocity after a given timeframe
-    for i in range(len(masses)):
-        # Setting variables for acceleration's components equal to 0
-        a_x = 0
-        a_y = 0
+        # Calculating bodies' accelerations at their new positions and their velocities after a given timeframe
+        a_x, a_y = _step_backend(backend)(masses, x1, y1)
+        vx1 = vx0 + a_x * dt
+        vy1 = vy0 + a_y * dt
 
-        # Looping over all the bodies and adding their acceleration component to body's acceleration
-        for j in range(len(masses)):
-            if masses[i] == 0 or i == j:
-                continue
-            x_r = x1[j] - x1[i]
-            y_r = y1[j] - y1[i]
-            r = (x_r ** 2 + y_r ** 2) ** 0.5
+    return x1, y1, vx1, vy1
 
-            # Contribution from the jth mass
-            a = G * masses[j] / (r * r)
-            a_x += a * x_r / r
-            a_y += a * y_r / r
 
-        # Appending newly calculated velocities to velocities' lists
-        vx1.append(vx0[i] + a_x * dt)
-        vy1.append(vy0[i] + a_y * dt)
-
-    return x1, y1, np.array(vx1), np.array(vy1)
+def decimate(xs, ys, buckets):
+    """
+    Function reducing tracks much longer than the graph's resolution: every track is split into buckets of consecutive
+    samples and only the first and the last sample and the extreme (min and max x and y) samples of every bucket are
+    kept, so that the shape of the track does not change at the graph's resolution
+    :param xs: Numpy array of shape (bodies, samples) containing x coordinates of the bodies
+    :param ys: Numpy array of shape (bodies, samples) containing y coordinates of the bodies
+    :param buckets: Integer, amount of buckets
+    :return: Tuple of numpy arrays of shape (bodies, kept samples) containing decimated x and y coordinates
+    """
+    samples = xs.shape[1]
+    width = samples // buckets
+    if width < 3:  # Nothing to gain
+        return xs, ys
+    used = buckets * width
+    indices = np.arange(used).reshape(buckets, width)
+    kept = [np.zeros((xs.shape[0], 1), dtype=np.int64)]
+    for values in (xs, ys):
+        grouped = values[:, :used].reshape(-1, buckets, width)
+        lowest = highest = grouped
+        missing = np.isnan(grouped)
+        if missing.any():  # Samples of merged bodies (NaN) are never the extremes
+            lowest = np.where(missing, np.inf, grouped)
+            highest = np.where(missing, -np.inf, grouped)
+        kept.append(indices[np.arange(buckets), lowest.argmin(axis=2)])
+        kept.append(indices[np.arange(buckets), highest.argmax(axis=2)])
+    kept.append(np.arange(used, samples)[np.newaxis, :].repeat(xs.shape[0], axis=0))
+    kept.append(np.full((xs.shape[0], 1), samples - 1))
+    kept = np.sort(np.concatenate(kept, axis=1), axis=1)
+    rows = np.arange(xs.shape[0])[:, np.newaxis]
+    return xs[rows, kept], ys[rows, kept]
 
 
-def plot(df, num_of_bodies):
+def plot(trajectory, num_of_bodies, path='./temp/plot.png', resolution=PLOT_RESOLUTION):
     """
-    Function plotting the graph of the motion of the bodies
-    :param df: Pandas dataframe containing time in the 0 column, x and y coordinates of every body in the 1 column and
-    2 column respectively
+    Function plotting the graph of the motion of the bodies, all the tracks are drawn as a single collection of lines
+    :param trajectory: TrajectoryBuffer or TrajectoryReader containing x and y coordinates of every body
     :param num_of_bodies: Amount of bodies for which to plot the graph
+    :param path: String, path to which the graph should be saved
+    :param resolution: Integer, width of the graph in pixels
     :return: None
     """
-    fig = plt.figure()
+    fig = Figure()
+    FigureCanvasAgg(fig)
     ax = fig.add_subplot()
-    for i in range(num_of_bodies):
-        x = []
-        y = []
-        for j in range(len(df)):
-            x.append(df.iloc[j][1][i])
-            y.append(df.iloc[j][2][i])
-        x = np.array(x)
-        y = np.array(y)
-        plt.plot(x, y, linewidth=0.8)
-    ax.set_aspect('equal', adjustable='box')
-    plt.savefig('./temp/plot.png', dpi=800, bbox_inches='tight')
-
-
-def save_to_video(app, video_path='./temp/simulation.avi', frames_path='./temp/frames/', fps=30):
-    """
-    Function creating a video from frames
-    :param app: tkinter.Tk() class object, GUI app calling the function
+    segments = []
+    with profiling.phase('plot tracks'):
+        for start in range(0, num_of_bodies, PLOT_CHUNK):
+            bodies = slice(start, min(start + PLOT_CHUNK, num_of_bodies))
+            # Reading the tracks of a chunk of bodies as contiguous rows
+            xs = np.ascontiguousarray(trajectory.x[:, bodies].T)
+            ys = np.ascontiguousarray(trajectory.y[:, bodies].T)
+            xs, ys = decimate(xs, ys, resolution)
+            segments.append(np.stack((xs, ys), axis=2))
+        segments = np.concatenate(segments)
+    with profiling.phase('plot draw'):
+        colors = [f'C{i % 10}' for i in range(num_of_bodies)]
+        ax.add_collection(LineCollection(segments, colors=colors, linewidths=0.8))
+        ax.autoscale_view()
+        ax.set_aspect('equal', adjustable='box')
+        fig.savefig(path, dpi=resolution / fig.get_figwidth(), bbox_inches='tight')
+
+
+def save_to_video(progress, video_path='./temp/simulation.avi', frames_path='./temp/frames/', fps=30):
+    """
+    Function creating a video from frames saved as files (e.g. with main's keep_frames), main itself streams the frames
+    straight into the video with rendering.VideoEncoder
+    :param progress: progress.Progress class object receiving the progress (e.g. from the GUI or the console)
     :param video_path: String, path to which the video should be saved
     :param frames_path: String, path where the frames needed for the video are stored
     :param fps: Integer, amount of frames per seconds in which the simulation will be played
     :return: None
     """
-    print('\nVideo processing started')
-    app.update_status('Video processing started')
+    progress.status('Video processing started')
     frame_array = []
     files = [f for f in os.listdir(frames_path) if os.path.isfile(os.path.join(frames_path, f))]
     # For sorting the file names properly
     files.sort(key=lambda x: int(x[:-4]))
     frames_count = len(files)
-    for i in range(frames_count):
-        percent = int(round((i + 1) * 100 / frames_count, 0))
-        app.update_progress_bar(percent)
-        app.update_status(f'Reading frame {i + 1} out of {frames_count} - {percent}%')
-        filename = frames_path + files[i]
-        # Reading each file
-        img = cv2.imread(filename)
-        height, width, layers = img.shape
-        size = (width, height)
-        # Inserting the frames into an image array
-        frame_array.append(img)
-    print('Creating the video')
-    app.update_status('Creating the video')
-    out = cv2.VideoWriter(video_path, cv2.VideoWriter_fourcc(*'DIVX'), fps, size)
-    for i in range(len(frame_array)):
-        # Writing to a image array
-        out.write(frame_array[i])
-    out.release()
-    print('Video saved')
-    app.update_status('Video saved')
-
-
-def main(app, masses, x0s, y0s, vx0s, vy0s, length, samples, frames=0, plot_graph=True):
-    """
-    Function responsible for running the whole simulation and updating the GUI
-    :param app: tkinter.Tk() class object, GUI app calling the function
+    progress.reset()
+    with profiling.phase('read frames'):
+        for i in range(frames_count):
+            progress.update(i + 1, frames_count, 'Reading frame')
+            filename = frames_path + files[i]
+            # Reading each file
+            img = cv2.imread(filename)
+            height, width, layers = img.shape
+            size = (width, height)
+            # Inserting the frames into an image array
+            frame_array.append(img)
+    progress.status('Creating the video')
+    with profiling.phase('video'):
+        out = cv2.VideoWriter(video_path, cv2.VideoWriter_fourcc(*'DIVX'), fps, size)
+        for i in range(len(frame_array)):
+            # Writing to a image array
+            out.write(frame_array[i])
+        out.release()
+    progress.status('Video saved')
+
+
+def main(progress, masses, x0s, y0s, vx0s, vy0s, length, samples, frames=0, plot_graph=True, force_backend='auto',
+         output_dir='./temp', stream=False, names=None, save_csv=True, integrator='leapfrog', force_options=None,
+         cancel=None, keep_frames=False, renderer='scatter', render_workers=0, plot_resolution=PLOT_RESOLUTION,
+         checkpoint_every=0, resume=False, profile=False, profile_memory=False, softening=0.0, collision_radius=0.0,
+         precision='float64'):
+    """
+    Function responsible for running the whole simulation and reporting its progress
+    :param progress: progress.Progress class object receiving the progress (e.g. from the GUI or the console)
     :param masses: Numpy array, masses of the bodies
     :param x0s: Numpy array, X starting coordinates of the bodies
     :param y0s: Numpy array, Y starting coordinates of the bodies
@@ -161,54 +242,193 @@ def main(app, masses, x0s, y0s, vx0s, vy0s, length, samples, frames=0, plot_grap
     :param samples: Integer, amount of samples
     :param frames: Integer, amount of frames (0 if you do not want to create a video)
     :param plot_graph: Boolean, True if a graph should be plotted, False otherwise
+    :param force_backend: String, name of the force backend used to calculate the accelerations, one of
+    forces.FORCE_BACKENDS' keys ('auto' and 'vectorized' are exact, 'barnes-hut' is approximate and scales to large
+    amounts of bodies)
+    :param output_dir: String, directory where all the output files are saved
+    :param stream: Boolean, True if the samples should be streamed into a binary trajectory file in chunks instead of
+    being held in memory, False otherwise
+    :param names: List of strings, names of the bodies stored in the trajectory file's header (None for no names)
+    :param save_csv: Boolean, True if the trajectory should be exported into a csv file, False otherwise
+    :param integrator: String, name of the integration method, one of integrators.INTEGRATORS' keys ('adaptive' steps
+    every body with its own timestep and synchronizes them at every sample)
+    :param force_options: Dictionary of keyword arguments for the force backend (e.g. {'theta': 0.5} for 'barnes-hut' or
+    {'workers': 8} for 'parallel')
+    :param cancel: threading.Event (or any object with an is_set method), once it is set the simulation stops at the
+    next sample and the results calculated so far are saved (None if the simulation cannot be cancelled)
+    :param keep_frames: Boolean, True if every frame should also be saved as a .tif file into output_dir/frames for
+    debugging, False otherwise (frames are rendered in memory and streamed straight into the video)
+    :param renderer: String, name of the frame renderer, one of rendering.RENDERERS' keys ('scatter' draws with
+    Matplotlib, 'raster' splats the bodies straight into an image and is much faster for thousands of bodies)
+    :param render_workers: Integer, amount of worker processes rendering the frames while the simulation goes on (0 to
+    render them in between the samples)
+    :param plot_resolution: Integer, width of the graph in pixels
+    :param checkpoint_every: Integer, amount of samples after which the state of the simulation is saved into
+    output_dir/checkpoint.npz, it is also saved when the simulation ends or is cancelled (0 for no checkpoints, requires
+    stream)
+    :param resume: Boolean, True if the simulation should continue from output_dir/checkpoint.npz, appending to the
+    trajectory file of the run which saved it (requires stream and the same scenario and settings), False otherwise
+    :param profile: Boolean, True if the wall time, amount of calls and peak memory of every phase (steps, storing the
+    samples, progress reports, frames, plotting...) should be measured, reported at the end and saved into
+    output_dir/profile.txt and output_dir/profile.json (a Chrome trace), False otherwise
+    :param profile_memory: Boolean, True if the profile should also trace the memory allocated by every phase (slows
+    the simulation down), False otherwise
+    :param softening: Float, Plummer softening length in metres, which keeps the attraction of bodies passing close to
+    each other finite (see forces.SOFTENING, 0 for the exact Newtonian attraction)
+    :param collision_radius: Float (the same for every body) or numpy array (one for every body), radius in metres at
+    which bodies collide. Colliding bodies merge into the heaviest one, conserving mass and momentum, and the columns of
+    the merged ones are NaN in the trajectory from then on (0 for no collisions)
+    :param precision: String, precision of the bodies' positions and velocities, one of bodies.PRECISIONS' keys
+    ('float32' halves their memory traffic, 'compensated' is float64 with the time accumulated by compensated summation)
     :return: None
     """
-    app.update_progress_bar(0)
-    df = pd.DataFrame([[0, x0s, y0s]])    # columns=['T+', 'x', 'y']
-    dt = int(round(length / samples, 0))
-    t = 0
-    xs = x0s
-    ys = y0s
-    vxs = vx0s
-    vys = vy0s
-    if frames != 0:  # Preparing for video creation
-        limits = max(abs(xs).max(), abs(ys).max()) * LIMITS_MULTIPLIER
-        app.update_status("Scaling the array, preparing frames' plotting")
-        print('Scaling the array, preparing plot\n')
-        freq = samples // frames
-        scaled_masses = scale_the_array(masses)
-        fig = plt.figure(figsize=(5, 5))
-        ax = fig.add_subplot()
-        ax.set_aspect('equal')
-        plt.clf()
-    previous_percent = 0
-    for sample in range(samples):  # Looping over all the samples
-        percent = (sample + 1) * 100 // samples  # Updating the status and progress bar
-        if percent != previous_percent:
-            app.update_progress_bar(percent)
-            previous_percent = percent
-        app.update_status(f'Sample {sample + 1} out of {samples} - {percent}%')
-        print(f'Sample {sample + 1} out of {samples} - {percent}%')
-        xs, ys, vxs, vys = step(masses, xs, ys, vxs, vys, dt)  # Calculating new velocities and positions of the bodies
-        if frames != 0 and sample % freq == 0:  # Creating a frame
-            print('Creating a frame')
-            for i in range(len(masses)):
-                plt.scatter(xs[i], ys[i], s=scaled_masses[i],
-                            c='r' if scaled_masses[i] == scaled_masses.max() else None)
-            plt.axis([-limits, limits, -limits, limits])
-            plt.savefig(f'./temp/frames/{t}.tif', bbox_inches='tight', dpi=DPI)
-            plt.clf()
-        t += dt  # Incrementing the time
-        df = df.append([[t, xs, ys, vxs, vys]])  # Appending data to a dataframe
-    print('\nSampling done')
-    app.update_status('Sampling done')
-    if plot_graph:
-        print('\nPlotting the graph')
-        app.update_status('Plotting the graph')
-        plot(df, len(masses))
-    if frames != 0:
-        save_to_video(app)
-    print('\nSaving data into a csv file')
-    app.update_status('Saving data into a csv file')
-    df.to_csv('./temp/positions.csv', mode='a', index=False, header=False)
-    print('Done')
+    profiler = profiling.Profiler(memory=profile_memory) if profile else None
+    with profiler if profiler is not None else contextlib.nullcontext(), profiling.phase('main'),\
+            contextlib.ExitStack() as cleanup:
+        if (checkpoint_every or resume) and not stream:
+            raise ValueError('Checkpoints require the samples to be streamed into the trajectory file (stream=True)')
+        dt = length / samples
+        force_options = dict(force_options or {})
+        if softening:
+            force_options['softening'] = softening
+        # Anything changing the calculated samples has to match for a checkpoint to be resumed: the backend 'auto'
+        # stands for on this machine and its options, except the amount of workers (see forces.NEUTRAL_OPTIONS)
+        settings = {'integrator': integrator, 'force_backend': forces.resolve_force_backend(force_backend),
+                    'force_options': {key: value for key, value in force_options.items()
+                                      if key not in forces.NEUTRAL_OPTIONS}}
+        if np.any(collision_radius):
+            settings['collision_radius'] = np.asarray(collision_radius, dtype=np.float64).tolist()
+        if precision != 'float64':
+            settings['precision'] = precision
+        run_hash = checkpoint.scenario_hash(masses, x0s, y0s, vx0s, vy0s, length, samples, settings)
+        accelerations = forces.get_force_backend(force_backend, **force_options)
+        # Whatever holds worker processes or open files is also closed if the simulation fails, the successful run
+        # closes each of them once it is no longer needed
+        if hasattr(accelerations, 'close'):
+            cleanup.callback(accelerations.close)
+        integrator = integrators.get_integrator(integrator, accelerations)
+        frames_path = os.path.join(output_dir, 'frames', '')
+        trajectory_path = os.path.join(output_dir, 'trajectory.bin')
+        checkpoint_path = os.path.join(output_dir, checkpoint.CHECKPOINT_NAME)
+        # The simulation runs with the bodies with mass first, the samples are stored in the original order
+        order = massive_first(masses)
+        if order is not None:
+            restore = np.argsort(order)
+        # Collision radii and original indices of the simulated bodies, both are compacted as bodies merge
+        radii = collisions.radii_of(masses, collision_radius) if np.any(collision_radius) else None
+        ids = np.arange(len(masses)) if order is None else order
+        if radii is not None and order is not None:
+            radii = radii[order]
+        first_sample = 0
+        if resume:  # Continuing from the checkpoint, the samples calculated after it are calculated again
+            first_sample, t, saved, integrator_state = checkpoint.load_checkpoint(checkpoint_path, run_hash)
+            state = bodies.State(*(saved[name] for name in checkpoint.STATE), precision, t, saved.get('t_error', 0.0))
+            if radii is not None:
+                radii, ids = saved['radii'], saved['ids']
+            integrator.set_state(integrator_state, state)
+            data = cleanup.enter_context(trajectory.TrajectoryWriter(trajectory_path, masses, dt, names,
+                                                                     resume=first_sample + 1))
+            progress.status(f'Resuming the simulation after {first_sample} out of {samples} samples')
+        else:
+            if stream:  # Flushing the samples into a file in fixed-size chunks
+                data = cleanup.enter_context(trajectory.TrajectoryWriter(trajectory_path, masses, dt, names))
+            else:  # Preallocating the trajectory for the starting conditions and every sample
+                data = trajectory.TrajectoryBuffer(len(masses), samples + 1)
+            data.append(0.0, x0s, y0s, vx0s, vy0s)
+            # Positions and velocities are held in a single block, which the integrator updates in place
+            if order is None:
+                state = bodies.State(masses, x0s, y0s, vx0s, vy0s, precision)
+            else:
+                state = bodies.State(masses[order], x0s[order], y0s[order], vx0s[order], vy0s[order], precision)
+        if frames != 0:  # Preparing for video creation
+            limits = max(abs(x0s).max(), abs(y0s).max()) * LIMITS_MULTIPLIER
+            progress.status("Scaling the array, preparing frames' plotting")
+            freq = samples // frames
+            encoder = cleanup.enter_context(rendering.VideoEncoder(os.path.join(output_dir, 'simulation.avi'),
+                                                                   frames_path=frames_path if keep_frames else None))
+            # Closed before the encoder, the frames still being rendered are encoded first
+            frame_pool = cleanup.enter_context(rendering.RenderPool(encoder, renderer, scale_the_array(masses), limits,
+                                                                    DPI, workers=render_workers))
+            if first_sample:  # Rendering the frames of the samples calculated before the checkpoint again
+                progress.status('Rendering the frames calculated before the checkpoint')
+                previous = trajectory.TrajectoryReader(trajectory_path)
+                for sample in range(0, first_sample, freq):
+                    frame_pool.submit(previous.x[sample + 1], previous.y[sample + 1])
+                del previous
+
+        def save_checkpoint(done):
+            """
+            Function saving the state after a given amount of samples, once the samples are on the disk
+            """
+            with profiling.phase('checkpoint'):
+                data.flush()
+                saved = {'masses': state.masses, 'xs': state.xs, 'ys': state.ys, 'vxs': state.vxs, 'vys': state.vys}
+                if radii is not None:
+                    saved.update(radii=radii, ids=ids)
+                if state.compensated:
+                    saved['t_error'] = np.float64(state.t_error)
+                checkpoint.save_checkpoint(checkpoint_path, run_hash, done, state.t, saved, integrator.get_state(state))
+
+        # Calls made for every sample are measured through wrappers, which are the plain methods unless profiling
+        report = profiling.timed('progress', progress.update)
+        integrate = profiling.timed('step', integrator.advance)
+        store = profiling.timed('store', data.append)
+        collide = profiling.timed('collisions', collisions.merge)
+        if frames != 0:
+            render = profiling.timed('frames', frame_pool.submit)
+        progress.reset()
+        for sample in range(first_sample, samples):  # Looping over all the samples
+            if cancel is not None and cancel.is_set():
+                progress.status(f'Simulation cancelled after {sample} out of {samples} samples')
+                break
+            report(sample + 1, samples, 'Sample')
+            # Calculating new velocities and positions of the bodies
+            integrate(state, dt)
+            if radii is not None:  # Merging the colliding bodies
+                merged = collide(state.masses, state.xs, state.ys, state.vxs, state.vys, radii, ids)
+                if merged is not None:
+                    state.replace(*merged[:5])
+                    radii, ids = merged[5:]
+                    integrator.reset()
+                    progress.status(f'Bodies merged in sample {sample + 1}, {len(ids)} bodies left')
+            columns = state.xs, state.ys, state.vxs, state.vys
+            if len(ids) != len(masses):
+                out = tuple(unmerged(values, ids, len(masses)) for values in columns)
+            elif order is None:  # Storing and rendering the views of the state's block, without copying them
+                out = columns
+            else:
+                out = tuple(values[restore] for values in columns)
+            if frames != 0 and sample % freq == 0:  # Rendering a frame and streaming it into the video
+                render(out[0], out[1])
+            state.advance_time(dt)  # Incrementing the time
+            store(state.t, *out)  # Storing the sample in the trajectory
+            if checkpoint_every and (sample + 1) % checkpoint_every == 0:
+                save_checkpoint(sample + 1)
+        if checkpoint_every:  # Saving the last sample, so that a cancelled simulation can be resumed
+            save_checkpoint(len(data) - 1)
+        if hasattr(accelerations, 'close'):  # Terminating the worker processes of the force backend
+            accelerations.close()
+        if stream:  # Reading the samples back lazily from the file
+            with profiling.phase('store'):
+                data.close()
+            data = trajectory.TrajectoryReader(trajectory_path)
+        progress.status('Sampling done')
+        if plot_graph:
+            progress.status('Plotting the graph')
+            plot(data, len(masses), os.path.join(output_dir, 'plot.png'), plot_resolution)
+        if frames != 0:
+            progress.status('Finishing the video')
+            with profiling.phase('video'):
+                frame_pool.close()
+                encoder.close()
+            progress.status(f'Video saved ({encoder.frames} frames)')
+        if save_csv:
+            progress.status('Saving data into a csv file')
+            with profiling.phase('csv'):
+                trajectory.export_csv(data, os.path.join(output_dir, 'positions.csv'))
+        progress.status('Done')
+    if profiler is not None:  # Reporting where the time went
+        with open(os.path.join(output_dir, 'profile.txt'), mode='w') as file:
+            file.write(profiler.summary() + '\n')
+        profiler.write_trace(os.path.join(output_dir, 'profile.json'))
+        progress.status(profiler.summary())
@@ -0,0 +1,97 @@
+# Gravity Simulation Project
+# ----------------------------------------------------------------------------------------------------------------------
+# This script tests that a simulation stopped and resumed from its checkpoint writes the very same files as an
+# uninterrupted one, and that a failing simulation still releases its worker processes and files.
+
+import filecmp
+import os
+import numpy as np
+import pytest
+import forces
+import progress
+import rendering
+import simulation
+import trajectory
+
+SAMPLES = 120
+FRAMES = 12
+
+
+class Failure(Exception):
+    pass
+
+
+class CancelAfter:
+    def __init__(self, samples):
+        """
+        Method initializing a CancelAfter class object, cancelling a simulation after a given amount of samples
+        :param samples: Integer, amount of samples calculated before the simulation is cancelled
+        """
+        self.samples = samples
+
+    def is_set(self):
+        self.samples -= 1
+        return self.samples < 0
+
+
+class FailAfter(CancelAfter):
+    """
+    Simulation failing after a given amount of samples
+    """
+
+    def is_set(self):
+        if super().is_set():
+            raise Failure
+        return False
+
+
+def system(seed=0):
+    """
+    Function creating a star with planets and massless test particles in front of them (so the simulated bodies are
+    reordered, see simulation.massive_first)
+    :return: Tuple of numpy arrays containing masses, coordinates and velocities' components of the bodies
+    """
+    rng = np.random.default_rng(seed)
+    radii = np.r_[rng.uniform(2e11, 3e11, 10), 0, rng.uniform(1e11, 2e11, 3)]
+    phases = rng.uniform(0, 2 * np.pi, len(radii))
+    speeds = np.sqrt(6.674e-11 * 2e30 / np.maximum(radii, 1)) * np.r_[rng.uniform(0.2, 0.8, 10), 0, np.ones(3)]
+    masses = np.r_[np.zeros(10), 2e30, rng.uniform(1e24, 1e25, 3)]
+    return (masses, radii * np.cos(phases), radii * np.sin(phases), -speeds * np.sin(phases),
+            speeds * np.cos(phases))
+
+
+@pytest.mark.parametrize('integrator, options', [
+    ('leapfrog', {}),
+    ('rk4', {'softening': 1e7, 'collision_radius': 1e10, 'precision': 'compensated'}),
+])
+def test_resume_is_identical(tmp_path, integrator, options):
+    kwargs = dict(frames=FRAMES, plot_graph=False, stream=True, save_csv=False, integrator=integrator,
+                  checkpoint_every=17, keep_frames=True, renderer='raster', render_workers=2, **options)
+    full, part = tmp_path / 'full', tmp_path / 'part'
+    for directory in (full, part):
+        directory.mkdir()
+    simulation.main(progress.Progress(), *system(), 31557600, SAMPLES, output_dir=str(full), **kwargs)
+    simulation.main(progress.Progress(), *system(), 31557600, SAMPLES, output_dir=str(part), cancel=CancelAfter(50),
+                    **kwargs)
+    simulation.main(progress.Progress(), *system(), 31557600, SAMPLES, output_dir=str(part), resume=True, **kwargs)
+
+    assert filecmp.cmp(full / 'trajectory.bin', part / 'trajectory.bin', shallow=False)
+    frames = sorted(os.listdir(full / 'frames'))
+    assert len(frames) == FRAMES
+    assert all(filecmp.cmp(full / 'frames' / frame, part / 'frames' / frame, shallow=False) for frame in frames)
+
+
+def test_failure_closes_everything(tmp_path, monkeypatch):
+    closed = []
+    for owner in (forces.ParallelForces, trajectory.TrajectoryWriter, rendering.RenderPool, rendering.VideoEncoder):
+        def close(self, original=owner.close, name=owner.__name__):
+            closed.append(name)
+            original(self)
+        monkeypatch.setattr(owner, 'close', close)
+
+    with pytest.raises(Failure):
+        simulation.main(progress.Progress(), *system(), 31557600, SAMPLES, frames=FRAMES, plot_graph=False,
+                        force_backend='parallel', force_options={'workers': 2}, output_dir=str(tmp_path), stream=True,
+                        save_csv=False, renderer='raster', render_workers=2, cancel=FailAfter(50))
+    # The frames still being rendered are encoded before the video is finished
+    assert closed == ['RenderPool', 'VideoEncoder', 'TrajectoryWriter', 'ParallelForces']
@@ -0,0 +1,62 @@
+# Gravity Simulation Project
+# ----------------------------------------------------------------------------------------------------------------------
+# This script tests that the spatial hash finds the same collisions as checking every pair of bodies, and that merging
+# conserves mass and momentum.
+
+import numpy as np
+import pytest
+import collisions
+
+
+def brute_force(masses, xs, ys, radii):
+    """
+    Function finding the overlapping pairs of bodies by checking every pair (two massless bodies do not collide)
+    :return: Set of tuples of indices of the bodies (first < second)
+    """
+    pairs = set()
+    for i in range(len(masses)):
+        for j in range(i + 1, len(masses)):
+            if (masses[i] or masses[j]) and radii[i] > 0 and radii[j] > 0 \
+                    and np.hypot(xs[j] - xs[i], ys[j] - ys[i]) < radii[i] + radii[j]:
+                pairs.add((i, j))
+    return pairs
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_spatial_hash_matches_brute_force(seed):
+    rng = np.random.default_rng(seed)
+    n = 300
+    masses = rng.uniform(1, 2, n) * 1e24
+    masses[rng.uniform(size=n) < 0.3] = 0
+    radii = rng.uniform(0, 3e9, n)
+    radii[rng.uniform(size=n) < 0.1] = 0
+    xs, ys = rng.uniform(-1e11, 1e11, (2, n))
+    first, second = collisions.find_collisions(masses, xs, ys, radii)
+    found = {(min(i, j), max(i, j)) for i, j in zip(first, second)}
+    assert len(found) == len(first)
+    expected = brute_force(masses, xs, ys, radii)
+    assert expected
+    assert found == expected
+
+
+def test_merge_chain_conserves_mass_and_momentum():
+    # The first body overlaps the second one and the second one the third one, but the first and the third do not
+    masses = np.array([1e24, 3e24, 2e24, 5e24])
+    xs = np.array([0.0, 1.5e9, 3e9, 1e11])
+    ys = np.array([0.0, 0.0, 1e8, 0.0])
+    vxs = np.array([1000.0, -200.0, 50.0, 0.0])
+    vys = np.array([0.0, 300.0, -700.0, 10.0])
+    radii = np.full(4, 1e9)
+    ids = np.array([7, 8, 9, 10])
+    masses_after, xs_after, ys_after, vxs_after, vys_after, radii_after, ids_after = collisions.merge(
+        masses, xs, ys, vxs, vys, radii, ids)
+
+    # Everything merges into the heaviest body of the chain, the far body is untouched
+    np.testing.assert_array_equal(ids_after, [8, 10])
+    assert masses_after.sum() == pytest.approx(masses.sum(), rel=1e-15)
+    for values, after in ((vxs, vxs_after), (vys, vys_after)):
+        np.testing.assert_allclose((masses_after * after).sum(), (masses * values).sum(), rtol=1e-12)
+    for values, after in ((xs, xs_after), (ys, ys_after)):
+        np.testing.assert_allclose(after[0], (masses[:3] * values[:3]).sum() / masses[:3].sum(), rtol=1e-12)
+    assert (xs_after[1], ys_after[1], vxs_after[1], vys_after[1]) == (xs[3], ys[3], vxs[3], vys[3])
+    assert radii_after[0] > radii[1]
@@ -0,0 +1,73 @@
+# Gravity Simulation Project
+# ----------------------------------------------------------------------------------------------------------------------
+# This script tests that every force backend calculates the same accelerations as the reference loop backend.
+
+import numpy as np
+import pytest
+import forces
+
+# Options making the approximate or blocked backends calculate the exact attraction of small systems in several parts
+BACKEND_OPTIONS = {
+    'vectorized': {'tile_size': 16},
+    'barnes-hut': {'theta': 0.0},
+    'parallel': {'workers': 2, 'block_size': 16},
+}
+
+
+def bodies(n=48, massless=8, seed=0):
+    """
+    Function creating a random system with some massless bodies at its end
+    :return: Tuple of numpy arrays containing masses, x and y coordinates of the bodies
+    """
+    rng = np.random.default_rng(seed)
+    masses = rng.uniform(1, 2, n) * 1e24
+    masses[n - massless:] = 0
+    return masses, rng.normal(size=n) * 1e11, rng.normal(size=n) * 1e11
+
+
+@pytest.mark.parametrize('softening', [0.0, 1e10])
+@pytest.mark.parametrize('name', [name for name in forces.FORCE_BACKENDS if name != 'loop'])
+def test_backends_match_loop(name, softening):
+    masses, xs, ys = bodies()
+    targets = np.array([0, 5, 41, 47])
+    accelerations = forces.get_force_backend(name, softening=softening, **BACKEND_OPTIONS.get(name, {}))
+    try:
+        for chosen in (None, targets):
+            expected = forces.accelerations_loop(masses, xs, ys, chosen, softening=softening)
+            for values, reference in zip(accelerations(masses, xs, ys, chosen), expected):
+                np.testing.assert_allclose(values, reference, rtol=1e-12, atol=0)
+    finally:
+        if hasattr(accelerations, 'close'):
+            accelerations.close()
+
+
+def test_parallel_independent_of_workers():
+    masses, xs, ys = bodies(n=200, massless=40)
+    results = []
+    for workers in (1, 2, 3):
+        accelerations = forces.get_force_backend('parallel', workers=workers, block_size=32)
+        try:
+            results.append(accelerations(masses, xs, ys))
+        finally:
+            accelerations.close()
+    for values in results[1:]:
+        for component, reference in zip(values, results[0]):
+            np.testing.assert_array_equal(component, reference)
+
+
+@pytest.mark.parametrize('name', ['vectorized', 'barnes-hut', 'parallel'])
+def test_coincident_bodies_match_loop(name):
+    masses, xs, ys = bodies()
+    # Two distinct bodies with mass at the same position, which attract each other infinitely
+    xs[3], ys[3] = xs[7], ys[7]
+    accelerations = forces.get_force_backend(name, **BACKEND_OPTIONS.get(name, {}))
+    try:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            expected = forces.accelerations_loop(masses, xs, ys)
+            values = accelerations(masses, xs, ys)
+        for component, reference in zip(values, expected):
+            assert np.isnan(reference[[3, 7]]).all()
+            np.testing.assert_allclose(component, reference, rtol=1e-12, atol=0)
+    finally:
+        if hasattr(accelerations, 'close'):
+            accelerations.close()
@@ -0,0 +1,90 @@
+# Gravity Simulation Project
+# ----------------------------------------------------------------------------------------------------------------------
+# This script tests that the adaptive integrator matches the leapfrog and needs fewer force evaluations for the same
+# accuracy.
+
+from functools import partial
+import numpy as np
+import bodies
+import forces
+import integrators
+
+# Timestep between two samples (as in the Sun Earth Moon scenario) and amount of samples (a month)
+DT = 9600.0
+SAMPLES = 270
+
+
+def system(tracers=0, seed=0):
+    """
+    Function creating the Sun, the Earth and the Moon followed by massless bodies on circular orbits far outside them
+    :return: Tuple of numpy arrays containing masses, coordinates and velocities' components of the bodies
+    """
+    rng = np.random.default_rng(seed)
+    radii = rng.uniform(4.5e12, 7.5e12, tracers)
+    angles = rng.uniform(0, 2 * np.pi, tracers)
+    speeds = np.sqrt(forces.G * 2e30 / radii)
+    masses = np.r_[2e30, 5.97e24, 7.346e22, np.zeros(tracers)]
+    xs = np.r_[0, 1.496e11, 1.499633e11, radii * np.cos(angles)]
+    ys = np.r_[0, 0, 0, radii * np.sin(angles)]
+    vxs = np.r_[0, 0, 0, -speeds * np.sin(angles)]
+    vys = np.r_[0, 30000, 30970, speeds * np.cos(angles)]
+    return masses, xs, ys, vxs, vys
+
+
+class Counted:
+    def __init__(self, accelerations):
+        """
+        Method initializing a Counted class object, a force backend counting the accelerations it calculates
+        :param accelerations: Function calculating the accelerations of the bodies (see forces.get_force_backend)
+        """
+        self.accelerations = accelerations
+        self.evaluations = 0
+
+    def __call__(self, masses, xs, ys, targets=None):
+        self.evaluations += len(masses) if targets is None else len(targets)
+        return self.accelerations(masses, xs, ys, targets)
+
+
+def run(integrator, substeps, masses, xs, ys, vxs, vys):
+    """
+    Function integrating the bodies with a given amount of steps per sample
+    :return: Numpy array of shape (SAMPLES, 2, N) with the coordinates of every sample
+    """
+    samples = []
+    for _ in range(SAMPLES):
+        for _ in range(substeps):
+            xs, ys, vxs, vys = integrator.step(masses, xs, ys, vxs, vys, DT / substeps)
+        samples.append((xs, ys))
+    return np.array(samples)
+
+
+def test_adaptive_with_long_timesteps_is_leapfrog():
+    masses, xs, ys, vxs, vys = system(tracers=20)
+    adaptive = integrators.AdaptiveLeapfrog(forces.accelerations_vectorized, eta=1e9)
+    leapfrog = integrators.Leapfrog(forces.accelerations_vectorized)
+    np.testing.assert_array_equal(run(adaptive, 1, masses, xs, ys, vxs, vys),
+                                  run(leapfrog, 1, masses, xs, ys, vxs, vys))
+
+    states = [bodies.State(masses, xs, ys, vxs, vys) for _ in range(2)]
+    for _ in range(20):
+        adaptive.advance(states[0], DT)
+        leapfrog.advance(states[1], DT)
+    np.testing.assert_array_equal(states[0].block, states[1].block)
+
+
+def test_adaptive_needs_fewer_evaluations():
+    masses, xs, ys, vxs, vys = system(tracers=200)
+    # The massless bodies do not change the orbits of the others, so the reference is calculated without them
+    massive = (values[:3] for values in (masses, xs, ys, vxs, vys))
+    reference = run(integrators.Yoshida4(forces.accelerations_vectorized), 32, *massive)
+    errors = {}
+    evaluations = {}
+    for name, integrator, substeps in (('leapfrog', integrators.Leapfrog, 4),
+                                       ('adaptive', partial(integrators.AdaptiveLeapfrog, eta=0.005), 1)):
+        accelerations = Counted(forces.accelerations_vectorized)
+        samples = run(integrator(accelerations), substeps, masses, xs, ys, vxs, vys)
+        errors[name] = np.abs(samples[:, :, :3] - reference).max()
+        evaluations[name] = accelerations.evaluations
+    # Only the Moon and the Earth need short steps, the massless bodies are stepped once per sample
+    assert errors['adaptive'] <= errors['leapfrog']
+    assert evaluations['adaptive'] * 3 < evaluations['leapfrog']
@@ -0,0 +1,57 @@
+# Gravity Simulation Project
+# ----------------------------------------------------------------------------------------------------------------------
+# This script tests that the live simulation copies its state only when the display asks for it, and that the copy is
+# at most one step old.
+
+import time
+import numpy as np
+import live
+
+
+def simulation():
+    """
+    Function creating a paused live simulation of a star and a few planets
+    :return: live.LiveSimulation class object
+    """
+    radii = np.array([0, 1e11, 1.5e11, 2e11])
+    speeds = np.sqrt(6.674e-11 * 2e30 / np.maximum(radii, 1)) * (radii > 0)
+    return live.LiveSimulation(np.array([2e30, 1e24, 1e24, 1e24]), radii, np.zeros(4), np.zeros(4), speeds, 3600.0,
+                               force_backend='vectorized')
+
+
+def test_snapshot_is_taken_at_the_next_step():
+    simulation_object = simulation()
+    try:
+        # The starting state is handed over before the simulation runs
+        t, steps, positions = simulation_object.snapshot()
+        assert (t, steps) == (0.0, 0)
+        assert simulation_object.snapshot() is None
+
+        copies = []
+        publish = simulation_object._publish
+
+        def counted():
+            copies.append(simulation_object.steps)
+            publish()
+
+        simulation_object._publish = counted
+        simulation_object.start()
+        time.sleep(0.05)
+        # Nobody asked for the state, so it was not copied
+        assert copies == []
+        for _ in range(5):
+            before = simulation_object.steps
+            t, steps, positions = simulation_object.snapshot(timeout=5)
+            assert steps > before
+            assert positions.shape == (4, 2)
+        assert len(copies) == 5
+
+        simulation_object.stop()
+        time.sleep(3 * live.PAUSE_POLL)
+        # The state the simulation was paused at is handed over once
+        snapshot = simulation_object.snapshot()
+        assert snapshot is not None and snapshot[1] == simulation_object.steps
+        assert simulation_object.snapshot() is None
+    finally:
+        simulation_object.close()
+    assert simulation_object.error is None
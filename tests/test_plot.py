@@ -0,0 +1,58 @@
+# Gravity Simulation Project
+# ----------------------------------------------------------------------------------------------------------------------
+# This script tests that the graph of the motion draws a bounded amount of points per body without changing the shape
+# of the tracks.
+
+import numpy as np
+import simulation
+import trajectory
+
+
+def tracks(bodies=3, samples=10007, seed=0):
+    """
+    Function creating random walks of the bodies
+    :return: Tuple of numpy arrays of shape (bodies, samples) containing x and y coordinates of the bodies
+    """
+    rng = np.random.default_rng(seed)
+    return rng.normal(size=(bodies, samples)).cumsum(axis=1), rng.normal(size=(bodies, samples)).cumsum(axis=1)
+
+
+def test_decimate_keeps_ends_and_extremes():
+    xs, ys = tracks()
+    xs[1, 5000:] = np.nan  # A body merged into another one
+    decimated_xs, decimated_ys = simulation.decimate(xs, ys, 100)
+    assert decimated_xs.shape == decimated_ys.shape
+    assert decimated_xs.shape[1] <= 4 * 100 + xs.shape[1] // 100 + 2
+    for values, decimated in ((xs, decimated_xs), (ys, decimated_ys)):
+        np.testing.assert_array_equal(decimated[:, 0], values[:, 0])
+        np.testing.assert_array_equal(decimated[:, -1], values[:, -1])
+        np.testing.assert_array_equal(np.nanmin(decimated, axis=1), np.nanmin(values, axis=1))
+        np.testing.assert_array_equal(np.nanmax(decimated, axis=1), np.nanmax(values, axis=1))
+
+
+def test_decimate_keeps_short_tracks():
+    xs, ys = tracks(samples=250)
+    decimated_xs, decimated_ys = simulation.decimate(xs, ys, 100)
+    np.testing.assert_array_equal(decimated_xs, xs)
+    np.testing.assert_array_equal(decimated_ys, ys)
+
+
+def test_plot_points_bounded_by_resolution(tmp_path, monkeypatch):
+    xs, ys = tracks(bodies=5)
+    data = trajectory.TrajectoryBuffer(5, xs.shape[1])
+    for sample in range(xs.shape[1]):
+        data.append(sample, xs[:, sample], ys[:, sample], 0, 0)
+    drawn = []
+    original = simulation.LineCollection
+
+    def line_collection(segments, **kwargs):
+        drawn.append(segments)
+        return original(segments, **kwargs)
+
+    monkeypatch.setattr(simulation, 'LineCollection', line_collection)
+    resolution = 200
+    simulation.plot(data, 5, str(tmp_path / 'plot.png'), resolution=resolution)
+    segments, = drawn
+    assert len(segments) == 5
+    assert segments.shape[1] <= 4 * resolution + xs.shape[1] // resolution + 2
+    assert (tmp_path / 'plot.png').stat().st_size > 0
@@ -0,0 +1,49 @@
+# Gravity Simulation Project
+# ----------------------------------------------------------------------------------------------------------------------
+# This script tests that frames rendered in worker processes are the same and come in the same order as the ones
+# rendered in the calling process.
+
+import numpy as np
+import pytest
+import rendering
+
+FRAMES = 10
+
+
+class Recorder:
+    def __init__(self):
+        """
+        Method initializing a Recorder class object, an encoder keeping copies of the frames it receives
+        """
+        self.frames = []
+
+    def write(self, image):
+        self.frames.append(np.array(image))
+
+
+def render(name, workers, max_pending=None):
+    """
+    Function rendering bodies moving along a line through a RenderPool
+    :return: Recorder class object which received the frames
+    """
+    sizes = np.array([40.0, 10.0, 10.0])
+    encoder = Recorder()
+    with rendering.RenderPool(encoder, name, sizes, 10.0, dpi=40, workers=workers, max_pending=max_pending) as pool:
+        for frame in range(FRAMES):
+            pool.submit(np.array([0.0, frame - 5.0, 5.0 - frame]), np.array([0.0, 1.0, -1.0]))
+            # Submitting waits for the oldest frames until fewer than max_pending are left pending
+            assert len(pool._pending) < pool.max_pending
+    return encoder
+
+
+@pytest.mark.parametrize('name', list(rendering.RENDERERS))
+def test_workers_render_the_same_frames_in_order(name):
+    expected = render(name, 0).frames
+    assert len(expected) == FRAMES
+    # Every frame differs from the others, so frames out of order would not match
+    assert len({frame.tobytes() for frame in expected}) == FRAMES
+
+    recorder = render(name, 2, max_pending=3)
+    assert len(recorder.frames) == FRAMES
+    for frame, reference in zip(recorder.frames, expected):
+        assert frame.tobytes() == reference.tobytes()
@@ -0,0 +1,69 @@
+# Gravity Simulation Project
+# ----------------------------------------------------------------------------------------------------------------------
+# This script tests that scenarios are read the same from both formats, parsed again only after they are modified and
+# handed out read-only.
+
+import os
+import numpy as np
+import pytest
+import scenarios
+
+SETTINGS = ('10368000', '1080', '360')
+NAMES = ('Sun', 'Earth', 'Moon')
+BODIES = np.array([(2e30, 0, 0, 0, 0), (5.97e24, 1.496e11, 0, 0, 30000), (7.346e22, 1.499633e11, 0, 0, 30970.5)],
+                  dtype=scenarios.BODY_DTYPE)
+
+
+def write_text(path, bodies=BODIES):
+    """
+    Function writing a scenario in the text format
+    :param path: pathlib.Path of the scenario file
+    :param bodies: Numpy array of BODY_DTYPE
+    """
+    lines = list(SETTINGS)
+    for name, body in zip(NAMES, bodies):
+        lines += [f'!{name}'] + [repr(float(value)) for value in body]
+    path.write_text('\n'.join(lines) + '\n')
+
+
+def test_formats_round_trip(tmp_path):
+    write_text(tmp_path / 'system.txt')
+    text = scenarios.read_scenario('system.txt', tmp_path)
+    assert (text.timeframe, text.samples, text.frames) == SETTINGS
+    assert [name.strip() for name in text.names] == list(NAMES)
+    np.testing.assert_array_equal(text.bodies, BODIES)
+
+    bodies = text.bodies
+    scenarios.save_scenario('system.npz', *SETTINGS, text.names, bodies['mass'], bodies['x'], bodies['y'],
+                            bodies['vx'], bodies['vy'], path=tmp_path)
+    binary = scenarios.read_scenario('system.npz', tmp_path)
+    assert (binary.timeframe, binary.samples, binary.frames) == SETTINGS
+    assert list(binary.names) == list(NAMES)
+    np.testing.assert_array_equal(binary.bodies, BODIES)
+
+
+def test_parsed_again_only_when_modified(tmp_path):
+    path = tmp_path / 'system.txt'
+    write_text(path)
+    first = scenarios.read_scenario('system.txt', tmp_path)
+    assert scenarios.read_scenario('system.txt', tmp_path) is first
+
+    changed = BODIES.copy()
+    changed['mass'][0] = 1e30
+    write_text(path, changed)
+    modified = os.stat(path).st_mtime_ns + 10 ** 9  # Making sure the time differs on file systems with coarse times
+    os.utime(path, ns=(modified, modified))
+    second = scenarios.read_scenario('system.txt', tmp_path)
+    assert second is not first
+    np.testing.assert_array_equal(second.bodies, changed)
+
+
+@pytest.mark.parametrize('name', ['system.txt', 'system.npz'])
+def test_arrays_are_read_only(tmp_path, name):
+    write_text(tmp_path / 'system.txt')
+    bodies = BODIES
+    scenarios.save_scenario('system.npz', *SETTINGS, NAMES, bodies['mass'], bodies['x'], bodies['y'], bodies['vx'],
+                            bodies['vy'], path=tmp_path)
+    for values in (scenarios.read_scenario(name, tmp_path).bodies,) + scenarios.load_scenario(name, tmp_path):
+        with pytest.raises(ValueError):
+            values[0] = values[1]
@@ -0,0 +1,76 @@
+# Gravity Simulation Project
+# ----------------------------------------------------------------------------------------------------------------------
+# This script tests the binary trajectory file written by TrajectoryWriter and read by TrajectoryReader.
+
+import numpy as np
+import trajectory
+
+BODIES = 5
+DT = 0.5
+
+
+def samples(rows, seed=0):
+    """
+    Function creating random samples
+    :return: Tuple of numpy arrays of t (rows) and x, y, vx and vy (rows, BODIES)
+    """
+    rng = np.random.default_rng(seed)
+    return (np.arange(rows) * DT,) + tuple(rng.normal(size=(rows, BODIES)) for _ in range(4))
+
+
+def write(path, data, names=None, chunk_size=4, resume=None):
+    """
+    Function writing samples into a trajectory file
+    """
+    masses = np.arange(1, BODIES + 1) * 1e24
+    with trajectory.TrajectoryWriter(str(path), masses, DT, names, chunk_size=chunk_size, resume=resume) as writer:
+        for row in zip(*data):
+            writer.append(*row)
+    return writer
+
+
+def test_round_trip(tmp_path):
+    path = tmp_path / 'trajectory.bin'
+    data = samples(11)
+    writer = write(path, data, names=['A', 'B', 'C', 'D', 'E'])  # 11 rows span three chunks of 4
+    assert len(writer) == 11
+    reader = trajectory.TrajectoryReader(str(path))
+    assert len(reader) == 11
+    assert reader.num_of_bodies == BODIES and reader.dt == DT and reader.names == ['A', 'B', 'C', 'D', 'E']
+    np.testing.assert_array_equal(reader.masses, np.arange(1, BODIES + 1) * 1e24)
+    for stored, expected in zip((reader.t, reader.x, reader.y, reader.vx, reader.vy), data):
+        np.testing.assert_array_equal(stored, expected)
+
+
+def test_time_range_and_read(tmp_path):
+    path = tmp_path / 'trajectory.bin'
+    data = samples(11)
+    write(path, data)
+    reader = trajectory.TrajectoryReader(str(path))
+    assert reader.time_range() == slice(0, 11)
+    assert reader.time_range(1.0, 2.5) == slice(2, 6)  # The end is inclusive
+    assert reader.time_range(1.2, None) == slice(3, 11)
+    rows = reader.time_range(1.0, 2.5)
+    t, *columns = reader.read(rows, slice(1, 4))
+    np.testing.assert_array_equal(t, data[0][2:6])
+    for loaded, expected in zip(columns, data[1:]):
+        np.testing.assert_array_equal(loaded, expected[2:6, 1:4])
+    t, xs, ys, vxs, vys = reader.read(np.array([0, 10]), 2)
+    np.testing.assert_array_equal(t, [0, 5.0])
+    np.testing.assert_array_equal(vys, data[4][[0, 10], 2])
+
+
+def test_resume_truncates(tmp_path):
+    path = tmp_path / 'trajectory.bin'
+    data = samples(11)
+    write(path, data)
+    # Resuming from a checkpoint after 6 rows: the rows written after it are replaced by the new ones
+    new = samples(3, seed=1)
+    new = (np.arange(6, 9) * DT,) + new[1:]
+    writer = write(path, new, resume=6)
+    assert len(writer) == 9
+    reader = trajectory.TrajectoryReader(str(path))
+    assert len(reader) == 9
+    for stored, old, appended in zip(reader.read(), data, new):
+        np.testing.assert_array_equal(stored[:6], old[:6])
+        np.testing.assert_array_equal(stored[6:], appended)
@@ -0,0 +1,298 @@
+# Gravity Simulation Project
+# ----------------------------------------------------------------------------------------------------------------------
+# This script is responsible for storing the trajectories of the bodies calculated by the simulation.
+
+import json
+import os
+import struct
+import numpy as np
+
+# Amount of rows by which a buffer of unknown length grows
+CHUNK_SIZE = 1024
+# Maximum size of the chunk a TrajectoryWriter holds in memory, which caps its rows for large amounts of bodies
+CHUNK_BYTES = 64 * 1024 * 1024
+
+COLUMNS = ('t', 'x', 'y', 'vx', 'vy')
+
+# Binary trajectory file format: magic bytes, little-endian uint32 length of the JSON header, the JSON header padded
+# with spaces to a multiple of HEADER_ALIGNMENT bytes and then the rows, each holding t and the x, y, vx and vy arrays
+# of all the bodies as little-endian float64 numbers
+MAGIC = b'GRAVTRJ1'
+HEADER_ALIGNMENT = 64
+DTYPE = np.dtype('<f8')
+
+
+class TrajectoryBuffer:
+    def __init__(self, num_of_bodies, capacity=None, chunk_size=CHUNK_SIZE):
+        """
+        Method initializing a TrajectoryBuffer class object, storing time, coordinates and velocities' components of
+        every sample in preallocated contiguous arrays
+        :param num_of_bodies: Integer, amount of simulated bodies
+        :param capacity: Integer, amount of rows to preallocate (None if the length is not known ahead of time)
+        :param chunk_size: Integer, amount of rows by which the buffer grows once it is full
+        """
+        self.num_of_bodies = num_of_bodies
+        self.chunk_size = chunk_size
+        self.length = 0
+        self._allocate(capacity if capacity is not None else chunk_size)
+
+    def _allocate(self, capacity):
+        """
+        Method (re)allocating the arrays for a given amount of rows, keeping the rows stored so far
+        :param capacity: Integer, amount of rows
+        """
+        t = np.empty(capacity)
+        columns = [np.empty((capacity, self.num_of_bodies)) for _ in COLUMNS[1:]]
+        if self.length:
+            t[:self.length] = self._t[:self.length]
+            for new, old in zip(columns, (self._x, self._y, self._vx, self._vy)):
+                new[:self.length] = old[:self.length]
+        self._t = t
+        self._x, self._y, self._vx, self._vy = columns
+
+    @property
+    def capacity(self):
+        return len(self._t)
+
+    def append(self, t, xs, ys, vxs, vys):
+        """
+        Method appending a sample to the buffer, growing it by chunk_size rows if it is full
+        :param t: Float, time of the sample
+        :param xs: Numpy array containing x coordinates of the bodies
+        :param ys: Numpy array containing y coordinates of the bodies
+        :param vxs: Numpy array containing x components of the velocities of the bodies
+        :param vys: Numpy array containing y components of the velocities of the bodies
+        """
+        if self.length == self.capacity:
+            self._allocate(self.capacity + self.chunk_size)
+        row = self.length
+        self._t[row] = t
+        self._x[row] = xs
+        self._y[row] = ys
+        self._vx[row] = vxs
+        self._vy[row] = vys
+        self.length += 1
+
+    def __len__(self):
+        return self.length
+
+    # Views of the stored rows, shaped (samples, bodies) for coordinates and velocities' components
+
+    @property
+    def t(self):
+        return self._t[:self.length]
+
+    @property
+    def x(self):
+        return self._x[:self.length]
+
+    @property
+    def y(self):
+        return self._y[:self.length]
+
+    @property
+    def vx(self):
+        return self._vx[:self.length]
+
+    @property
+    def vy(self):
+        return self._vy[:self.length]
+
+
+class TrajectoryWriter:
+    def __init__(self, path, masses, dt, names=None, chunk_size=CHUNK_SIZE, resume=None):
+        """
+        Method initializing a TrajectoryWriter class object, streaming samples into a binary trajectory file in chunks
+        of a fixed size, so that only one chunk is held in memory and a crash loses at most one chunk
+        :param path: String, path of the trajectory file (overwritten if it exists, unless resume is given)
+        :param masses: Numpy array containing masses of the bodies
+        :param dt: Float, time between two samples
+        :param names: List of strings, names of the bodies (None for no names)
+        :param chunk_size: Integer, amount of rows held in memory before they are written into the file (fewer if they
+        would take more than CHUNK_BYTES)
+        :param resume: Integer, amount of rows of an existing file to keep, the rows after them (e.g. written after the
+        checkpoint a run is resumed from) are cut off and new samples are appended (None to start a new file)
+        """
+        self.path = path
+        self.num_of_bodies = len(masses)
+        self.length = 0
+        row_size = (1 + 4 * self.num_of_bodies) * DTYPE.itemsize
+        if resume is not None:
+            existing = TrajectoryReader(path)
+            if existing.num_of_bodies != self.num_of_bodies or existing.dt != float(dt):
+                raise ValueError(f'"{path}" was written by a run with different bodies or timestep')
+            if existing.length < resume:
+                raise ValueError(f'"{path}" holds only {existing.length} out of {resume} rows to resume from')
+            offset = existing.offset
+            del existing  # Releasing the memory map before the file is truncated
+            self._file = open(path, mode='r+b')
+            self._file.truncate(offset + resume * row_size)
+            self._file.seek(0, os.SEEK_END)
+            self.length = resume
+        else:
+            header = {
+                'num_of_bodies': self.num_of_bodies,
+                'dt': float(dt),
+                'masses': [float(mass) for mass in masses],
+                'names': [str(name).strip() for name in names] if names is not None else None,
+                'columns': COLUMNS,
+            }
+            header = json.dumps(header).encode()
+            padding = -(len(MAGIC) + 4 + len(header)) % HEADER_ALIGNMENT
+            header += b' ' * padding
+            self._file = open(path, mode='wb')
+            self._file.write(MAGIC + struct.pack('<I', len(header)) + header)
+        self._chunk = np.empty((max(1, min(chunk_size, CHUNK_BYTES // row_size)), 1 + 4 * self.num_of_bodies),
+                               dtype=DTYPE)
+        self._rows = 0
+
+    def append(self, t, xs, ys, vxs, vys):
+        """
+        Method appending a sample to the file, writing the current chunk once it is full
+        :param t: Float, time of the sample
+        :param xs: Numpy array containing x coordinates of the bodies
+        :param ys: Numpy array containing y coordinates of the bodies
+        :param vxs: Numpy array containing x components of the velocities of the bodies
+        :param vys: Numpy array containing y components of the velocities of the bodies
+        """
+        n = self.num_of_bodies
+        row = self._chunk[self._rows]
+        row[0] = t
+        row[1:1 + n] = xs
+        row[1 + n:1 + 2 * n] = ys
+        row[1 + 2 * n:1 + 3 * n] = vxs
+        row[1 + 3 * n:] = vys
+        self._rows += 1
+        self.length += 1
+        if self._rows == len(self._chunk):
+            self.flush()
+
+    def flush(self):
+        """
+        Method writing the rows held in memory into the file and making sure they reach the disk
+        """
+        if self._rows:
+            self._file.write(memoryview(self._chunk[:self._rows]).cast('B'))
+            self._rows = 0
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        """
+        Method writing the remaining rows and closing the file
+        """
+        if not self._file.closed:
+            self.flush()
+            self._file.close()
+
+    def __len__(self):
+        return self.length
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class TrajectoryReader:
+    def __init__(self, path):
+        """
+        Method initializing a TrajectoryReader class object, memory-mapping a binary trajectory file so that time ranges
+        or single bodies can be read without loading the whole file
+        :param path: String, path of the trajectory file
+        """
+        self.path = path
+        with open(path, mode='rb') as file:
+            if file.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f'"{path}" is not a trajectory file')
+            header_length, = struct.unpack('<I', file.read(4))
+            header = json.loads(file.read(header_length))
+        self.num_of_bodies = header['num_of_bodies']
+        self.dt = header['dt']
+        self.masses = np.array(header['masses'])
+        self.names = header['names']
+        self.offset = offset = len(MAGIC) + 4 + header_length
+        row_size = (1 + 4 * self.num_of_bodies) * DTYPE.itemsize
+        # A partially written last row (e.g. after a crash) is ignored
+        self.length = (os.path.getsize(path) - offset) // row_size
+        if self.length:
+            self._rows = np.memmap(path, dtype=DTYPE, mode='r', offset=offset,
+                                   shape=(self.length, 1 + 4 * self.num_of_bodies))
+        else:
+            self._rows = np.empty((0, 1 + 4 * self.num_of_bodies), dtype=DTYPE)
+
+    def __len__(self):
+        return self.length
+
+    def _column(self, index, rows=slice(None), bodies=slice(None)):
+        """
+        Method returning a lazy view of one of the quantities stored for every body
+        :param index: Integer, index of the quantity in COLUMNS (1 - x, 2 - y, 3 - vx, 4 - vy)
+        :param rows: Slice or array of indices of the rows
+        :param bodies: Slice, integer or array of indices of the bodies
+        :return: Numpy array (memory-mapped view when rows and bodies are slices or integers)
+        """
+        start = 1 + (index - 1) * self.num_of_bodies
+        return self._rows[rows, start:start + self.num_of_bodies][:, bodies]
+
+    # Views of the stored rows, shaped (samples, bodies) for coordinates and velocities' components
+
+    @property
+    def t(self):
+        return self._rows[:, 0]
+
+    @property
+    def x(self):
+        return self._column(1)
+
+    @property
+    def y(self):
+        return self._column(2)
+
+    @property
+    def vx(self):
+        return self._column(3)
+
+    @property
+    def vy(self):
+        return self._column(4)
+
+    def time_range(self, t_start=None, t_stop=None):
+        """
+        Method finding the rows of samples taken within a given time range
+        :param t_start: Float, beginning of the range (None for the first sample)
+        :param t_stop: Float, end of the range, inclusive (None for the last sample)
+        :return: Slice of the rows
+        """
+        start = 0 if t_start is None else int(np.searchsorted(self.t, t_start, side='left'))
+        stop = self.length if t_stop is None else int(np.searchsorted(self.t, t_stop, side='right'))
+        return slice(start, stop)
+
+    def read(self, rows=slice(None), bodies=slice(None)):
+        """
+        Method loading a part of the trajectory into memory
+        :param rows: Slice or array of indices of the rows (see time_range)
+        :param bodies: Slice, integer or array of indices of the bodies
+        :return: Tuple of numpy arrays containing t, x, y, vx and vy of the chosen rows and bodies
+        """
+        return (np.array(self.t[rows]),) + tuple(np.array(self._column(index, rows, bodies)) for index in range(1, 5))
+
+
+def export_csv(trajectory, path):
+    """
+    Function saving a trajectory into a csv file, one row per sample and one column per body and quantity
+    :param trajectory: Object with t, x, y, vx and vy arrays (e.g. TrajectoryBuffer)
+    :param path: String, path of the csv file
+    :return: None
+    """
+    num_of_bodies = trajectory.x.shape[1]
+    header = ['t'] + [f'{column}{i}' for column in COLUMNS[1:] for i in range(num_of_bodies)]
+    with open(path, mode='w') as file:
+        file.write(','.join(header) + '\n')
+        # Writing in chunks so that only a part of the trajectory is converted into text at once
+        for start in range(0, len(trajectory.t), CHUNK_SIZE):
+            stop = start + CHUNK_SIZE
+            data = np.column_stack((trajectory.t[start:stop], trajectory.x[start:stop], trajectory.y[start:stop],
+                                    trajectory.vx[start:stop], trajectory.vy[start:stop]))
+            np.savetxt(file, data, fmt='%.17g', delimiter=',')